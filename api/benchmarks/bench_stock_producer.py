@@ -0,0 +1,200 @@
+"""
+Throughput and latency benchmark of the `StockProducer` pipeline.
+
+Runs the producer against synthetic stand-ins for every subscription
+count, each in a fresh interpreter so that the peak RSS is its own,
+and writes the results as JSON:
+
+    ./run_benchmarks.sh --sizes 10,1000,10000 --output results.json
+    ./run_benchmarks.sh --baseline results-main.json
+
+Measures the bootstrap (price histories of all subscriptions), the
+latency of each tick from requesting the quotes to publishing the
+batch, the published messages per second, the peak RSS and, on a few
+extra ticks traced by `tracemalloc`, the memory allocated per tick.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from standins import NullRedis, SyntheticProvider, SyntheticSubscriptions
+from stock_producer import StockProducer
+from stock_publishers.redis_pubsub import RedisPubSub
+
+DEFAULT_SIZES = [10, 1000, 10000]
+DEFAULT_TICKS = 50
+TRACED_TICKS = 5
+
+# Metrics compared with a baseline, True if higher is better
+COMPARED_METRICS = {
+    'bootstrap_secs': False,
+    'tick_p50_ms': False,
+    'tick_p99_ms': False,
+    'publishes_per_sec': True,
+    'peak_rss_kb': False,
+    'tick_alloc_peak_kb': False
+}
+
+def run(subscriptions, ticks, codec=None):
+    """Benchmarks one subscription count in this process.
+
+    @return: dict of the metrics
+    """
+    redis_client = NullRedis()
+    stock_producer = StockProducer(
+        SyntheticProvider(),
+        SyntheticSubscriptions(subscriptions),
+        RedisPubSub(redis_client),
+        codec,
+        bootstrap_concurrency=8,
+        candle_store_capacity=1000
+    )
+    data_ticks = stock_producer.subscriptions_data_ticks(0)
+
+    started = time.perf_counter()
+    stock_producer.produce_ticks(_limited(data_ticks, 1, []))
+    bootstrap_secs = time.perf_counter() - started
+
+    latencies = []
+    published = redis_client.published
+    started = time.perf_counter()
+    stock_producer.produce_ticks(_limited(data_ticks, ticks, latencies))
+    publishes_per_sec = (redis_client.published - published) / (time.perf_counter() - started)
+
+    tracemalloc.start()
+    stock_producer.produce_ticks(_limited(data_ticks, TRACED_TICKS, []))
+    _, tick_alloc_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stock_producer.close()
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+
+    return {
+        'subscriptions': subscriptions,
+        'ticks': ticks,
+        'bootstrap_secs': bootstrap_secs,
+        'tick_p50_ms': statistics.median(latencies_ms),
+        'tick_p95_ms': _percentile(latencies_ms, 0.95),
+        'tick_p99_ms': _percentile(latencies_ms, 0.99),
+        'tick_max_ms': latencies_ms[-1],
+        'publishes_per_sec': publishes_per_sec,
+        'published_bytes': redis_client.published_bytes,
+        # Linux reports kilobytes
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'tick_alloc_peak_kb': tick_alloc_peak / 1024
+    }
+
+def _limited(data_ticks, count, latencies):
+    """Yields `count` ticks, appending the time from requesting each
+    tick until its batch was published to `latencies`."""
+    for _ in range(count):
+        started = time.perf_counter()
+        yield next(data_ticks)
+        latencies.append(time.perf_counter() - started)
+
+def _percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def run_isolated(subscriptions, ticks):
+    """Runs `run` in a fresh interpreter and returns its metrics."""
+    output = subprocess.run(
+        [sys.executable, __file__, '--isolated', str(subscriptions), '--ticks', str(ticks)],
+        capture_output=True, check=True, text=True
+    ).stdout
+
+    return json.loads(output)
+
+def compare(results, baseline, max_regression):
+    """Prints each metric's change against the `baseline` results.
+
+    @return: list of (subscriptions, metric, change) regressing by
+             more than `max_regression`, e.g. 0.2 for 20%
+    """
+    baseline_by_size = {r['subscriptions']: r for r in baseline['results']}
+    regressions = []
+
+    for result in results['results']:
+        previous = baseline_by_size.get(result['subscriptions'])
+
+        if previous is None:
+            continue
+
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if not previous.get(metric):
+                continue
+
+            change = result[metric] / previous[metric] - 1
+            regression = -change if higher_is_better else change
+            print(f'{result["subscriptions"]:>6} {metric:<20} {previous[metric]:>12.2f} '
+                  f'-> {result[metric]:>12.2f} {change:+.1%}')
+
+            if regression > max_regression:
+                regressions.append((result['subscriptions'], metric, change))
+
+    return regressions
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              check=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='comma-separated subscription counts')
+    parser.add_argument('--ticks', type=int, default=DEFAULT_TICKS)
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--baseline', help='results file to compare with')
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help='fails the comparison above this relative regression')
+    parser.add_argument('--isolated', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.isolated is not None:
+        print(json.dumps(run(args.isolated, args.ticks)))
+        return 0
+
+    results = {
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'timestamp': int(time.time()),
+        'results': []
+    }
+
+    for size in map(int, args.sizes.split(',')):
+        result = run_isolated(size, args.ticks)
+        results['results'].append(result)
+        print(f'{size:>6} subscriptions: bootstrap {result["bootstrap_secs"]:.2f}s, '
+              f'tick p50 {result["tick_p50_ms"]:.1f}ms p99 {result["tick_p99_ms"]:.1f}ms, '
+              f'{result["publishes_per_sec"]:.0f} publishes/s, '
+              f'peak RSS {result["peak_rss_kb"] / 1024:.0f}MB')
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+
+        if regressions:
+            print(f'Regressed by more than {args.max_regression:.0%}: {regressions}')
+            return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+Synthetic stand-ins for the producer's collaborators, sized for
+benchmarks instead of exact assertions.
+"""
+
+import random
+import zlib
+
+MINUTE_MS = 60 * 1000
+
+# Saturday 2024-03-02 00:00 UTC, a minute boundary in every timezone
+START_MS = 1709337600000
+
+class SyntheticProvider:
+    """Stock provider answering with generated Schwab-like data.
+
+    Price histories are 1-minute candles ending at `START_MS`. Every
+    `quotes` call advances a simulated clock by `tick_ms`, so candles
+    close at the same rate as in production, and moves each price by
+    a random walk.
+    """
+
+    def __init__(self, candles_per_history=390, tick_ms=1000, seed=0):
+        self._candles_per_history = candles_per_history
+        self._tick_ms = tick_ms
+        self._random = random.Random(seed)
+        self._now_ms = START_MS
+        self._prices = {}
+        self._volumes = {}
+
+    def price_history(self, symbol, frequency, period, start_date=None,
+                      end_date=None, include_extended_data=False):
+        price = self._price(symbol)
+        candles = []
+
+        for i in range(self._candles_per_history, 0, -1):
+            close = price * (1 + self._random.uniform(-0.001, 0.001))
+            candles.append({
+                'open': price,
+                'high': max(price, close),
+                'low': min(price, close),
+                'close': close,
+                'volume': self._random.randint(1000, 100000),
+                'datetime': START_MS - i * MINUTE_MS
+            })
+            price = close
+
+        return {'candles': candles, 'symbol': symbol.upper(), 'empty': False}
+
+    def quotes(self, symbols):
+        self._now_ms += self._tick_ms
+        quotes = {}
+
+        for symbol in symbols:
+            symbol = symbol.upper()
+            self._prices[symbol] = self._price(symbol) * (1 + self._random.uniform(-0.0005, 0.0005))
+            self._volumes[symbol] = self._volumes.get(symbol, 0) + self._random.randint(0, 500)
+            quotes[symbol] = {'quote': {
+                'lastPrice': self._prices[symbol],
+                'totalVolume': self._volumes[symbol],
+                'quoteTime': self._now_ms
+            }}
+
+        return quotes
+
+    def _price(self, symbol):
+        return self._prices.setdefault(
+            symbol.upper(), 50 + zlib.crc32(symbol.upper().encode()) % 450
+        )
+
+class SyntheticSubscriptions:
+    """Subscriptions source with `count` subscriptions, two timeframes
+    per symbol so that some subscriptions share a base series."""
+
+    TIMEFRAMES = [('1minute', '1day'), ('5minute', '1day')]
+
+    def __init__(self, count):
+        self._count = count
+
+    def list_subscriptions(self):
+        timeframes = SyntheticSubscriptions.TIMEFRAMES
+
+        return [
+            (f'sym{i // len(timeframes)}', *timeframes[i % len(timeframes)])
+            for i in range(self._count)
+        ]
+
+class NullRedisPipeline:
+
+    def __init__(self, redis_client):
+        self._redis_client = redis_client
+        self._published = 0
+
+    def publish(self, channel_name, message):
+        self._published += 1
+        self._redis_client.published_bytes += len(message)
+
+    def execute(self):
+        self._redis_client.published += self._published
+        self._redis_client.pipelines += 1
+
+class NullRedis:
+    """Redis client counting the published messages without sending
+    them, so that only the producer's own cost is measured."""
+
+    def __init__(self):
+        self.published = 0
+        self.published_bytes = 0
+        self.pipelines = 0
+
+    def publish(self, channel_name, message):
+        self.published += 1
+        self.published_bytes += len(message)
+
+    def pipeline(self, transaction=True):
+        return NullRedisPipeline(self)
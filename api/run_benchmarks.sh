@@ -0,0 +1,21 @@
+#!/bin/bash
+
+##############################################################################
+# Runs the producer benchmarks.
+#
+# Usage: ./run_benchmarks.sh [--sizes 10,1000,10000] [--ticks 50]
+#                            [--output file.json] [--baseline file.json]
+#
+# Example, comparing a branch with the results of main:
+#
+#   git checkout main && ./run_benchmarks.sh --output main.json
+#   git checkout - && ./run_benchmarks.sh --baseline main.json
+#
+##############################################################################
+
+SCRIPT_DIR=$( cd -- "$( dirname -- "${BASH_SOURCE[0]}" )" &> /dev/null && pwd )
+
+export PYTHONPATH=${PYTHONPATH}:${SCRIPT_DIR}/src
+export PYTHONPATH=${PYTHONPATH}:${SCRIPT_DIR}/benchmarks
+
+python3 ${SCRIPT_DIR}/benchmarks/bench_stock_producer.py "$@"
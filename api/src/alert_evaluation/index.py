@@ -0,0 +1,90 @@
+"""
+In-memory index of the alert rules by channel.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+
+from core.utils import ExtendedEnum
+
+# Bounds of the rule ids, to bisect (threshold, rule id) pairs by threshold
+MIN_RULE_ID = ''
+MAX_RULE_ID = '\uffff'
+
+class Condition(ExtendedEnum):
+    CROSSES_ABOVE = 'crosses_above'
+    CROSSES_BELOW = 'crosses_below'
+
+class AlertIndex:
+    """Alert rules by channel, indicator and condition, each kept as a
+    sorted list of (threshold, rule id). The rules crossed by an
+    indicator move are found by bisection in O(log n + crossed)."""
+
+    def __init__(self):
+        self._rules = {}
+        self._thresholds = defaultdict(lambda: defaultdict(dict))
+
+    def __len__(self):
+        return len(self._rules)
+
+    def apply(self, changes):
+        """Applies `SubscriptionChanges` of `AlertRule`.
+
+        @return: set of channels that gained their first or lost their
+                 last rule
+        """
+        channels_before = set(self._thresholds)
+
+        for rule in changes.removed:
+            self._remove(rule)
+
+        for rule in changes.added:
+            self._add(rule)
+
+        return channels_before.symmetric_difference(self._thresholds)
+
+    def channels(self):
+        return set(self._thresholds)
+
+    def indicators_for(self, channel):
+        return tuple(self._thresholds.get(channel, {}))
+
+    def crossed(self, channel, indicator, previous, current):
+        """Returns the rules of `channel` whose threshold the `indicator`
+        crossed when it moved from `previous` to `current`: above for
+        previous < value <= current, below for current <= value < previous."""
+        by_condition = self._thresholds.get(channel, {}).get(indicator, {})
+
+        if current > previous:
+            thresholds = by_condition.get(Condition.CROSSES_ABOVE.value, [])
+            crossed = thresholds[bisect_right(thresholds, (previous, MAX_RULE_ID)):
+                                 bisect_right(thresholds, (current, MAX_RULE_ID))]
+        elif current < previous:
+            thresholds = by_condition.get(Condition.CROSSES_BELOW.value, [])
+            crossed = thresholds[bisect_left(thresholds, (current, MIN_RULE_ID)):
+                                 bisect_left(thresholds, (previous, MIN_RULE_ID))]
+        else:
+            crossed = []
+
+        return [self._rules[rule_id] for _, rule_id in crossed]
+
+    def _add(self, rule):
+        self._rules[rule.id] = rule
+        insort(self._thresholds[rule.channel][rule.indicator].setdefault(rule.condition, []),
+               (rule.value, rule.id))
+
+    def _remove(self, rule):
+        if self._rules.get(rule.id) != rule:
+            return
+
+        del self._rules[rule.id]
+        by_indicator = self._thresholds[rule.channel]
+        thresholds = by_indicator[rule.indicator][rule.condition]
+        thresholds.pop(bisect_left(thresholds, (rule.value, rule.id)))
+
+        if not thresholds:
+            del by_indicator[rule.indicator][rule.condition]
+        if not by_indicator[rule.indicator]:
+            del by_indicator[rule.indicator]
+        if not by_indicator:
+            del self._thresholds[rule.channel]
@@ -0,0 +1,44 @@
+"""
+Alert rules, what the evaluator needs to know of each alert.
+"""
+
+from typing import NamedTuple
+
+from core.models import Alert
+from messaging.channels import channel_name
+from stock_subscriptions_sources.alerts import Alerts
+
+class AlertRule(NamedTuple):
+    id: str
+    name: str
+    channel: str
+    indicator: str
+    condition: str  # one of core.models.ALERT_CONDITIONS
+    value: int
+
+class AlertRules(Alerts):
+    """Tracks the `AlertRule` of every alert. `subscription_changes`
+    returns the added and removed rules; a changed alert is reported
+    as its old rule removed and its new rule added."""
+
+    TRACKED_FIELDS = Alerts.SUBSCRIPTION_FIELDS + ('name', 'value', 'indicator', 'condition')
+
+    def _record(self, alert):
+        return AlertRule(
+            str(alert.id),
+            alert.name,
+            channel_name((alert.symbol, alert.frequency, alert.period)),
+            alert.indicator or Alert.indicator.default,
+            alert.condition or Alert.condition.default,
+            alert.value
+        )
+
+    def _document_record(self, document):
+        return AlertRule(
+            str(document['_id']),
+            document['name'],
+            channel_name((document['symbol'], document['frequency'], document['period'])),
+            document.get('indicator', Alert.indicator.default),
+            document.get('condition', Alert.condition.default),
+            document['value']
+        )
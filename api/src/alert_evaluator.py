@@ -0,0 +1,307 @@
+"""
+Evaluates the alerts against the candles published by the stock
+producer and publishes the alerts that triggered.
+
+Every alert watches an indicator of one symbol channel. Indicators are
+computed once per channel, and a message only evaluates the alerts of
+the channel it was published to.
+
+With snapshots, a channel's indicators start from its snapshot when
+its first message arrives, so the evaluator can start after the
+producer. A gap in the message sequence reloads the snapshot.
+"""
+
+import json
+import math
+import signal
+import time
+
+from alert_evaluation.index import AlertIndex
+from alert_evaluation.rules import AlertRules
+from core import config
+from core.clients import Clients
+from core.logging import configure_logging, get_logger
+from core.utils import ExtendedEnum
+from indicators.engine import IndicatorStreams
+from messaging.channels import SYMBOL_CHANNEL_PATTERN
+from messaging.codecs import CodecFactory, JsonCodec
+from messaging.exceptions import MessageDecodeError, UnsupportedMessageVersionError
+from messaging.messages import MessageType
+from stock_publishers.redis_pubsub import RedisPubSub
+from stock_publishers.redis_snapshots import RedisSnapshots
+from stock_publishers.redis_streams import RedisStreamsSubscriber
+from stock_publishers.transports import Transport, UnknownTransportError
+
+logger = get_logger(__name__)
+
+class SubscribeMode(ExtendedEnum):
+    PATTERN = 'pattern'  # every symbol channel
+    CHANNELS = 'channels'  # only the channels that have alerts
+
+class UnknownSubscribeModeError(Exception):
+    """Returned when the subscribe mode is unknown."""
+
+class AlertEvaluator:
+
+    def __init__(self, alert_rules, pubsub, publisher, indicator_names,
+                 codec=None, subscribe_mode=SubscribeMode.PATTERN.value,
+                 triggered_channel='alerts-triggered', reload_interval_secs=1,
+                 clock=time.monotonic, snapshots=None):
+        """
+        @param: alert_rules Source of the `AlertRule` changes, e.g. `AlertRules`
+        @param: pubsub A Redis `PubSub` or `RedisStreamsSubscriber` to
+                receive the symbol channels on
+        @param: publisher Publisher of the triggered alerts
+        @param: indicator_names The indicators computed per channel
+        @param: subscribe_mode A `SubscribeMode` value
+        @param: triggered_channel Channel the triggered alerts go to
+        @param: reload_interval_secs Min. seconds between alert reloads
+        @param: snapshots `RedisSnapshots` the channels start from, None if
+                the price histories are published on the channels
+        """
+        if subscribe_mode not in SubscribeMode.list():
+            raise UnknownSubscribeModeError(f'Subscribe mode: {subscribe_mode}')
+
+        self.shutdown = False
+        self._alert_rules = alert_rules
+        self._pubsub = pubsub
+        self._publisher = publisher
+        self._indicator_names = tuple(indicator_names)
+        self._codec = codec or JsonCodec()
+        self._subscribe_mode = subscribe_mode
+        self._triggered_channel = triggered_channel
+        self._reload_interval_secs = reload_interval_secs
+        self._clock = clock
+        self._snapshots = snapshots
+        self._sequences = {}
+        self._alert_index = AlertIndex()
+        self._indicator_streams = IndicatorStreams(self._indicator_names)
+        self._next_reload_at = 0
+
+    def run(self):
+        """Evaluates the published messages until `shutdown` is set."""
+        if self._subscribe_mode == SubscribeMode.PATTERN.value:
+            self._pubsub.psubscribe(SYMBOL_CHANNEL_PATTERN)
+
+        while not self.shutdown:
+            if self._clock() >= self._next_reload_at:
+                self.reload()
+
+            message = self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1)
+
+            if message is not None and message['type'] in ('message', 'pmessage'):
+                self.evaluate(message['channel'].decode('utf-8'), message['data'])
+
+                # Stream entries stay pending until evaluated
+                if 'id' in message:
+                    self._pubsub.ack(message)
+
+    def reload(self):
+        """Applies the alert changes since the previous reload."""
+        self._next_reload_at = self._clock() + self._reload_interval_secs
+        changes = self._alert_rules.subscription_changes()
+
+        if not changes.added and not changes.removed:
+            return
+
+        changed_channels = self._alert_index.apply(changes)
+
+        for rule in changes.added:
+            if rule.indicator not in self._indicator_names:
+                logger.warning(f'Alert {rule.id} watches {rule.indicator}, which is not '
+                               'in AlertEvaluator.Indicators, it will not trigger')
+
+        if self._subscribe_mode == SubscribeMode.CHANNELS.value:
+            self._resubscribe(changed_channels)
+
+        logger.info(f'Alerts: {len(self._alert_index)} on '
+                    f'{len(self._alert_index.channels())} channels')
+
+    def evaluate(self, channel, payload):
+        """Updates the channel's indicators with a published message and
+        publishes the alerts they triggered.
+
+        @return: list of (`AlertRule`, indicator value) that triggered
+        """
+        try:
+            message = self._codec.decode(payload)
+        except (MessageDecodeError, UnsupportedMessageVersionError):
+            logger.exception(f'Skipping undecodable message on {channel}')
+            return []
+
+        if self._snapshots is not None:
+            message = self._in_sequence(channel, message)
+
+            if message is None:
+                return []
+
+        previous_values = self._indicator_streams.values(channel)
+        values = self._indicator_streams.apply(channel, message)
+
+        # A new history resets the indicators rather than moving them
+        if previous_values is None or message.type == MessageType.PRICE_HISTORY.value:
+            return []
+
+        triggered = []
+
+        for indicator in self._alert_index.indicators_for(channel):
+            previous_value = previous_values.get(indicator, math.nan)
+            value = values.get(indicator, math.nan)
+
+            if math.isnan(previous_value) or math.isnan(value):
+                continue
+
+            triggered.extend(
+                (rule, value)
+                for rule in self._alert_index.crossed(channel, indicator, previous_value, value)
+            )
+
+        for rule, value in triggered:
+            self._publisher.publish(
+                self._triggered_channel, self._triggered_message(rule, value, message)
+            )
+
+        return triggered
+
+    def _in_sequence(self, channel, message):
+        """Loads the channel's snapshot for its first message, a snapshot
+        notice or after a gap.
+
+        @return: the message if it is newer than the snapshot, else None
+        """
+        if message.type == MessageType.PRICE_HISTORY.value:
+            self._sequences[channel] = message.sequence
+            return message
+
+        last_sequence = self._sequences.get(channel)
+        gap = last_sequence is not None and message.sequence > last_sequence + 1
+
+        if gap and message.type != MessageType.SNAPSHOT.value:
+            logger.warning(f'Missed messages {last_sequence + 1}-{message.sequence - 1} '
+                           f'on {channel}, reloading its snapshot')
+
+        if last_sequence is None or gap or message.type == MessageType.SNAPSHOT.value:
+            last_sequence = self._load_snapshot(channel)
+
+            if last_sequence is None:
+                return None
+
+        # Unnumbered (version 1) messages are applied as they come
+        if message.sequence and message.sequence <= last_sequence:
+            return None
+
+        if message.type == MessageType.SNAPSHOT.value:
+            return None
+
+        self._sequences[channel] = message.sequence
+
+        return message
+
+    def _load_snapshot(self, channel):
+        """Restarts the channel's indicators from its snapshot.
+
+        @return: sequence of the snapshot, None if there is none yet
+        """
+        history = self._snapshots.load(channel)
+
+        if history is None:
+            return None
+
+        self._indicator_streams.apply(channel, history)
+        self._sequences[channel] = history.sequence
+
+        return history.sequence
+
+    def _resubscribe(self, changed_channels):
+        channels = self._alert_index.channels()
+        subscribed = [c for c in changed_channels if c in channels]
+        unsubscribed = [c for c in changed_channels if c not in channels]
+
+        if subscribed:
+            self._pubsub.subscribe(*subscribed)
+
+        if unsubscribed:
+            self._pubsub.unsubscribe(*unsubscribed)
+
+            for channel in unsubscribed:
+                self._indicator_streams.remove(channel)
+                self._sequences.pop(channel, None)
+
+    def _triggered_message(self, rule, value, message):
+        return json.dumps({
+            'id': rule.id,
+            'name': rule.name,
+            'channel': rule.channel,
+            'indicator': rule.indicator,
+            'condition': rule.condition,
+            'value': rule.value,
+            'indicator_value': value,
+            'timestamp': message.timestamp
+        }, separators=(',', ':')).encode('utf-8')
+
+
+class AlertEvaluatorFactory:
+
+    def __init__(self, clients):
+        """
+        @param: clients The application's `core.clients.Clients`
+        """
+        self._clients = clients
+
+    def build(self):
+        redis_client = self._clients.redis()
+        # The alert rules are read from the database
+        self._clients.mongo()
+        subscribe_mode = config.AlertEvaluator.SubscribeMode
+        transport = config.Redis.Transport or Transport.PUBSUB.value
+
+        if transport == Transport.PUBSUB.value:
+            pubsub = redis_client.pubsub()
+        elif transport == Transport.STREAMS.value:
+            streams = config.AlertEvaluator.Streams
+            pubsub = RedisStreamsSubscriber(redis_client, streams.Group, streams.Consumer,
+                                            str(streams.StartId), streams.Count)
+            # Streams can't be read by pattern
+            subscribe_mode = SubscribeMode.CHANNELS.value
+        else:
+            raise UnknownTransportError(f'Transport: {transport}')
+
+        return AlertEvaluator(
+            AlertRules(
+                config.AlertEvaluator.Alerts.ChangeTracking,
+                config.AlertEvaluator.Alerts.PollIntervalSecs,
+                poll_overlap_secs=config.AlertEvaluator.Alerts.PollOverlapSecs
+            ),
+            pubsub,
+            RedisPubSub(redis_client),
+            config.AlertEvaluator.Indicators,
+            CodecFactory().build(),
+            subscribe_mode,
+            config.AlertEvaluator.TriggeredChannel,
+            config.AlertEvaluator.ReloadIntervalSecs,
+            snapshots=self._snapshots()
+        )
+
+    def _snapshots(self):
+        if not (config.Redis.Snapshots and config.Redis.Snapshots.Enabled):
+            return None
+
+        return RedisSnapshots(self._clients.redis())
+
+
+if __name__ == '__main__':
+    configure_logging()
+    clients = Clients(config)
+    alert_evaluator = AlertEvaluatorFactory(clients).build()
+
+    def signal_handler(sig, frame):
+        logger.info('Gracefully shutting down')
+        alert_evaluator.shutdown = True
+
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    try:
+        alert_evaluator.run()
+    finally:
+        clients.close()
@@ -0,0 +1,98 @@
+"""
+Builds live OHLCV candles from polled quotes.
+"""
+
+from typing import NamedTuple
+
+from candles.frequency import market_timezone, parse_frequency
+from messaging.messages import Candle
+
+class CandleEvent(NamedTuple):
+    closed: bool  # False while the candle is still in progress
+    candle: Candle
+
+class CandleBuilder:
+    """Folds quotes into the open candle of one subscription and closes it
+    at the boundaries of the subscription's frequency.
+
+    Volume comes from the cumulative day volume of the quotes, as the
+    difference to the day volume at the candle's start. Each quote is
+    O(1); the next boundary is computed only when a candle closes.
+    """
+
+    def __init__(self, frequency, timezone=None):
+        """
+        @param: frequency Frequency string, e.g. 5minute or 1daily
+        @param: timezone Timezone of daily and longer candle boundaries,
+                         defaults to `Stocks.Timezone`
+        """
+        self._frequency = parse_frequency(frequency)
+        self._timezone = timezone or market_timezone()
+        self._start = None
+        self._end = None
+        self._open = self._high = self._low = self._close = None
+        self._volume = 0
+        self._volume_base = None
+
+    @property
+    def candle(self):
+        """The open candle or None."""
+        if self._start is None:
+            return None
+
+        return Candle(self._start, self._open, self._high, self._low,
+                      self._close, self._volume)
+
+    def seed(self, candle):
+        """Continues from the last candle of a price history. Quotes
+        within its period are folded into it."""
+        self._start = self._frequency.candle_start(candle.datetime, self._timezone)
+        self._end = self._frequency.candle_end(self._start, self._timezone)
+        self._open, self._high, self._low, self._close = \
+            candle.open, candle.high, candle.low, candle.close
+        self._volume = candle.volume
+        self._volume_base = None
+
+    def add_quote(self, timestamp, price, day_volume):
+        """Folds a quote into the open candle.
+
+        @param: timestamp Quote time in epoch ms
+        @param: price Last traded price
+        @param: day_volume Cumulative volume of the trading day
+        @return: list of `CandleEvent`, the closed candle (if the quote
+                 crossed a boundary) followed by the open candle
+        """
+        events = []
+
+        if self._start is not None and timestamp >= self._end:
+            events.append(CandleEvent(True, self.candle))
+            self._open_candle(timestamp, price, self._volume_base_after_close(day_volume))
+        elif self._start is None:
+            self._open_candle(timestamp, price, day_volume)
+        else:
+            if self._volume_base is None:  # first quote of a seeded candle
+                self._volume_base = day_volume - self._volume
+
+            self._high = max(self._high, price)
+            self._low = min(self._low, price)
+            self._close = price
+
+        if day_volume < self._volume_base:  # day volume was reset
+            self._volume_base = 0
+
+        self._volume = day_volume - self._volume_base
+        events.append(CandleEvent(False, self.candle))
+
+        return events
+
+    def _open_candle(self, timestamp, price, volume_base):
+        self._start = self._frequency.candle_start(timestamp, self._timezone)
+        self._end = self._frequency.candle_end(self._start, self._timezone)
+        self._open = self._high = self._low = self._close = price
+        self._volume_base = volume_base
+
+    def _volume_base_after_close(self, day_volume):
+        if self._volume_base is None:
+            return day_volume
+
+        return self._volume_base + self._volume
@@ -0,0 +1,192 @@
+"""
+On-disk candle cache, so that a restarted producer downloads only the
+candles it missed.
+"""
+
+import datetime
+import os
+import sqlite3
+import threading
+import time
+
+from candles.frequency import market_timezone
+from candles.period import parse_period
+from core.logging import get_logger
+from messaging.messages import Candle, price_history_message
+
+logger = get_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS candles (
+    symbol TEXT NOT NULL,
+    frequency TEXT NOT NULL,
+    datetime INTEGER NOT NULL,
+    open REAL NOT NULL,
+    high REAL NOT NULL,
+    low REAL NOT NULL,
+    close REAL NOT NULL,
+    volume INTEGER NOT NULL,
+    PRIMARY KEY (symbol, frequency, datetime)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS series (
+    symbol TEXT NOT NULL,
+    frequency TEXT NOT NULL,
+    period TEXT NOT NULL,
+    PRIMARY KEY (symbol, frequency)
+) WITHOUT ROWID;
+"""
+
+class CandleCache:
+    """SQLite store of candle series keyed by symbol and frequency.
+
+    Each series also records the longest period it was downloaded for,
+    i.e. how far back its candles are complete.
+    """
+
+    def __init__(self, path):
+        """
+        @param: path The database file, created with its directory if
+                     missing. ':memory:' keeps the cache in memory.
+        """
+        if path != ':memory:' and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(SCHEMA)
+
+    def period(self, symbol, frequency):
+        """Returns the period the series is complete for or None."""
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT period FROM series WHERE symbol = ? AND frequency = ?',
+                (symbol.upper(), frequency)
+            ).fetchone()
+
+        return row[0] if row else None
+
+    def load(self, symbol, frequency):
+        """Returns the cached candles of the series, oldest first."""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT datetime, open, high, low, close, volume FROM candles '
+                'WHERE symbol = ? AND frequency = ? ORDER BY datetime',
+                (symbol.upper(), frequency)
+            ).fetchall()
+
+        return tuple(Candle(*row) for row in rows)
+
+    def save(self, symbol, frequency, period, candles, keep_from=None):
+        """Upserts `candles` into the series.
+
+        @param: period The period the series is complete for
+        @param: keep_from Epoch ms, older candles are deleted
+        """
+        symbol = symbol.upper()
+
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                ((symbol, frequency) + tuple(c) for c in candles)
+            )
+            self._connection.execute(
+                'INSERT OR REPLACE INTO series VALUES (?, ?, ?)',
+                (symbol, frequency, period)
+            )
+
+            if keep_from is not None:
+                self._connection.execute(
+                    'DELETE FROM candles WHERE symbol = ? AND frequency = ? AND datetime < ?',
+                    (symbol, frequency, keep_from)
+                )
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class CachedPriceHistory:
+    """Stock data provider wrapper serving price histories from a
+    `CandleCache`.
+
+    A series cached from no later than the requested period starts is
+    completed with one download of its tail since the newest cached
+    candle, which is downloaded again as it may have been open. Other
+    series are downloaded in full. Quotes pass through to the wrapped
+    provider.
+    """
+
+    def __init__(self, provider, cache, timezone=None, clock=time.time):
+        """
+        @param: provider The wrapped stock data provider
+        @param: cache The `CandleCache`
+        @param: timezone Timezone of the candle dates, the market's by default
+        @param: clock Returns epoch seconds, requested periods count back from it
+        """
+        self._provider = provider
+        self._cache = cache
+        self._timezone = timezone or market_timezone()
+        self._clock = clock
+
+    def price_history(self, symbol, frequency, period, start_date=None,
+                      end_date=None, include_extended_data=False):
+        """See `Schwab.price_history`. An explicit `start_date` bypasses
+        the cache."""
+        if start_date is not None:
+            return self._provider.price_history(symbol, frequency, period, start_date,
+                                                end_date, include_extended_data)
+
+        cached_period = self._cache.period(symbol, frequency)
+        cached_candles = self._cache.load(symbol, frequency) if cached_period is not None else ()
+
+        if cached_candles and not self._covers(cached_period, cached_candles[-1], period):
+            cached_candles = ()
+
+        if cached_candles:
+            downloaded_candles = price_history_message(self._provider.price_history(
+                symbol, frequency, period, cached_candles[-1].datetime,
+                end_date, include_extended_data
+            )).candles
+            candles = tuple(c for c in cached_candles
+                            if c.datetime < cached_candles[-1].datetime) + downloaded_candles
+            logger.debug(f'{symbol} {frequency}: {len(cached_candles)} candles cached, '
+                         f'{len(downloaded_candles)} downloaded')
+        else:
+            cached_period = period
+            downloaded_candles = candles = price_history_message(self._provider.price_history(
+                symbol, frequency, period, None, end_date, include_extended_data
+            )).candles
+
+        if candles:
+            retained_candles = parse_period(cached_period).trim(candles, self._timezone)
+            self._cache.save(symbol, frequency, cached_period, downloaded_candles,
+                             keep_from=retained_candles[0].datetime)
+
+        return {
+            'symbol': symbol.upper(),
+            'empty': not candles,
+            'candles': [c._asdict() for c in parse_period(period).trim(candles, self._timezone)]
+        }
+
+    def quotes(self, symbols):
+        return self._provider.quotes(symbols)
+
+    def close(self):
+        self._provider.close()
+        self._cache.close()
+
+    def _covers(self, cached_period, newest_candle, period):
+        """Whether the cached candles start no later than `period` does.
+        They are complete for the cached period counted back from the
+        newest of them, the request counts back from today; e.g. 1ytd
+        covers 6month only in the second half of the year."""
+        newest_date = self._date(newest_candle.datetime / 1000)
+        cached_start = parse_period(cached_period).start_date(newest_date)
+        requested_start = parse_period(period).start_date(self._date(self._clock()))
+
+        return cached_start <= requested_start
+
+    def _date(self, timestamp):
+        return datetime.datetime.fromtimestamp(timestamp, self._timezone).date()
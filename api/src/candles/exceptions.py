@@ -0,0 +1,5 @@
+class UnknownFrequencyError(Exception):
+    """Raised when a subscription frequency cannot be parsed."""
+
+class UnknownPeriodError(Exception):
+    """Raised when a subscription period cannot be parsed."""
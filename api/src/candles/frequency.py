@@ -0,0 +1,88 @@
+"""
+Candle frequencies and their period boundaries.
+
+Frequencies are spelled as in subscriptions, a multiplier followed by a
+unit, e.g. 1minute, 5minute, 1daily, 1weekly, 1monthly. Minute candles
+are aligned to the epoch. Daily and longer candles start at midnight in
+the market timezone, weeks on Mondays.
+"""
+
+import datetime
+import re
+
+from typing import NamedTuple
+from zoneinfo import ZoneInfo
+
+from candles.exceptions import UnknownFrequencyError
+from core import config
+from core.utils import ExtendedEnum
+
+MINUTE_MS = 60000
+EPOCH_MONDAY_ORDINAL = datetime.date(1970, 1, 5).toordinal()
+
+class FrequencyUnit(ExtendedEnum):
+    MINUTE = 'minute'
+    DAILY = 'daily'
+    WEEKLY = 'weekly'
+    MONTHLY = 'monthly'
+
+class Frequency(NamedTuple):
+    multiplier: int
+    unit: str  # FrequencyUnit value
+
+    def candle_start(self, timestamp, timezone):
+        """Returns the start (epoch ms) of the candle containing `timestamp`."""
+        if self.unit == FrequencyUnit.MINUTE.value:
+            size = self.multiplier * MINUTE_MS
+            return timestamp - timestamp % size
+
+        date = datetime.datetime.fromtimestamp(timestamp / 1000, timezone).date()
+
+        if self.unit == FrequencyUnit.DAILY.value:
+            days = date.toordinal()
+            date = datetime.date.fromordinal(days - days % self.multiplier)
+        elif self.unit == FrequencyUnit.WEEKLY.value:
+            weeks = (date.toordinal() - EPOCH_MONDAY_ORDINAL) // 7
+            weeks -= weeks % self.multiplier
+            date = datetime.date.fromordinal(EPOCH_MONDAY_ORDINAL + weeks * 7)
+        else:
+            months = date.year * 12 + date.month - 1
+            months -= months % self.multiplier
+            date = datetime.date(months // 12, months % 12 + 1, 1)
+
+        return _midnight(date, timezone)
+
+    def candle_end(self, candle_start, timezone):
+        """Returns the end (epoch ms, exclusive) of the candle starting at
+        `candle_start`."""
+        if self.unit == FrequencyUnit.MINUTE.value:
+            return candle_start + self.multiplier * MINUTE_MS
+
+        date = datetime.datetime.fromtimestamp(candle_start / 1000, timezone).date()
+
+        if self.unit == FrequencyUnit.DAILY.value:
+            date += datetime.timedelta(days=self.multiplier)
+        elif self.unit == FrequencyUnit.WEEKLY.value:
+            date += datetime.timedelta(weeks=self.multiplier)
+        else:
+            months = date.year * 12 + date.month - 1 + self.multiplier
+            date = datetime.date(months // 12, months % 12 + 1, 1)
+
+        return _midnight(date, timezone)
+
+def parse_frequency(frequency):
+    """Returns the `Frequency` of a frequency string such as '5minute'."""
+    match = re.fullmatch(r'(\d+)([a-z]+)', frequency)
+
+    if match is None or match.group(2) not in FrequencyUnit.list() or int(match.group(1)) < 1:
+        raise UnknownFrequencyError(f'Frequency: {frequency}')
+
+    return Frequency(int(match.group(1)), match.group(2))
+
+def market_timezone():
+    """Returns the configured market timezone (`Stocks.Timezone`)."""
+    return ZoneInfo(config.Stocks.Timezone or 'America/New_York')
+
+def _midnight(date, timezone):
+    midnight = datetime.datetime.combine(date, datetime.time(), timezone)
+    return int(midnight.timestamp() * 1000)
@@ -0,0 +1,74 @@
+"""
+Price history periods, spelled as in subscriptions: a multiplier
+followed by a unit, e.g. 1day, 10day, 6month, 1year, 1ytd.
+"""
+
+import datetime
+import math
+import re
+
+from typing import NamedTuple
+
+from candles.exceptions import UnknownPeriodError
+from core.utils import ExtendedEnum
+
+class PeriodUnit(ExtendedEnum):
+    DAY = 'day'
+    MONTH = 'month'
+    YEAR = 'year'
+    YTD = 'ytd'
+
+class Period(NamedTuple):
+    multiplier: int
+    unit: str  # PeriodUnit value
+
+    def start_date(self, today):
+        """Returns the first date of this period counted back from
+        `today`, what periods of different units are compared by. Days
+        are trading days, estimated as five per calendar week."""
+        if self.unit == PeriodUnit.DAY.value:
+            return today - datetime.timedelta(days=math.ceil(self.multiplier * 7 / 5))
+
+        if self.unit == PeriodUnit.YTD.value:
+            return datetime.date(today.year, 1, 1)
+
+        months = self.multiplier * (12 if self.unit == PeriodUnit.YEAR.value else 1)
+
+        return _months_before(today, months)
+
+    def trim(self, candles, timezone):
+        """Returns the trailing `candles` that fall into this period,
+        counted back from the last candle. Days are trading days, i.e.
+        dates that have candles."""
+        if not candles:
+            return candles
+
+        dates = [datetime.datetime.fromtimestamp(c.datetime / 1000, timezone).date()
+                 for c in candles]
+
+        if self.unit == PeriodUnit.DAY.value:
+            first_date = sorted(set(dates))[-self.multiplier:][0]
+        else:
+            first_date = self.start_date(dates[-1])
+
+        return tuple(c for c, date in zip(candles, dates) if date >= first_date)
+
+def parse_period(period):
+    """Returns the `Period` of a period string such as '10day'."""
+    match = re.fullmatch(r'(\d+)([a-z]+)', period)
+
+    if match is None or match.group(2) not in PeriodUnit.list() or int(match.group(1)) < 1:
+        raise UnknownPeriodError(f'Period: {period}')
+
+    return Period(int(match.group(1)), match.group(2))
+
+def _months_before(date, months):
+    month_index = date.year * 12 + date.month - 1 - months
+    year, month = month_index // 12, month_index % 12 + 1
+
+    # Clamp e.g. March 31st back to February 28th
+    for day in range(date.day, 0, -1):
+        try:
+            return datetime.date(year, month, day)
+        except ValueError:
+            continue
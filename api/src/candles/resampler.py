@@ -0,0 +1,100 @@
+"""
+Derives coarser candle series from one base series per symbol.
+
+Subscriptions of one symbol share a single price history download at
+the finest resolution they need. Intraday frequencies derive from the
+greatest common minute multiple, daily, weekly and monthly ones from
+daily candles. The base covers the longest subscribed period; each
+subscription is resampled and trimmed to its own period locally.
+"""
+
+import datetime
+import math
+
+from collections import defaultdict
+from typing import NamedTuple
+
+from candles.frequency import FrequencyUnit, parse_frequency
+from candles.period import parse_period
+from messaging.messages import Candle
+
+class BaseSeries(NamedTuple):
+    symbol: str
+    frequency: str
+    period: str
+
+def base_series(subscriptions, today=None):
+    """Returns a dict of subscription to the `BaseSeries` it derives from.
+
+    @param: subscriptions Iterable of unique (symbol, frequency, period)
+    @param: today The date periods are counted back from, defaults to today
+    """
+    today = today or datetime.date.today()
+    groups = defaultdict(list)
+
+    for subscription in subscriptions:
+        symbol, frequency, _ = subscription
+        intraday = parse_frequency(frequency).unit == FrequencyUnit.MINUTE.value
+        groups[(symbol.upper(), intraday)].append(subscription)
+
+    plan = {}
+
+    for group in groups.values():
+        series = BaseSeries(
+            group[0][0],
+            _base_frequency([parse_frequency(s[1]) for s in group]),
+            # Period starting earliest, e.g. 1year before 1ytd, and 1ytd
+            # before 6month only in the second half of the year
+            min((s[2] for s in group), key=lambda p: parse_period(p).start_date(today))
+        )
+        plan.update((subscription, series) for subscription in group)
+
+    return plan
+
+def derive(candles, base_series_, subscription, timezone):
+    """Returns the candles of `subscription` derived from the `candles`
+    of its `base_series_`."""
+    _, frequency, period = subscription
+
+    if frequency != base_series_.frequency:
+        candles = resample(candles, parse_frequency(frequency), timezone)
+
+    if period != base_series_.period:
+        candles = parse_period(period).trim(candles, timezone)
+
+    return tuple(candles)
+
+def resample(candles, frequency, timezone):
+    """Aggregates time-ordered `candles` into candles of `frequency`,
+    each stamped with the start of its period."""
+    resampled = []
+    end = None
+
+    for c in candles:
+        if end is None or c.datetime >= end:
+            start = frequency.candle_start(c.datetime, timezone)
+            end = frequency.candle_end(start, timezone)
+            resampled.append(Candle(start, c.open, c.high, c.low, c.close, c.volume))
+            continue
+
+        last = resampled[-1]
+        resampled[-1] = Candle(
+            last.datetime,
+            last.open,
+            max(last.high, c.high),
+            min(last.low, c.low),
+            c.close,
+            last.volume + c.volume
+        )
+
+    return tuple(resampled)
+
+def _base_frequency(frequencies):
+    units = {f.unit for f in frequencies}
+
+    if len(units) > 1:  # mixed daily, weekly and monthly
+        return f'1{FrequencyUnit.DAILY.value}'
+
+    multiplier = math.gcd(*(f.multiplier for f in frequencies))
+
+    return f'{multiplier}{units.pop()}'
@@ -0,0 +1,167 @@
+"""
+Column-oriented, fixed-capacity candle storage.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+from messaging.messages import Candle
+
+INITIAL_SIZE = 64
+
+class CandleWindow(NamedTuple):
+    """Read-only views of the newest candles of a `CandleStore`, one
+    contiguous array per column."""
+    datetime: np.ndarray  # int64 epoch ms
+    open: np.ndarray  # float64
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray  # int64
+
+class CandleStore:
+    """Ring buffer of the newest `capacity` candles of one series.
+
+    Every candle is written twice, at its slot and at slot + size, so
+    that the newest n candles are always one contiguous slice and
+    windows are views rather than copies. Buffers start small and
+    double until they reach `capacity`; appends are amortized O(1).
+    """
+
+    def __init__(self, capacity):
+        """
+        @param: capacity Max. number of candles retained, older ones
+                         are overwritten
+        """
+        if capacity < 1:
+            raise ValueError(f'Capacity must be positive: {capacity}')
+
+        self._capacity = capacity
+        self._size = 0
+        self._head = 0  # slot after the newest candle
+        self._count = 0
+        self._columns = _allocate(0)
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    def append(self, candle):
+        """Adds `candle` as the newest, dropping the oldest one when full."""
+        if self._count == self._size and self._size < self._capacity:
+            self._grow()
+
+        if self._head == self._size:
+            self._head = 0
+
+        self._write(self._head, candle)
+        self._head += 1
+        self._count = min(self._count + 1, self._size)
+
+    def extend(self, candles):
+        """Adds `candles`, oldest first, as `append` of each would, but
+        a column slice at a time. Only the newest `capacity` are kept."""
+        values = candle_window(list(candles)[-self._capacity:])
+        n = len(values.datetime)
+
+        if not n:
+            return
+
+        if self._size < min(self._count + n, self._capacity):
+            self._grow(self._count + n)
+
+        # The new candles wrap around the end of the ring at most once
+        start = self._head % self._size
+        first = min(n, self._size - start)
+        rest = n - first
+
+        for column, column_values in zip(self._columns, values):
+            column[start:start + first] = column_values[:first]
+            column[start + self._size:start + self._size + first] = column_values[:first]
+            column[:rest] = column_values[first:]
+            column[self._size:self._size + rest] = column_values[first:]
+
+        self._head = rest or start + first
+        self._count = min(self._count + n, self._size)
+
+    def upsert(self, candle):
+        """Replaces the newest candle with `candle` if it does not start
+        after it (an update of the open candle), appends otherwise."""
+        if self._count and candle.datetime <= self._newest_datetime():
+            self._write(self._head - 1, candle)
+        else:
+            self.append(candle)
+
+    def last(self):
+        """Returns the newest `Candle` or None."""
+        if not self._count:
+            return None
+
+        return self.candles(1)[0]
+
+    def window(self, n=None):
+        """Returns a `CandleWindow` of the newest `n` (default all)
+        candles, oldest first. The arrays are views into the store and
+        are only valid until the next write."""
+        n = self._count if n is None else min(n, self._count)
+        end = self._head + self._size
+        window = CandleWindow(*(column[end - n:end] for column in self._columns))
+
+        for column in window:
+            column.flags.writeable = False
+
+        return window
+
+    def candles(self, n=None):
+        """Returns a tuple of `Candle` of the newest `n` (default all)
+        candles, oldest first."""
+        return tuple(Candle(*values)
+                     for values in zip(*(column.tolist() for column in self.window(n))))
+
+    def _newest_datetime(self):
+        return self._columns[0][self._head - 1]
+
+    def _write(self, slot, candle):
+        for column, value in zip(self._columns, candle):
+            column[slot] = value
+            column[slot + self._size] = value
+
+    def _grow(self, min_size=0):
+        window = self.window()
+        size = min(max(2 * self._size, INITIAL_SIZE, min_size), self._capacity)
+        columns = _allocate(size)
+
+        for column, values in zip(columns, window):
+            column[:self._count] = values
+            column[size:size + self._count] = values
+
+        self._columns = columns
+        self._size = size
+        self._head = self._count
+
+def _allocate(size):
+    return CandleWindow(
+        np.zeros(2 * size, dtype=np.int64),
+        np.zeros(2 * size, dtype=np.float64),
+        np.zeros(2 * size, dtype=np.float64),
+        np.zeros(2 * size, dtype=np.float64),
+        np.zeros(2 * size, dtype=np.float64),
+        np.zeros(2 * size, dtype=np.int64)
+    )
+
+def candle_window(candles):
+    """Returns a `CandleWindow` of new arrays holding `candles`."""
+    columns = tuple(zip(*candles)) or ((),) * len(CandleWindow._fields)
+
+    return CandleWindow(
+        np.array(columns[0], dtype=np.int64),
+        np.array(columns[1], dtype=np.float64),
+        np.array(columns[2], dtype=np.float64),
+        np.array(columns[3], dtype=np.float64),
+        np.array(columns[4], dtype=np.float64),
+        np.array(columns[5], dtype=np.int64)
+    )
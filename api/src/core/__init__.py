@@ -1,3 +1,3 @@
-from core.config import Config, Environment
+from core.config import Environment, LazyConfig
 
-config = Config(Environment.DEV.value).to_dotdict()
\ No newline at end of file
+config = LazyConfig(Environment.DEV.value)
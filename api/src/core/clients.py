@@ -0,0 +1,71 @@
+"""
+Lazily created, pooled MongoDB and Redis clients of an application.
+
+Nothing connects at import: the entry points create one `Clients` and
+inject it into the factories, which ask for the clients they need:
+
+    clients = Clients(config)
+    stock_producer = StockProducerFactory(clients).build()
+"""
+
+import mongoengine
+import redis
+import redis.asyncio
+
+class Clients:
+    """Creates each client on first use and shares it afterwards."""
+
+    def __init__(self, config):
+        """
+        @param: config The `core.config` with the `Redis` and `Database` sections
+        """
+        self._config = config
+        self._redis = None
+        self._async_redis = None
+        self._mongo = None
+
+    def redis(self):
+        """Returns the `redis.Redis` client."""
+        if self._redis is None:
+            self._redis = redis.Redis(connection_pool=redis.ConnectionPool(
+                host=self._config.Redis.Host,
+                port=self._config.Redis.Port,
+                max_connections=self._config.Redis.MaxConnections
+            ))
+
+        return self._redis
+
+    def async_redis(self):
+        """Returns the `redis.asyncio.Redis` client."""
+        if self._async_redis is None:
+            self._async_redis = redis.asyncio.Redis(connection_pool=redis.asyncio.ConnectionPool(
+                host=self._config.Redis.Host,
+                port=self._config.Redis.Port,
+                max_connections=self._config.Redis.MaxConnections
+            ))
+
+        return self._async_redis
+
+    def mongo(self):
+        """Connects mongoengine, which the `core.models` documents use,
+        and returns its `MongoClient`."""
+        if self._mongo is None:
+            self._mongo = mongoengine.connect(
+                host=self._config.Database.ConnectionString,
+                db=self._config.Database.Name,
+                maxPoolSize=self._config.Database.MaxPoolSize or 100
+            )
+
+        return self._mongo
+
+    def close(self):
+        """Closes the sync clients created so far. The async client's
+        connections go with the event loop that used them."""
+        if self._redis is not None:
+            self._redis.close()
+            self._redis = None
+
+        if self._mongo is not None:
+            mongoengine.disconnect()
+            self._mongo = None
+
@@ -36,4 +36,25 @@ class Config:
         return self._conf
 
     def __getitem__(self, key):
-        return self._conf[key]
\ No newline at end of file
+        return self._conf[key]
+
+class LazyConfig:
+    """`Config.to_dotdict` of an environment, loaded on first access
+    instead of at import."""
+
+    def __init__(self, env):
+        self._env = env
+        self._dotdict = None
+
+    def load(self):
+        """Returns the config file as a `DotDict`, loading it once."""
+        if self._dotdict is None:
+            self._dotdict = Config(self._env).to_dotdict()
+
+        return self._dotdict
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+    def __getitem__(self, key):
+        return self.load()[key]
@@ -1,21 +1,49 @@
 """
 Utilities for logging.
+
+Loggers are configured from `Logging` in the config once the
+application calls `configure_logging`, so that importing a module
+doesn't load the config.
 """
 
 import logging
 
 from core import config
 
+_logger_names = []
+_configured = False
+
 def get_logger(mod_name):
-    """Returns a standardized logger.
+    """Returns a standardized logger, configured by `configure_logging`.
 
     Example: get_logger(__name__)
     """
     logger = logging.getLogger(mod_name)
+
+    if mod_name not in _logger_names:
+        _logger_names.append(mod_name)
+
+        if _configured:
+            _configure(logger)
+
+    return logger
+
+def configure_logging():
+    """Configures the loggers returned by `get_logger` so far and from
+    now on. Called once by the application entry points."""
+    global _configured  # pylint:disable=global-statement
+
+    if _configured:
+        return
+
+    _configured = True
+
+    for mod_name in _logger_names:
+        _configure(logging.getLogger(mod_name))
+
+def _configure(logger):
     handler = logging.StreamHandler()
     formatter = logging.Formatter(config.Logging.Format)
     handler.setFormatter(formatter)
     logger.addHandler(handler)
     logger.setLevel(getattr(logging, config.Logging.Level))
-
-    return logger
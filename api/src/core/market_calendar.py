@@ -0,0 +1,95 @@
+"""
+Trading sessions of the exchange.
+
+Weekdays have a pre-market, a regular and an after-hours session,
+times in the market timezone. Holidays have none, early closes end the
+regular session at 13:00 and after hours at 17:00:
+
+    calendar = MarketCalendar(market_timezone(), holidays=['2026-12-25'])
+    calendar.session(time.time())  # a MarketSession value
+"""
+
+import datetime
+
+from core.utils import ExtendedEnum
+
+class MarketSession(ExtendedEnum):
+    PRE_MARKET = 'pre_market'
+    REGULAR = 'regular'
+    AFTER_HOURS = 'after_hours'
+    CLOSED = 'closed'
+
+class MarketCalendar:
+    """Sessions of a US equities exchange, NYSE hours by default."""
+
+    PRE_MARKET_OPEN = datetime.time(4, 0)
+    REGULAR_OPEN = datetime.time(9, 30)
+    REGULAR_CLOSE = datetime.time(16, 0)
+    AFTER_HOURS_CLOSE = datetime.time(20, 0)
+    EARLY_REGULAR_CLOSE = datetime.time(13, 0)
+    EARLY_AFTER_HOURS_CLOSE = datetime.time(17, 0)
+
+    # Long enough to get past any run of weekend and holidays
+    MAX_CLOSED_DAYS = 14
+
+    def __init__(self, timezone, holidays=(), early_closes=()):
+        """
+        @param: timezone The market `ZoneInfo`
+        @param: holidays Dates without sessions, `datetime.date` or 'YYYY-MM-DD'
+        @param: early_closes Dates whose sessions end early, as `holidays`
+        """
+        self._timezone = timezone
+        self._holidays = {_date(d) for d in holidays or ()}
+        self._early_closes = {_date(d) for d in early_closes or ()}
+
+    def sessions(self, date):
+        """Returns the (`MarketSession` value, start, end) tuples of a date,
+        start and end in epoch seconds. Empty on weekends and holidays."""
+        if date.weekday() >= 5 or date in self._holidays:
+            return []
+
+        early = date in self._early_closes
+        times = [
+            (MarketSession.PRE_MARKET.value, MarketCalendar.PRE_MARKET_OPEN,
+             MarketCalendar.REGULAR_OPEN),
+            (MarketSession.REGULAR.value, MarketCalendar.REGULAR_OPEN,
+             MarketCalendar.EARLY_REGULAR_CLOSE if early else MarketCalendar.REGULAR_CLOSE),
+            (MarketSession.AFTER_HOURS.value,
+             MarketCalendar.EARLY_REGULAR_CLOSE if early else MarketCalendar.REGULAR_CLOSE,
+             MarketCalendar.EARLY_AFTER_HOURS_CLOSE if early else MarketCalendar.AFTER_HOURS_CLOSE)
+        ]
+
+        return [(session, self._timestamp(date, start), self._timestamp(date, end))
+                for session, start, end in times]
+
+    def session(self, timestamp):
+        """Returns the `MarketSession` value at epoch seconds `timestamp`."""
+        for session, start, end in self.sessions(self._date(timestamp)):
+            if start <= timestamp < end:
+                return session
+
+        return MarketSession.CLOSED.value
+
+    def next_open(self, timestamp):
+        """Returns the start (epoch seconds) of the first session after
+        `timestamp`, or None if there is none within `MAX_CLOSED_DAYS`."""
+        date = self._date(timestamp)
+
+        for days in range(MarketCalendar.MAX_CLOSED_DAYS + 1):
+            for _, start, _ in self.sessions(date + datetime.timedelta(days=days)):
+                if start > timestamp:
+                    return start
+
+        return None
+
+    def _date(self, timestamp):
+        return datetime.datetime.fromtimestamp(timestamp, self._timezone).date()
+
+    def _timestamp(self, date, time):
+        return datetime.datetime.combine(date, time, self._timezone).timestamp()
+
+def _date(value):
+    if isinstance(value, datetime.date):
+        return value
+
+    return datetime.date.fromisoformat(str(value))
@@ -0,0 +1,277 @@
+"""
+In-process counters and latency histograms, exposed in the Prometheus
+text format.
+
+Metrics are created once by the module they instrument and updated on
+the hot path, which costs a lock and a dict lookup. Gauges read the
+stats of other components only when the metrics are scraped:
+
+    STAGE_SECONDS = metrics.histogram('stage_seconds', 'Stage latency', ['stage'])
+
+    with STAGE_SECONDS.time(stage='fetch'):
+        ...
+
+    MetricsServer(metrics, port=9100).start()  # serves GET /metrics
+"""
+
+import bisect
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Seconds, from sub-millisecond transforms to slow provider requests
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+class Counter:
+    """Monotonically increasing count per combination of label values."""
+
+    type = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _key(self.labels, labels)
+
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_key(self.labels, labels), 0)
+
+    def samples(self):
+        """Returns (name, labels dict, value) tuples."""
+        with self._lock:
+            values = list(self._values.items())
+
+        return [(self.name, dict(zip(self.labels, key)), value) for key, value in values]
+
+class Histogram:
+    """Distribution of observed values in cumulative buckets."""
+
+    type = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._buckets = tuple(sorted(buckets))
+        # Per key: [bucket counts, +Inf bucket last], sum, count
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _key(self.labels, labels)
+        index = bisect.bisect_left(self._buckets, value)
+
+        with self._lock:
+            counts = self._values.get(key)
+
+            if counts is None:
+                counts = self._values[key] = [[0] * (len(self._buckets) + 1), 0.0, 0]
+
+            counts[0][index] += 1
+            counts[1] += value
+            counts[2] += 1
+
+    def time(self, **labels):
+        """Returns a context manager observing the seconds it was open."""
+        return _Timer(self, labels)
+
+    def count(self, **labels):
+        counts = self._values.get(_key(self.labels, labels))
+
+        return counts[2] if counts else 0
+
+    def samples(self):
+        """Returns (name, labels dict, value) tuples."""
+        with self._lock:
+            values = [(key, list(counts[0]), counts[1], counts[2])
+                      for key, counts in self._values.items()]
+
+        samples = []
+
+        for key, bucket_counts, total, count in values:
+            labels = dict(zip(self.labels, key))
+            cumulative = 0
+
+            for bound, bucket_count in zip((*self._buckets, float('inf')), bucket_counts):
+                cumulative += bucket_count
+                samples.append(
+                    (f'{self.name}_bucket', {**labels, 'le': _format(bound)}, cumulative)
+                )
+
+            samples.append((f'{self.name}_sum', labels, total))
+            samples.append((f'{self.name}_count', labels, count))
+
+        return samples
+
+class Gauge:
+    """Value read from a callback when the metrics are exposed, e.g. a
+    component's `stats()`. The callback returns a number, or a dict of
+    label value tuples to numbers."""
+
+    type = 'gauge'
+
+    def __init__(self, name, help_text, callback, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._callback = callback
+
+    def samples(self):
+        """Returns (name, labels dict, value) tuples."""
+        value = self._callback()
+
+        if not isinstance(value, dict):
+            return [(self.name, {}, value)]
+
+        return [(self.name, dict(zip(self.labels, key)), v) for key, v in value.items()]
+
+class MetricsRegistry:
+    """Named metrics of a process, see `expose`."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text, labels=()):
+        """Returns the counter `name`, creating it on first use."""
+        return self._get_or_create(Counter, name, help_text, labels)
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        """Returns the histogram `name`, creating it on first use."""
+        return self._get_or_create(Histogram, name, help_text, labels, buckets)
+
+    def gauge(self, name, help_text, callback, labels=()):
+        """Registers the gauge `name`, replacing a previous callback,
+        e.g. of a component that was built again."""
+        with self._lock:
+            self._metrics[name] = Gauge(name, help_text, callback, labels)
+
+        return self._metrics[name]
+
+    def expose(self):
+        """Returns all metrics in the Prometheus text format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except Exception as e:  # pylint:disable=broad-except
+                # A failing gauge must not hide the other metrics
+                logger.error(f'Unable to collect {metric.name}: {e!r}')
+                continue
+
+            lines.append(f'# HELP {metric.name} {metric.help_text}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(f'{name}{_format_labels(labels)} {_format(value)}'
+                         for name, labels, value in samples)
+
+        return '\n'.join(lines) + '\n'
+
+    def _get_or_create(self, metric_class, name, *args):
+        with self._lock:
+            metric = self._metrics.get(name)
+
+            if metric is None:
+                metric = self._metrics[name] = metric_class(name, *args)
+            elif not isinstance(metric, metric_class):
+                raise ValueError(f'Metric {name} is a {metric.type}')
+
+        return metric
+
+class MetricsServer:
+    """Serves `GET /metrics` of a registry on a background thread."""
+
+    def __init__(self, registry, host='0.0.0.0', port=9100):
+        registry_ = registry
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):  # pylint:disable=invalid-name
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+
+                body = registry_.expose().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name='metrics', daemon=True
+        )
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        self._thread.start()
+        logger.info(f'Serving metrics on port {self.port}')
+        return self
+
+    def shutdown(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+class _Timer:
+
+    def __init__(self, histogram, labels):
+        self._histogram = histogram
+        self._labels = labels
+        self._started = None
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._histogram.observe(time.perf_counter() - self._started, **self._labels)
+
+def _key(names, labels):
+    return tuple(str(labels[name]) for name in names)
+
+def _format(value):
+    if value == float('inf'):
+        return '+Inf'
+
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels.items()
+    )
+
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+# The process' registry
+metrics = MetricsRegistry()
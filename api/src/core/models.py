@@ -4,16 +4,35 @@
 MongoEngine model classes.
 """
 
-from mongoengine import Document, StringField, IntField
+import datetime
+
+from mongoengine import DateTimeField, Document, StringField, IntField
+
+ALERT_CONDITIONS = ('crosses_above', 'crosses_below')
 
 class Alert(Document):
-    meta = {'collection': 'alerts'}
+    """A price alert, triggered when the `indicator` of its candle stream
+    crosses `value`. `updated_at` is bumped by `save()` so subscription
+    sources can poll for changed alerts; bulk `QuerySet.update()` calls
+    must set it themselves."""
+
+    meta = {
+        'collection': 'alerts',
+        'indexes': ['updated_at']
+    }
 
     name = StringField(required=True)
     value = IntField(required=True, min_value=0, max_value=100)
     symbol = StringField(max_length=4, required=True)
     frequency = StringField(max_length=10, required=True)
     period = StringField(max_length=10, required=True)
+    indicator = StringField(max_length=20, default='rsi14')
+    condition = StringField(choices=ALERT_CONDITIONS, default='crosses_above')
+    updated_at = DateTimeField(default=datetime.datetime.utcnow)
+
+    def save(self, *args, **kwargs):
+        self.updated_at = datetime.datetime.utcnow()
+        return super().save(*args, **kwargs)
 
     def __str__(self):
         return (
@@ -21,6 +40,8 @@ class Alert(Document):
             f'value={self.value} '
             f'symbol={self.symbol} '
             f'frequency={self.frequency} '
-            f'period={self.period}'
+            f'period={self.period} '
+            f'indicator={self.indicator} '
+            f'condition={self.condition}'
             ' />'
         )
\ No newline at end of file
@@ -0,0 +1,209 @@
+"""
+On-demand sampling profiler for a running process.
+
+Once started, a background thread samples the stacks of all other
+threads every `interval_secs` for `duration_secs`, while `tracemalloc`
+traces the allocations. Then it writes to `output_dir`:
+
+* profile-<time>-<pid>.collapsed, one line per distinct stack with its
+  sample count, the input of flamegraph.pl or speedscope
+* allocations-<time>-<pid>.txt, the lines allocating the most memory
+  that was still held at the end
+
+It is started without a restart by a signal or a control Redis key:
+
+    profiler = SamplingProfiler('/tmp/profiles')
+    install_signal_trigger(profiler, signal.SIGUSR2)
+    RedisProfilerTrigger(redis_client, 'stock-producer:profile', profiler).start()
+
+    redis-cli SET stock-producer:profile 60  # profiles for 60s
+"""
+
+import collections
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+
+import redis
+
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+class SamplingProfiler:
+    """Samples the thread stacks of the process, one profile at a time."""
+
+    def __init__(self, output_dir, duration_secs=30, interval_secs=0.01,
+                 top_allocations=25, clock=time.time):
+        """
+        @param: output_dir Directory the profiles are written to
+        @param: duration_secs Default seconds a profile samples for
+        @param: interval_secs Seconds between samples
+        @param: top_allocations Number of lines in the allocations file
+        @param: clock Wall clock returning epoch seconds, for the file names
+        """
+        self._output_dir = output_dir
+        self._duration_secs = duration_secs
+        self._interval_secs = interval_secs
+        self._top_allocations = top_allocations
+        self._clock = clock
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration_secs=None):
+        """Starts a profile in the background, unless one is running.
+
+        @param: duration_secs Overrides the default duration
+        @return: whether a profile was started
+        """
+        with self._lock:
+            if self.running:
+                logger.warning('Profiler is already running')
+                return False
+
+            self._thread = threading.Thread(
+                target=self._profile,
+                args=(duration_secs or self._duration_secs,),
+                name='profiler',
+                daemon=True
+            )
+            self._thread.start()
+
+        return True
+
+    def join(self, timeout=None):
+        """Waits for the running profile to be written."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _profile(self, duration_secs):
+        logger.info(f'Profiling for {duration_secs}s')
+        tracing = tracemalloc.is_tracing()
+
+        if not tracing:
+            tracemalloc.start()
+
+        try:
+            stacks = self._sample(duration_secs)
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+
+        self._write(stacks, snapshot)
+
+    def _sample(self, duration_secs):
+        stacks = collections.Counter()
+        thread_names = {}
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + duration_secs
+
+        while time.monotonic() < deadline:
+            for thread in threading.enumerate():
+                thread_names[thread.ident] = thread.name
+
+            for thread_id, frame in sys._current_frames().items():  # pylint:disable=protected-access
+                if thread_id != own_id:
+                    stacks[_collapsed(thread_names.get(thread_id, thread_id), frame)] += 1
+
+            time.sleep(self._interval_secs)
+
+        return stacks
+
+    def _write(self, stacks, snapshot):
+        os.makedirs(self._output_dir, exist_ok=True)
+        suffix = f'{time.strftime("%Y%m%d-%H%M%S", time.gmtime(self._clock()))}-{os.getpid()}'
+        profile_path = os.path.join(self._output_dir, f'profile-{suffix}.collapsed')
+        allocations_path = os.path.join(self._output_dir, f'allocations-{suffix}.txt')
+
+        with open(profile_path, 'w', encoding='utf-8') as f:
+            f.writelines(f'{stack} {count}\n' for stack, count in stacks.most_common())
+
+        # Leaves out the tracing of tracemalloc itself
+        snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+
+        with open(allocations_path, 'w', encoding='utf-8') as f:
+            for statistic in snapshot.statistics('lineno')[:self._top_allocations]:
+                f.write(f'{statistic}\n')
+
+        logger.info(f'Profile written to {profile_path} and {allocations_path}')
+
+def _collapsed(thread_name, frame):
+    """Returns the stack of `frame`, outermost first, in the collapsed
+    format: frames separated by semicolons."""
+    frames = []
+
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+        frame = frame.f_back
+
+    return ';'.join([f'thread {thread_name}', *reversed(frames)])
+
+def install_signal_trigger(profiler, signum=signal.SIGUSR2):
+    """Starts a profile of the default duration whenever the process
+    receives `signum`. Must be called from the main thread."""
+    signal.signal(signum, lambda sig, frame: profiler.start())
+
+class RedisProfilerTrigger:
+    """Starts a profile when the control key is set, e.g. from another
+    host. The key is deleted when read, its value may set the duration
+    in seconds."""
+
+    def __init__(self, redis_client, key, profiler, poll_interval_secs=5):
+        """
+        @param: redis_client A `redis.Redis` client
+        @param: key The control key
+        @param: profiler The `SamplingProfiler` to start
+        @param: poll_interval_secs Seconds between reads of the key
+        """
+        self._redis_client = redis_client
+        self._key = key
+        self._profiler = profiler
+        self._poll_interval_secs = poll_interval_secs
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """Reads the control key once.
+
+        @return: whether a profile was started
+        """
+        value = self._redis_client.getdel(self._key)
+
+        if value is None:
+            return False
+
+        try:
+            duration_secs = float(value) if value.strip() else None
+        except ValueError:
+            logger.error(f'Invalid profile duration in {self._key}: {value!r}')
+            duration_secs = None
+
+        return self._profiler.start(duration_secs)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='profiler-trigger', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self._poll_interval_secs):
+            try:
+                self.poll()
+            except redis.exceptions.RedisError as e:
+                # Profiling must never take the producer down
+                logger.error(f'Unable to read {self._key}: {e!r}')
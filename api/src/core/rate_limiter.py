@@ -0,0 +1,123 @@
+"""
+Token bucket rate limiter.
+"""
+
+import threading
+import time
+
+class TokenBucketRateLimiter:
+    """Limits the rate of operations to `rate` per second while
+    allowing bursts of up to `capacity` operations.
+
+    The bucket refills continuously. Callers that find it empty reserve
+    their tokens ahead of time and sleep until the reservation comes
+    due, so waiting callers are served in order. Safe to share between
+    threads.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        """
+        @param: rate Tokens added per second
+        @param: capacity Max. tokens in the bucket, defaults to `rate`
+        @param: clock Monotonic clock returning seconds
+        @param: sleep Blocking sleep used by `acquire`
+        """
+        if rate <= 0:
+            raise ValueError(f'Rate must be positive: {rate}')
+
+        self._rate = float(rate)
+        self._capacity = float(capacity or rate)
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = self._capacity
+        self._updated_at = clock()
+        self._acquired_count = 0
+        self._waits_count = 0
+        self._wait_secs_total = 0.0
+
+    @property
+    def tokens_left(self):
+        """Tokens available right now, negative while callers wait."""
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    @property
+    def rate(self):
+        return self._rate
+
+    @rate.setter
+    def rate(self, rate):
+        """Changes the refill rate from now on, e.g. when the rate is
+        shared with a changing number of processes."""
+        if rate <= 0:
+            raise ValueError(f'Rate must be positive: {rate}')
+
+        with self._lock:
+            self._refill()
+            self._rate = float(rate)
+
+    @property
+    def wait_secs_total(self):
+        """Total time callers were told to wait for tokens."""
+        return self._wait_secs_total
+
+    def stats(self):
+        """Returns the limiter metrics as a dictionary."""
+        with self._lock:
+            self._refill()
+
+            return {
+                'tokens_left': self._tokens,
+                'acquired_count': self._acquired_count,
+                'waits_count': self._waits_count,
+                'wait_secs_total': self._wait_secs_total
+            }
+
+    def try_acquire(self, tokens=1):
+        """Takes `tokens` if available now. Returns whether it did."""
+        with self._lock:
+            self._refill()
+
+            if self._tokens < tokens:
+                return False
+
+            self._tokens -= tokens
+            self._acquired_count += tokens
+
+            return True
+
+    def acquire(self, tokens=1):
+        """Takes `tokens`, blocking the thread until they are available.
+        Returns the number of seconds waited."""
+        wait_secs = self._reserve(tokens)
+
+        if wait_secs > 0:
+            self._sleep(wait_secs)
+
+        return wait_secs
+
+    def _reserve(self, tokens):
+        if tokens > self._capacity:
+            raise ValueError(f'Cannot acquire {tokens} tokens, capacity is {self._capacity}')
+
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            self._acquired_count += tokens
+
+            if self._tokens >= 0:
+                return 0.0
+
+            wait_secs = -self._tokens / self._rate
+            self._waits_count += 1
+            self._wait_secs_total += wait_secs
+
+            return wait_secs
+
+    def _refill(self):
+        now = self._clock()
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        self._tokens = min(self._capacity, self._tokens + elapsed * self._rate)
@@ -0,0 +1,180 @@
+"""
+Drift-free tick scheduler.
+
+Ticks fire on absolute deadlines instead of sleeping a fixed time after
+the previous tick's work, so the time spent fetching and publishing
+does not push the following ticks back. Deadlines are aligned to
+wall-clock multiples of the cadence, e.g. on whole seconds for a 1s
+cadence, and then advance on the monotonic clock.
+
+Each group, e.g. the subscriptions of one frequency unit, has its own
+cadence:
+
+    scheduler = TickScheduler({'minute': 1, 'daily': 5})
+    time.sleep(scheduler.delay())
+    groups = scheduler.due()
+"""
+
+import math
+import time
+
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+class TickScheduler:
+    """Tracks the next deadline of every group."""
+
+    def __init__(self, cadences, late_tolerance_secs=0.25, clock=time.time,
+                 monotonic=time.monotonic):
+        """
+        @param: cadences dict of group to seconds between its ticks, a
+                group with cadence 0 is due on every call
+        @param: late_tolerance_secs A tick firing later than this past
+                its deadline is recorded as late
+        @param: clock Wall clock returning epoch seconds, for the alignment
+        @param: monotonic Monotonic clock returning seconds
+        """
+        self._cadences = dict(cadences)
+        self._late_tolerance_secs = late_tolerance_secs
+        self._monotonic = monotonic
+        self._ticks = 0
+        self._late_ticks = 0
+        self._skipped_ticks = 0
+        self._max_lateness_secs = 0.0
+
+        wall_now, now = clock(), monotonic()
+        self._deadlines = {
+            group: now + (_next_boundary(wall_now, cadence) - wall_now if cadence > 0 else 0)
+            for group, cadence in self._cadences.items()
+        }
+
+    def delay(self):
+        """Returns the seconds until the next deadline of any group."""
+        if not self._deadlines:
+            return 0.0
+
+        return max(0.0, min(self._deadlines.values()) - self._monotonic())
+
+    def due(self):
+        """Returns the set of groups whose deadline passed and moves
+        their deadlines on by their cadence. Ticks missed entirely are
+        skipped, not fired in a burst."""
+        now = self._monotonic()
+        due = set()
+
+        for group, deadline in self._deadlines.items():
+            if deadline > now:
+                continue
+
+            due.add(group)
+            cadence = self._cadences[group]
+
+            if cadence <= 0:
+                self._deadlines[group] = now
+                continue
+
+            lateness = now - deadline
+            missed = math.floor(lateness / cadence)
+            self._deadlines[group] = deadline + (missed + 1) * cadence
+            self._record(group, lateness, missed)
+
+        return due
+
+    def stats(self):
+        """@return: dict with the number of ticks fired, fired late and
+                    skipped, and the max. lateness in seconds"""
+        return {
+            'ticks': self._ticks,
+            'late_ticks': self._late_ticks,
+            'skipped_ticks': self._skipped_ticks,
+            'max_lateness_secs': self._max_lateness_secs
+        }
+
+    def _record(self, group, lateness, missed):
+        self._ticks += 1
+        self._skipped_ticks += missed
+        self._max_lateness_secs = max(self._max_lateness_secs, lateness)
+
+        if lateness > self._late_tolerance_secs:
+            self._late_ticks += 1
+            logger.warning(f'{group} tick fired {lateness * 1000:.0f} ms late, skipped {missed}')
+
+def _next_boundary(timestamp, cadence):
+    """Returns the first multiple of `cadence` after `timestamp`."""
+    return (math.floor(timestamp / cadence) + 1) * cadence
+
+class SessionTickScheduler:
+    """`TickScheduler` whose cadences follow the market sessions of a
+    `MarketCalendar`, e.g. slower in pre-market and after hours. A
+    session without cadences idles: nothing is due until the next one
+    opens, and `delay` returns at most `idle_check_secs` so the caller
+    keeps up with other work meanwhile."""
+
+    def __init__(self, calendar, cadences_by_session, late_tolerance_secs=0.25,
+                 idle_check_secs=5, clock=time.time, monotonic=time.monotonic):
+        """
+        @param: calendar A `MarketCalendar`
+        @param: cadences_by_session dict of `MarketSession` value to the
+                cadences of a `TickScheduler`, missing sessions idle
+        @param: idle_check_secs Max. delay returned while idling
+        """
+        self._calendar = calendar
+        self._cadences_by_session = cadences_by_session
+        self._late_tolerance_secs = late_tolerance_secs
+        self._idle_check_secs = idle_check_secs
+        self._clock = clock
+        self._monotonic = monotonic
+        self._session = None
+        self._scheduler = None
+        self._session_opened = False
+
+    def delay(self):
+        """See `TickScheduler.delay`."""
+        now = self._clock()
+
+        if self._scheduler_for(self._calendar.session(now)) is not None:
+            return self._scheduler.delay()
+
+        next_open = self._calendar.next_open(now)
+
+        if next_open is None:
+            return self._idle_check_secs
+
+        return min(self._idle_check_secs, max(0.0, next_open - now))
+
+    def due(self):
+        """See `TickScheduler.due`."""
+        if self._scheduler_for(self._calendar.session(self._clock())) is None:
+            return set()
+
+        return self._scheduler.due()
+
+    def session_opened(self):
+        """Returns whether a session opened after idling since the
+        previous call, e.g. to backfill what was missed."""
+        session_opened, self._session_opened = self._session_opened, False
+
+        return session_opened
+
+    def stats(self):
+        """See `TickScheduler.stats`, of the current session."""
+        return self._scheduler.stats() if self._scheduler is not None else {}
+
+    def _scheduler_for(self, session):
+        if session == self._session:
+            return self._scheduler
+
+        cadences = self._cadences_by_session.get(session)
+        was_idle = self._session is not None and self._scheduler is None
+
+        logger.info(f'Market session {session}, '
+                    f'{"idling" if not cadences else f"cadences {cadences}"}')
+        self._session = session
+        # Realigned to the new cadences
+        self._scheduler = TickScheduler(
+            cadences, self._late_tolerance_secs, self._clock, self._monotonic
+        ) if cadences else None
+        self._session_opened = self._session_opened or (was_idle and self._scheduler is not None)
+
+        return self._scheduler
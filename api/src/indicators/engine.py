@@ -0,0 +1,108 @@
+"""
+Indicator state per candle stream.
+"""
+
+import math
+
+import numpy as np
+
+from candles.store import candle_window
+from indicators.indicators import parse_indicator
+from messaging.messages import MessageType
+
+class IndicatorEngine:
+    """Computes a set of indicators over one candle stream.
+
+    The history is computed in one batch. Live candles then update every
+    indicator in O(1): updates of the open candle are previewed, and
+    the open candle is committed once it closes or a newer one starts.
+    """
+
+    def __init__(self, indicator_names):
+        """
+        @param: indicator_names Names as understood by `parse_indicator`
+        """
+        self._indicator_names = tuple(indicator_names)
+        self._indicators = {}
+        self._open_candle = None
+        self.values = {}
+        self.bootstrap(())
+
+    def bootstrap(self, candles):
+        """Resets the indicators to a price history.
+
+        @param: candles Tuple of `Candle`, the last one may still be open
+        @return: dict of indicator name to an array of its value per candle
+        """
+        self._indicators = {name: parse_indicator(name) for name in self._indicator_names}
+        self._open_candle = candles[-1] if candles else None
+        window = candle_window(candles[:-1])
+        series = {name: indicator.batch(window) for name, indicator in self._indicators.items()}
+
+        if self._open_candle is None:
+            self.values = {name: math.nan for name in self._indicators}
+            return series
+
+        self.values = {name: indicator.preview(self._open_candle)
+                       for name, indicator in self._indicators.items()}
+
+        return {name: np.append(values, self.values[name]) for name, values in series.items()}
+
+    def update(self, candle, closed):
+        """Updates the indicators with a live candle and returns their
+        values as a dict of indicator name to float (NaN while warming
+        up). Candles older than the open one are ignored."""
+        if self._open_candle is not None:
+            if candle.datetime < self._open_candle.datetime:
+                return self.values
+
+            if candle.datetime > self._open_candle.datetime:
+                for indicator in self._indicators.values():
+                    indicator.commit(self._open_candle)
+
+        if closed:
+            self.values = {name: indicator.commit(candle)
+                           for name, indicator in self._indicators.items()}
+            self._open_candle = None
+        else:
+            self.values = {name: indicator.preview(candle)
+                           for name, indicator in self._indicators.items()}
+            self._open_candle = candle
+
+        return self.values
+
+class IndicatorStreams:
+    """One `IndicatorEngine` per (symbol, frequency, period) stream, so
+    that alerts on the same stream share the computation."""
+
+    def __init__(self, indicator_names):
+        self._indicator_names = tuple(indicator_names)
+        self._engines = {}
+
+    def apply(self, stream, message):
+        """Feeds a published `Message` of `stream` to its engine and
+        returns the latest indicator values, or None while the stream's
+        price history has not been received."""
+        if message.type == MessageType.PRICE_HISTORY.value:
+            engine = self._engines.setdefault(stream, IndicatorEngine(self._indicator_names))
+            engine.bootstrap(message.candles)
+            return engine.values
+
+        if stream not in self._engines:
+            return None
+
+        closed = message.type == MessageType.CANDLE_CLOSED.value
+
+        for candle in message.candles:
+            self._engines[stream].update(candle, closed)
+
+        return self._engines[stream].values
+
+    def values(self, stream):
+        """Returns the latest indicator values of `stream` or None."""
+        engine = self._engines.get(stream)
+
+        return engine.values if engine else None
+
+    def remove(self, stream):
+        self._engines.pop(stream, None)
@@ -0,0 +1,2 @@
+class UnknownIndicatorError(Exception):
+    """Raised when an indicator name cannot be parsed."""
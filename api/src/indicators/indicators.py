@@ -0,0 +1,314 @@
+"""
+Technical indicators computed over candle series.
+
+Every indicator computes its values for a whole history at once with
+NumPy (`batch`) and then follows the live candles in O(1): `preview`
+returns the value with the open candle as the newest one, `commit`
+does the same and makes the candle part of the state once it closed.
+
+Indicators are named by their kind and lengths, e.g. sma20, ema50,
+rsi14, stoch14 (%K) or stoch14_3 (%D, the 3-candle mean of %K).
+"""
+
+import math
+import re
+
+from collections import deque
+
+import numpy as np
+
+from indicators.exceptions import UnknownIndicatorError
+
+# Smoothing is vectorized in chunks short enough for the decay powers
+# to stay within float64 range
+SMOOTHING_CHUNK_SIZE = 64
+
+class RollingMean:
+    """Mean of the last `length` values."""
+
+    def __init__(self, length):
+        self._length = length
+        self._values = deque(maxlen=length)
+        self._sum = 0.0
+
+    def batch(self, values):
+        means = np.full(len(values), np.nan)
+
+        if len(values) >= self._length:
+            sums = np.cumsum(np.concatenate(([0.0], values)))
+            means[self._length - 1:] = (sums[self._length:] - sums[:-self._length]) / self._length
+
+        self._values = deque(values[-self._length:].tolist(), maxlen=self._length)
+        self._sum = sum(self._values)
+
+        return means
+
+    def preview(self, value):
+        if len(self._values) == self._length:
+            return (self._sum - self._values[0] + value) / self._length
+
+        if len(self._values) == self._length - 1:
+            return (self._sum + value) / self._length
+
+        return math.nan
+
+    def commit(self, value):
+        mean = self.preview(value)
+
+        if len(self._values) == self._length:
+            self._sum -= self._values[0]
+
+        self._values.append(value)
+        self._sum += value
+
+        return mean
+
+class ExponentialSmoothing:
+    """Exponential smoothing with factor `alpha`, seeded with the mean
+    of the first `length` values."""
+
+    def __init__(self, length, alpha):
+        self._length = length
+        self._alpha = alpha
+        self._count = 0  # values seen, up to length
+        self._seed_sum = 0.0
+        self._value = math.nan
+
+    def batch(self, values):
+        smoothed = np.full(len(values), np.nan)
+
+        if len(values) < self._length:
+            self._count, self._seed_sum = len(values), float(np.sum(values))
+            return smoothed
+
+        smoothed[self._length - 1] = np.mean(values[:self._length])
+        smoothed[self._length:] = _smooth(
+            values[self._length:], self._alpha, smoothed[self._length - 1]
+        )
+        self._count, self._value = self._length, float(smoothed[-1])
+
+        return smoothed
+
+    def preview(self, value):
+        if self._count == self._length:
+            return self._value + self._alpha * (value - self._value)
+
+        if self._count == self._length - 1:
+            return (self._seed_sum + value) / self._length
+
+        return math.nan
+
+    def commit(self, value):
+        smoothed = self.preview(value)
+
+        if self._count < self._length:
+            self._count += 1
+            self._seed_sum += value
+
+        if self._count == self._length:
+            self._value = smoothed
+
+        return smoothed
+
+class SMA:
+    """Simple moving average of the close."""
+
+    def __init__(self, length):
+        self._mean = RollingMean(length)
+
+    def batch(self, window):
+        return self._mean.batch(window.close)
+
+    def preview(self, candle):
+        return self._mean.preview(candle.close)
+
+    def commit(self, candle):
+        return self._mean.commit(candle.close)
+
+class EMA:
+    """Exponential moving average of the close."""
+
+    def __init__(self, length):
+        self._smoothing = ExponentialSmoothing(length, 2 / (length + 1))
+
+    def batch(self, window):
+        return self._smoothing.batch(window.close)
+
+    def preview(self, candle):
+        return self._smoothing.preview(candle.close)
+
+    def commit(self, candle):
+        return self._smoothing.commit(candle.close)
+
+class RSI:
+    """Relative strength index (0-100) with Wilder's smoothing."""
+
+    def __init__(self, length):
+        self._gains = ExponentialSmoothing(length, 1 / length)
+        self._losses = ExponentialSmoothing(length, 1 / length)
+        self._last_close = None
+
+    def batch(self, window):
+        values = np.full(len(window.close), np.nan)
+
+        if len(window.close) == 0:
+            return values
+
+        changes = np.diff(window.close)
+        values[1:] = _rsi(
+            self._gains.batch(np.maximum(changes, 0.0)),
+            self._losses.batch(np.maximum(-changes, 0.0))
+        )
+        self._last_close = float(window.close[-1])
+
+        return values
+
+    def preview(self, candle):
+        return self._update(candle, commit=False)
+
+    def commit(self, candle):
+        value = self._update(candle, commit=True)
+        self._last_close = candle.close
+
+        return value
+
+    def _update(self, candle, commit):
+        if self._last_close is None:
+            return math.nan
+
+        change = candle.close - self._last_close
+        update_gains = self._gains.commit if commit else self._gains.preview
+        update_losses = self._losses.commit if commit else self._losses.preview
+
+        return float(_rsi(
+            np.float64(update_gains(max(change, 0.0))),
+            np.float64(update_losses(max(-change, 0.0)))
+        ))
+
+class Stochastic:
+    """Stochastic oscillator (0-100): %K over `k_length` candles, or
+    %D, its mean over `d_length` candles, if `d_length` > 1."""
+
+    def __init__(self, k_length, d_length=1):
+        self._k_length = k_length
+        self._mean = RollingMean(d_length)
+        # Monotonic deques of (index, value) over the last k_length - 1 candles
+        self._highs = deque()
+        self._lows = deque()
+        self._index = 0
+
+    def batch(self, window):
+        count = len(window.close)
+        k_values = np.full(count, np.nan)
+
+        if count >= self._k_length:
+            sliding_window_view = np.lib.stride_tricks.sliding_window_view
+            highest = sliding_window_view(window.high, self._k_length).max(axis=1)
+            lowest = sliding_window_view(window.low, self._k_length).min(axis=1)
+            k_values[self._k_length - 1:] = _percent_k(
+                window.close[self._k_length - 1:], highest, lowest
+            )
+
+        self._highs, self._lows, self._index = deque(), deque(), 0
+
+        for high, low in zip(window.high[-(self._k_length - 1) or count:].tolist(),
+                             window.low[-(self._k_length - 1) or count:].tolist()):
+            self._push(high, low)
+
+        values = np.full(count, np.nan)
+        values[self._k_length - 1:] = self._mean.batch(k_values[self._k_length - 1:])
+
+        return values
+
+    def preview(self, candle):
+        k_value = self._k_value(candle)
+
+        return math.nan if math.isnan(k_value) else self._mean.preview(k_value)
+
+    def commit(self, candle):
+        k_value = self._k_value(candle)
+        self._push(candle.high, candle.low)
+
+        return math.nan if math.isnan(k_value) else self._mean.commit(k_value)
+
+    def _k_value(self, candle):
+        if self._index < self._k_length - 1:
+            return math.nan
+
+        highest = max(self._highs[0][1], candle.high) if self._highs else candle.high
+        lowest = min(self._lows[0][1], candle.low) if self._lows else candle.low
+
+        return float(_percent_k(np.float64(candle.close), np.float64(highest), np.float64(lowest)))
+
+    def _push(self, high, low):
+        window_size = self._k_length - 1
+
+        if window_size == 0:
+            self._index += 1
+            return
+
+        while self._highs and self._highs[-1][1] <= high:
+            self._highs.pop()
+        while self._lows and self._lows[-1][1] >= low:
+            self._lows.pop()
+
+        self._highs.append((self._index, high))
+        self._lows.append((self._index, low))
+        self._index += 1
+
+        while self._highs[0][0] <= self._index - 1 - window_size:
+            self._highs.popleft()
+        while self._lows[0][0] <= self._index - 1 - window_size:
+            self._lows.popleft()
+
+INDICATORS = {
+    'sma': SMA,
+    'ema': EMA,
+    'rsi': RSI,
+    'stoch': Stochastic
+}
+
+def parse_indicator(name):
+    """Returns a new indicator for a name such as 'rsi14'."""
+    match = re.fullmatch(r'([a-z]+)(\d+)(?:_(\d+))?', name)
+
+    if match is None or match.group(1) not in INDICATORS:
+        raise UnknownIndicatorError(f'Indicator: {name}')
+
+    lengths = [int(length) for length in match.groups()[1:] if length is not None]
+
+    if min(lengths) < 1 or (len(lengths) > 1 and match.group(1) != 'stoch'):
+        raise UnknownIndicatorError(f'Indicator: {name}')
+
+    return INDICATORS[match.group(1)](*lengths)
+
+def _smooth(values, alpha, start):
+    """Vectorized s[t] = s[t-1] + alpha * (values[t] - s[t-1]), s[-1] = start."""
+    decay = 1 - alpha
+
+    if decay == 0:
+        return values.astype(np.float64)
+
+    smoothed = np.empty(len(values))
+
+    for i in range(0, len(values), SMOOTHING_CHUNK_SIZE):
+        chunk = values[i:i + SMOOTHING_CHUNK_SIZE]
+        powers = decay ** np.arange(1, len(chunk) + 1)
+        smoothed[i:i + len(chunk)] = powers * (start + alpha * np.cumsum(chunk / powers))
+        start = smoothed[i + len(chunk) - 1]
+
+    return smoothed
+
+def _rsi(average_gains, average_losses):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - 100 / (1 + average_gains / average_losses)
+
+    rsi = np.where(average_losses == 0, np.where(average_gains == 0, 50.0, 100.0), rsi)
+
+    return np.where(np.isnan(average_gains) | np.isnan(average_losses), np.nan, rsi)
+
+def _percent_k(close, highest, lowest):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k_values = 100 * (close - lowest) / (highest - lowest)
+
+    return np.where(highest == lowest, 50.0, k_values)
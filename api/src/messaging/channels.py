@@ -0,0 +1,11 @@
+"""
+Names of the Redis channels the producer publishes to.
+"""
+
+SYMBOL_CHANNEL_PATTERN = 'symbol-*'
+
+def channel_name(subscription):
+    """Returns the channel of a (symbol, frequency, period) subscription."""
+    symbol, frequency, period = subscription
+
+    return f'symbol-{symbol}-{frequency}-{period}'
@@ -0,0 +1,167 @@
+"""
+Encoders and decoders of the published messages.
+
+Producers and consumers must use the same wire format, which is
+selected per deployment by `Messaging.WireFormat`:
+
+    codec = CodecFactory().build()
+    message = codec.decode(payload)
+"""
+
+import json
+import struct
+
+from core import config
+from core.utils import ExtendedEnum
+from messaging.exceptions import MessageDecodeError
+from messaging.exceptions import UnknownWireFormatError
+from messaging.exceptions import UnsupportedMessageVersionError
+from messaging.messages import Candle, Message, MessageType, SUPPORTED_WIRE_FORMAT_VERSIONS
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+class WireFormat(ExtendedEnum):
+    JSON = 'json'
+    MSGPACK = 'msgpack'
+    STRUCT = 'struct'
+
+class JsonCodec:
+    """Compact single-encoded JSON:
+
+        {"v":2,"t":"candle_update","ts":1709791220414,"s":42,"c":[[datetime,o,h,l,c,v]]}
+    """
+
+    def encode(self, message):
+        return json.dumps(_to_dict(message), separators=(',', ':')).encode('utf-8')
+
+    def decode(self, payload):
+        try:
+            return _from_dict(json.loads(payload))
+        except (ValueError, KeyError, TypeError) as e:
+            raise MessageDecodeError(str(e)) from e
+
+class MsgpackCodec:
+    """The `JsonCodec` structure packed with MessagePack. Requires the
+    optional `msgpack` package."""
+
+    def __init__(self):
+        if msgpack is None:
+            raise UnknownWireFormatError('The msgpack wire format requires the msgpack package.')
+
+    def encode(self, message):
+        return msgpack.packb(_to_dict(message))
+
+    def decode(self, payload):
+        try:
+            return _from_dict(msgpack.unpackb(payload))
+        except (ValueError, KeyError, TypeError, msgpack.UnpackException) as e:
+            raise MessageDecodeError(str(e)) from e
+
+class StructCodec:
+    """Fixed little-endian binary layout:
+
+        header: version u8, type u8, timestamp i64, candle count u32, sequence u64
+        candle: datetime i64, open f64, high f64, low f64, close f64, volume i64
+
+    Version 1 headers have no sequence.
+    """
+
+    HEADER = struct.Struct('<BBqIQ')
+    HEADER_V1 = struct.Struct('<BBqI')
+    CANDLE = struct.Struct('<qddddq')
+
+    TYPE_CODES = {
+        MessageType.PRICE_HISTORY.value: 1,
+        MessageType.CANDLE_UPDATE.value: 2,
+        MessageType.CANDLE_CLOSED.value: 3,
+        MessageType.SNAPSHOT.value: 4
+    }
+
+    TYPES = {code: message_type for message_type, code in TYPE_CODES.items()}
+
+    def encode(self, message):
+        if message.version == 1:
+            header = StructCodec.HEADER_V1.pack(
+                message.version,
+                StructCodec.TYPE_CODES[message.type],
+                message.timestamp,
+                len(message.candles)
+            )
+        else:
+            header = StructCodec.HEADER.pack(
+                message.version,
+                StructCodec.TYPE_CODES[message.type],
+                message.timestamp,
+                len(message.candles),
+                message.sequence
+            )
+
+        return header + b''.join(StructCodec.CANDLE.pack(*c) for c in message.candles)
+
+    def decode(self, payload):
+        try:
+            version = payload[0]
+            _check_version(version)
+
+            if version == 1:
+                version, type_code, timestamp, count = StructCodec.HEADER_V1.unpack_from(payload)
+                sequence, header_size = 0, StructCodec.HEADER_V1.size
+            else:
+                version, type_code, timestamp, count, sequence = \
+                    StructCodec.HEADER.unpack_from(payload)
+                header_size = StructCodec.HEADER.size
+
+            candles = tuple(
+                Candle(*c)
+                for c in StructCodec.CANDLE.iter_unpack(payload[header_size:])
+            )
+        except (struct.error, IndexError) as e:
+            raise MessageDecodeError(str(e)) from e
+
+        if len(candles) != count or type_code not in StructCodec.TYPES:
+            raise MessageDecodeError(f'Malformed message header: {type_code}, {count}')
+
+        return Message(StructCodec.TYPES[type_code], timestamp, candles, version, sequence)
+
+class CodecFactory:
+
+    def build(self, wire_format=None):
+        wire_format = wire_format or config.Messaging.WireFormat
+
+        if wire_format == WireFormat.JSON.value:
+            return JsonCodec()
+
+        if wire_format == WireFormat.MSGPACK.value:
+            return MsgpackCodec()
+
+        if wire_format == WireFormat.STRUCT.value:
+            return StructCodec()
+
+        raise UnknownWireFormatError(f'Wire format: {wire_format}')
+
+def _to_dict(message):
+    return {
+        'v': message.version,
+        't': message.type,
+        'ts': message.timestamp,
+        's': message.sequence,
+        'c': [list(c) for c in message.candles]
+    }
+
+def _from_dict(message_dict):
+    _check_version(message_dict['v'])
+
+    return Message(
+        message_dict['t'],
+        message_dict['ts'],
+        tuple(Candle(*c) for c in message_dict['c']),
+        message_dict['v'],
+        message_dict.get('s', 0)
+    )
+
+def _check_version(version):
+    if version not in SUPPORTED_WIRE_FORMAT_VERSIONS:
+        raise UnsupportedMessageVersionError(f'Version: {version}')
@@ -0,0 +1,74 @@
+"""
+Suppresses candle updates that would not tell consumers anything new.
+
+Illiquid symbols and after-hours quotes often leave a channel's open
+candle unchanged from one tick to the next. Such an update is only
+published as a heartbeat, once every `heartbeat_secs`, so consumers can
+still tell a quiet channel from a dead one. Price histories and closed
+candles are always published.
+"""
+
+import time
+
+from core.logging import get_logger
+from messaging.messages import MessageType
+
+logger = get_logger(__name__)
+
+class Conflator:
+    """Remembers the last published candles of every channel."""
+
+    def __init__(self, heartbeat_secs=30, report_interval_secs=60, clock=time.monotonic):
+        """
+        @param: heartbeat_secs Max. seconds an unchanged channel stays silent
+        @param: report_interval_secs Seconds between logging the suppression ratio
+        """
+        self._heartbeat_secs = heartbeat_secs
+        self._report_interval_secs = report_interval_secs
+        self._clock = clock
+        self._last_published = {}
+        self._updates = 0
+        self._suppressed = 0
+        self._next_report_at = clock() + report_interval_secs
+
+    def admit(self, key, message):
+        """Returns whether the `message` of channel `key` is to be published."""
+        now = self._clock()
+
+        if message.type == MessageType.CANDLE_UPDATE.value:
+            self._updates += 1
+            last_published = self._last_published.get(key)
+
+            if (last_published is not None
+                    and last_published[0] == message.candles
+                    and now - last_published[1] < self._heartbeat_secs):
+                self._suppressed += 1
+                return False
+
+        self._last_published[key] = (message.candles[-1:], now)
+
+        return True
+
+    def remove(self, key):
+        self._last_published.pop(key, None)
+
+    def stats(self):
+        """@return: dict with the number of candle updates seen, the
+                    number suppressed and their ratio since the start"""
+        return {
+            'updates': self._updates,
+            'suppressed': self._suppressed,
+            'suppression_ratio': self._suppressed / self._updates if self._updates else 0.0
+        }
+
+    def report(self):
+        """Logs the suppression ratio at most once per `report_interval_secs`."""
+        if self._clock() < self._next_report_at:
+            return
+
+        self._next_report_at = self._clock() + self._report_interval_secs
+        stats = self.stats()
+        logger.info(
+            f'Conflation suppressed {stats["suppressed"]} of {stats["updates"]} '
+            f'candle updates ({stats["suppression_ratio"]:.1%})'
+        )
@@ -0,0 +1,8 @@
+class UnknownWireFormatError(Exception):
+    """Raised when the configured wire format is unknown."""
+
+class UnsupportedMessageVersionError(Exception):
+    """Raised when decoding a message of an unknown format version."""
+
+class MessageDecodeError(Exception):
+    """Raised when a payload is not a valid message."""
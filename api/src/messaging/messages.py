@@ -0,0 +1,73 @@
+"""
+Messages published to the symbol channels.
+
+A message carries only what alert evaluation needs: the OHLCV candles
+and the time of the newest market data. The symbol, frequency and
+period are part of the channel name.
+
+Each channel numbers its messages, so that consumers can detect missed
+ones by a gap in `sequence` and recover from the snapshot of the series,
+see `stock_publishers.redis_snapshots`.
+"""
+
+from typing import NamedTuple
+
+from core.utils import ExtendedEnum
+
+WIRE_FORMAT_VERSION = 2
+SUPPORTED_WIRE_FORMAT_VERSIONS = (1, 2)  # version 1 has no sequence
+
+class MessageType(ExtendedEnum):
+    PRICE_HISTORY = 'history'
+    CANDLE_UPDATE = 'candle_update'  # the open candle changed
+    CANDLE_CLOSED = 'candle_closed'  # the candle is final
+    SNAPSHOT = 'snapshot'  # the series was (re)loaded into its snapshot, without candles
+
+class Candle(NamedTuple):
+    datetime: int  # epoch ms
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: int
+
+class Message(NamedTuple):
+    type: str  # MessageType value
+    timestamp: int  # epoch ms of the newest market data
+    candles: tuple  # of Candle
+    version: int = WIRE_FORMAT_VERSION
+    sequence: int = 0  # per channel, 0 if unnumbered
+
+def price_history_message(price_history_ohlcv):
+    """Returns the message for a stock provider price history response."""
+    candles = tuple(
+        Candle(
+            c['datetime'],
+            c['open'],
+            c['high'],
+            c['low'],
+            c['close'],
+            int(c['volume'])
+        )
+        for c in price_history_ohlcv['candles']
+    )
+
+    return history_message(candles)
+
+def history_message(candles):
+    """Returns the price history message of a tuple of `Candle`."""
+    return Message(
+        MessageType.PRICE_HISTORY.value,
+        candles[-1].datetime if candles else 0,
+        candles
+    )
+
+def candle_message(message_type, candle, timestamp):
+    """Returns the message for a live `candle` built from a quote at
+    `timestamp`."""
+    return Message(message_type, timestamp, (candle,))
+
+def snapshot_message(history):
+    """Returns the message announcing that the snapshot of a channel was
+    replaced by the `history` message."""
+    return Message(MessageType.SNAPSHOT.value, history.timestamp, (), sequence=history.sequence)
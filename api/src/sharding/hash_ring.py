@@ -0,0 +1,40 @@
+"""
+Consistent hash ring.
+"""
+
+import hashlib
+
+from bisect import bisect
+
+class HashRing:
+    """Maps keys to members so that a member joining or leaving moves
+    only the keys it gains or loses, about 1/N of them.
+
+    Each member is placed at `virtual_nodes` points of the ring to
+    even out the share of keys per member. Hashes are stable across
+    processes, so all members agree on the owners.
+    """
+
+    def __init__(self, members=(), virtual_nodes=64):
+        self._members = tuple(sorted(set(members)))
+        points = sorted(
+            (_hash(f'{member}#{i}'), member)
+            for member in self._members
+            for i in range(virtual_nodes)
+        )
+        self._hashes = [h for h, _ in points]
+        self._owners = [member for _, member in points]
+
+    @property
+    def members(self):
+        return self._members
+
+    def owner(self, key):
+        """Returns the member owning `key` or None if the ring is empty."""
+        if not self._hashes:
+            return None
+
+        return self._owners[bisect(self._hashes, _hash(key)) % len(self._hashes)]
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
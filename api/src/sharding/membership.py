@@ -0,0 +1,43 @@
+"""
+Worker membership of a shard group, kept in Redis.
+"""
+
+import time
+
+class RedisMembership:
+    """Members of a group hold leases in a Redis sorted set, scored by
+    their expiry time. A member renews its lease with every heartbeat;
+    members whose lease expired are considered dead and removed."""
+
+    def __init__(self, redis_client, group, worker_id, lease_secs, clock=time.time):
+        """
+        @param: group Name of the group, e.g. stock-producer
+        @param: worker_id Unique id of this member
+        @param: lease_secs Seconds a heartbeat keeps this member alive
+        @param: clock Wall clock, shared by all members' hosts
+        """
+        self._redis_client = redis_client
+        self._key = f'{group}:members'
+        self._worker_id = worker_id
+        self._lease_secs = lease_secs
+        self._clock = clock
+
+    @property
+    def worker_id(self):
+        return self._worker_id
+
+    def heartbeat(self):
+        """Renews this member's lease and returns the sorted ids of the
+        live members."""
+        now = self._clock()
+        pipeline = self._redis_client.pipeline(transaction=True)
+        pipeline.zadd(self._key, {self._worker_id: now + self._lease_secs})
+        pipeline.zremrangebyscore(self._key, '-inf', now)
+        pipeline.zrange(self._key, 0, -1)
+        members = pipeline.execute()[-1]
+
+        return sorted(m.decode('utf-8') if isinstance(m, bytes) else m for m in members)
+
+    def leave(self):
+        """Gives up this member's lease right away."""
+        self._redis_client.zrem(self._key, self._worker_id)
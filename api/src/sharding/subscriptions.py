@@ -0,0 +1,141 @@
+"""
+Shard of the subscriptions owned by one producer worker.
+"""
+
+import threading
+import time
+
+import redis
+
+from core.logging import get_logger
+from sharding.hash_ring import HashRing
+from stock_subscriptions_sources.subscription_index import SubscriptionChanges
+from stock_subscriptions_sources.subscription_index import SubscriptionIndex
+
+logger = get_logger(__name__)
+
+class ShardedSubscriptions:
+    """Subscriptions source wrapper passing on only the subscriptions
+    whose symbol this worker owns on a consistent hash ring of the live
+    workers.
+
+    Membership is renewed with a heartbeat from `subscription_changes`
+    and, once started, from a background thread so that the lease does
+    not expire while the producer blocks, e.g. on its first bootstrap.
+    When workers join or die the ring changes, and the subscriptions
+    this worker gains or loses are reported as added or removed like
+    any other change. The provider rate limit is split evenly between
+    the live workers.
+    """
+
+    def __init__(self, subscriptions_source, membership, heartbeat_interval_secs,
+                 virtual_nodes=64, rate_limiter=None, total_rate=None,
+                 clock=time.monotonic):
+        """
+        @param: subscriptions_source The unsharded subscriptions source
+        @param: membership A `RedisMembership` of the producer workers
+        @param: heartbeat_interval_secs Seconds between lease renewals,
+                                        well below the lease duration
+        @param: rate_limiter The provider's `TokenBucketRateLimiter`
+        @param: total_rate Requests per second shared by all workers
+        """
+        self._subscriptions_source = subscriptions_source
+        self._membership = membership
+        self._heartbeat_interval_secs = heartbeat_interval_secs
+        self._virtual_nodes = virtual_nodes
+        self._rate_limiter = rate_limiter
+        self._total_rate = total_rate
+        self._clock = clock
+        self._subscription_index = SubscriptionIndex()
+        self._ring = HashRing([membership.worker_id], virtual_nodes)
+        self._owned = {}
+        self._members = None  # as of the last heartbeat
+        self._next_heartbeat_at = 0
+        self._heartbeat_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts renewing the lease in the background."""
+        self._thread = threading.Thread(target=self._run, name='shard-heartbeat', daemon=True)
+        self._thread.start()
+        return self
+
+    def subscription_changes(self):
+        """Returns the `SubscriptionChanges` of this worker's shard since
+        the previous call. Every subscription is reported once, however
+        many alerts share it."""
+        if hasattr(self._subscriptions_source, 'subscription_changes'):
+            added, removed = self._subscription_index.apply(
+                self._subscriptions_source.subscription_changes()
+            )
+        else:
+            added, removed = self._subscription_index.replace(
+                self._subscriptions_source.list_subscriptions()
+            )
+
+        if self._clock() >= self._next_heartbeat_at:
+            self._heartbeat()
+
+        if self._update_ring():
+            owned = dict.fromkeys(
+                s for s in self._subscription_index.subscriptions() if self._owns(s)
+            )
+        else:
+            removed = set(removed)
+            owned = {s: None for s in self._owned if s not in removed}
+            owned.update(dict.fromkeys(s for s in added if self._owns(s)))
+
+        changes = SubscriptionChanges(
+            [s for s in owned if s not in self._owned],
+            [s for s in self._owned if s not in owned]
+        )
+        self._owned = owned
+
+        return changes
+
+    def close(self):
+        """Leaves the group so the other workers take over at once."""
+        self._stopped.set()
+
+        if self._thread is not None:
+            self._thread.join()
+
+        try:
+            self._membership.leave()
+        except redis.exceptions.RedisError:
+            logger.exception('Unable to leave the producer group')
+
+    def _run(self):
+        while not self._stopped.wait(self._heartbeat_interval_secs):
+            self._heartbeat()
+
+    def _heartbeat(self):
+        """Renews the membership, keeping the members it returns for
+        `_update_ring`."""
+        with self._heartbeat_lock:
+            self._next_heartbeat_at = self._clock() + self._heartbeat_interval_secs
+
+            try:
+                self._members = tuple(self._membership.heartbeat())
+            except redis.exceptions.RedisError:
+                logger.exception('Producer heartbeat failed, keeping the current shard')
+
+    def _update_ring(self):
+        """Rebuilds the ring if the members of the last heartbeat changed.
+        Returns whether they did."""
+        members = self._members
+
+        if members is None or members == self._ring.members:
+            return False
+
+        logger.info(f'Producer workers: {", ".join(members)}')
+        self._ring = HashRing(members, self._virtual_nodes)
+
+        if self._rate_limiter is not None and self._total_rate:
+            self._rate_limiter.rate = self._total_rate / len(members)
+
+        return True
+
+    def _owns(self, subscription):
+        return self._ring.owner(subscription[0].upper()) == self._membership.worker_id
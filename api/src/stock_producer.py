@@ -1,35 +1,70 @@
 """
 Serves stocks ticker data from an external source (Schwab) by
-publishing them to a Redis pubsub queue.
+publishing them to Redis pub/sub channels or streams.
 
 Which stocks get loaded is determined by the need of existing
 alerts in the database.
 """
 
+import asyncio
 import datetime
-import json
-import redis
+import os
 import signal
+import socket
 import time
 import traceback
 
-from mongoengine import connect
+from concurrent.futures import ThreadPoolExecutor, wait
 
+from candles.builder import CandleBuilder
+from candles.cache import CachedPriceHistory, CandleCache
+from candles.frequency import FrequencyUnit, market_timezone, parse_frequency
+from candles.resampler import base_series, derive
+from candles.store import CandleStore
+from core.rate_limiter import TokenBucketRateLimiter
+from core.market_calendar import MarketCalendar, MarketSession
+from core.scheduler import SessionTickScheduler, TickScheduler
 from core.utils import ExtendedEnum
-from core.logging import get_logger
+from core.clients import Clients
+from core.logging import configure_logging, get_logger
+from core.metrics import MetricsServer, metrics
+from core.profiler import RedisProfilerTrigger, SamplingProfiler, install_signal_trigger
 from core import config
-from stock_providers.schwab import Schwab
+from messaging.channels import channel_name
+from messaging.codecs import CodecFactory, JsonCodec
+from messaging.conflation import Conflator
+from messaging.messages import MessageType, candle_message, history_message
+from messaging.messages import price_history_message, snapshot_message
+from sharding.membership import RedisMembership
+from sharding.subscriptions import ShardedSubscriptions
+from stock_providers.schwab import AsyncSchwab, Schwab
+from stock_providers.schwab_streamer import SchwabStreamer, StreamingQuotes
 from stock_providers.exceptions import UnableToRetrieveStockDataError
+from stock_publishers.redis_pubsub import AsyncRedisPubSub, RedisPubSub
+from stock_publishers.redis_snapshots import AsyncRedisSnapshots, RedisSnapshots
+from stock_publishers.redis_streams import AsyncRedisStreams, RedisStreams
+from stock_publishers.transports import Transport, UnknownTransportError
 from stock_subscriptions_sources.alerts import Alerts
-
-redis_client = redis.Redis(host='redis', port=6379)
+from stock_subscriptions_sources.subscription_index import SubscriptionIndex
 
 shutdown = False
 
 logger = get_logger(__name__)
 
-connection = connect(host=config.Database.ConnectionString,
-                     db=config.Database.Name)
+STAGE_SECONDS = metrics.histogram(
+    'stock_producer_stage_seconds',
+    'Latency of the producer stages per tick (per message when publishing singly)',
+    ['stage']
+)
+PUBLISHED_MESSAGES = metrics.counter(
+    'stock_producer_published_messages_total',
+    'Messages published to the channels'
+)
+PROVIDER_ERRORS = metrics.counter(
+    'stock_producer_provider_errors_total',
+    'Failed stock provider calls',
+    ['call']
+)
 
 class StockDataProvider(ExtendedEnum):
     SCHWAB = 'Schwab'
@@ -37,138 +72,884 @@ class StockDataProvider(ExtendedEnum):
 class StockSubscriptionsSource(ExtendedEnum):
     ALERTS = 'alerts'
 
+class QuotesMode(ExtendedEnum):
+    POLLING = 'polling'  # requests the quotes every tick
+    STREAMING = 'streaming'  # quotes are pushed by the provider's streamer
+
+class StockProducerEngine(ExtendedEnum):
+    SYNC = 'sync'
+    ASYNC = 'async'
+
+class PublishMode(ExtendedEnum):
+    SINGLE = 'single'
+    PIPELINE = 'pipeline'
+
 class UnknownStockProviderError(Exception):
     """Returned when the stock provider is unknown."""
 
 class UnknownStockSubscriptionsSourceError(Exception):
     """Returned when the stock subscriptions source is unknown."""
 
+class UnknownQuotesModeError(Exception):
+    """Returned when the quotes mode is unknown."""
+
+class UnknownStockProducerEngineError(Exception):
+    """Returned when the stock producer engine is unknown."""
+
 class StockProviderFactory:
 
-    def build(self):
+    def build(self, rate_limiter=None):
+        if config.Stocks.Provider == StockDataProvider.SCHWAB.value:
+            return self._with_quotes_mode(Schwab(rate_limiter=rate_limiter))
+
+        raise UnknownStockProviderError(f'Provider: {config.Stocks.Provider}')
+
+    def build_async(self, rate_limiter=None):
         if config.Stocks.Provider == StockDataProvider.SCHWAB.value:
-            return Schwab()
+            return AsyncSchwab(
+                self._with_quotes_mode(Schwab(rate_limiter=rate_limiter)),
+                max_workers=config.Stocks.BootstrapConcurrency
+            )
 
         raise UnknownStockProviderError(f'Provider: {config.Stocks.Provider}')
 
+    def _with_quotes_mode(self, schwab):
+        quotes_mode = config.Stocks.QuotesMode or QuotesMode.POLLING.value
+
+        if quotes_mode == QuotesMode.POLLING.value:
+            return self._with_candle_cache(schwab)
+
+        if quotes_mode == QuotesMode.STREAMING.value:
+            streamer = SchwabStreamer(
+                schwab.streamer_info,
+                config.Schwab.Streamer.Url,
+                reconnect_delay_secs=config.Schwab.Streamer.ReconnectDelaySecs,
+                coalesce_secs=config.Schwab.Streamer.CoalesceSecs,
+                authorize=schwab.authorize
+            )
+
+            return StreamingQuotes(self._with_candle_cache(schwab), streamer)
+
+        raise UnknownQuotesModeError(f'Quotes mode: {quotes_mode}')
+
+    def _with_candle_cache(self, provider):
+        if not config.Stocks.CandleCachePath:
+            return provider
+
+        return CachedPriceHistory(provider, CandleCache(config.Stocks.CandleCachePath))
+
 class StockSubscriptionsSourceFactory:
 
-    def build(self):
+    def __init__(self, clients):
+        """
+        @param: clients The application's `core.clients.Clients`
+        """
+        self._clients = clients
+
+    def build(self, rate_limiter=None):
+        """Returns the configured subscriptions source, sharded if
+        `Stocks.Sharding.Enabled`. A sharded source splits the rate of
+        `rate_limiter` between the producer workers."""
         if config.Stocks.SubscriptionsSource == StockSubscriptionsSource.ALERTS.value:
-            return Alerts()
+            self._clients.mongo()
+            return self._sharded(Alerts(), rate_limiter)
 
         raise UnknownStockSubscriptionsSourceError(
             f'Source: {config.Stocks.SubscriptionsSource}'
         )
 
+    def _sharded(self, stock_subscriptions_source, rate_limiter):
+        if not (config.Stocks.Sharding and config.Stocks.Sharding.Enabled):
+            return stock_subscriptions_source
+
+        membership = RedisMembership(
+            self._clients.redis(),
+            config.Stocks.Sharding.Group,
+            config.Stocks.Sharding.WorkerId or f'{socket.gethostname()}-{os.getpid()}',
+            config.Stocks.Sharding.LeaseSecs
+        )
+
+        return ShardedSubscriptions(
+            stock_subscriptions_source,
+            membership,
+            config.Stocks.Sharding.HeartbeatIntervalSecs,
+            config.Stocks.Sharding.VirtualNodes,
+            rate_limiter,
+            config.Schwab.RateLimit.RequestsPerSec
+        ).start()
+
+CANDLE_STORE_CAPACITY = 20000
+
 class StockProducer:
 
-    def __init__(self, stock_data_provider, stock_subscriptions_source):
+    def __init__(self, stock_data_provider, stock_subscriptions_source,
+                 publisher=None, codec=None, bootstrap_concurrency=1,
+                 candle_store_capacity=CANDLE_STORE_CAPACITY, snapshots=None,
+                 conflator=None, tick_scheduler=None):
+        """
+        @param: publisher `RedisPubSub` or `RedisStreams` the messages are
+                published to, required by `produce` and `produce_ticks`
+        @param: snapshots `RedisSnapshots` to keep the channels' series
+                in, price histories are then only announced on the channels
+        @param: conflator `Conflator` suppressing unchanged candle updates
+        @param: tick_scheduler `TickScheduler` with a cadence per frequency
+                unit, defaults to the update interval for every unit
+        """
         self.shutdown = False
         self._stock_data_provider = stock_data_provider
         self._stock_subscriptions_source = stock_subscriptions_source
+        self._publisher = publisher
+        self._codec = codec or JsonCodec()
+        self._bootstrap_concurrency = bootstrap_concurrency
+        self._candle_store_capacity = candle_store_capacity
+        self._snapshots = snapshots
+        self._conflator = conflator
+        self._tick_scheduler = tick_scheduler
+        self._subscription_index = SubscriptionIndex()
+        self._timezone = market_timezone()
+        self._base_series = {}
+        self._base_series_by_symbol = {}
+        self._pending_price_histories = {}
+        self._base_histories = {}
+        self._base_candle_builders = {}
+        self._awaiting_price_history = {}
         self._price_history = {}
-        self._unclosed_candles_close_timestamps = {}
+        self._candle_builders = {}
+        # Kept for removed subscriptions, so that a re-added one continues its numbering
+        self._sequences = {}
+        self._bootstrap_executor = None
 
     def subscriptions_data_feed(self, update_interval_secs):
         """Returns a generator iterating through tuples of
-        (subscription, market data) for all subscriptions defined
-        in configuration.
+        (subscription, `messaging.messages.Message`) for all
+        subscriptions defined in configuration.
+        """
+        for tick in self.subscriptions_data_ticks(update_interval_secs):
+            yield from tick
+
+    def subscriptions_data_ticks(self, update_interval_secs):
+        """Returns a generator of lists of (subscription, message)
+        tuples, one list per tick.
+
+        Price histories of new subscriptions are downloaded in the
+        background and published with the first tick after they
+        arrive. Only the very first bootstrap is waited for. Each
+        symbol's timeframes are derived from one base price history,
+        see `candles.resampler`.
         """
         while True:
-            subscriptions = self._stock_subscriptions_source.list_subscriptions()
-            symbols = [s[0] for s in subscriptions]
-            self._log_subscriptions(subscriptions)
+            with STAGE_SECONDS.time(stage='list_subscriptions'):
+                subscription_changes = self._list_subscription_changes()
+
+            self._apply_subscription_changes(*subscription_changes)
+            self._continue_sequences(subscription_changes[0])
 
             if self._price_history == {}:
-                try:
-                    for subscription in subscriptions:
-                        yield self._load_price_history_for(subscription)
-                except UnableToRetrieveStockDataError:
-                    logger.error(traceback.format_exc())
-                    continue
+                wait(self._pending_price_histories.values())
+
+            price_histories = self._collect_price_histories()
 
-            self._calc_unclosed_candles_close_timestamps()
+            if price_histories:
+                yield price_histories
 
-            time.sleep(update_interval_secs)
+            symbols = self._wait_for_quotes(update_interval_secs)
 
             try:
-                quotes_ohlcv = self._stock_data_provider.quotes(symbols)
+                with STAGE_SECONDS.time(stage='fetch'):
+                    quotes_ohlcv = self._stock_data_provider.quotes(symbols) if symbols else {}
             except UnableToRetrieveStockDataError:
+                PROVIDER_ERRORS.inc(call='quotes')
                 logger.error(traceback.format_exc())
                 continue
 
-            for subscription in subscriptions:
-                quote_ohlcv = self._upsert_unclosed_candle_timestamp(
-                    subscription,
-                    quotes_ohlcv
-                )
+            with STAGE_SECONDS.time(stage='transform'):
+                feed_items = self._quotes_feed_items(quotes_ohlcv, symbols)
 
-                yield subscription, json.dumps(quote_ohlcv)
+            yield feed_items
 
             if self.shutdown:
                 return
 
-    def _load_price_history_for(self, subscription):
-        symbol, frequency, period = subscription
+    def _wait_for_quotes(self, update_interval_secs):
+        """Waits for the next tick, cut short by a streaming provider
+        as soon as quotes were pushed.
+
+        @return: the symbols to request quotes for, all of them for a
+                 streaming provider, else those of the groups due
+        """
+        scheduler = self._scheduler(update_interval_secs)
+
+        if getattr(self._stock_data_provider, 'streaming', False):
+            self._stock_data_provider.wait_for_quotes(scheduler.delay())
+            self._due(scheduler)
+            return self._subscription_index.symbols()
+
+        time.sleep(scheduler.delay())
+
+        return self._symbols_due(self._due(scheduler))
+
+    def _scheduler(self, update_interval_secs):
+        if self._tick_scheduler is None:
+            self._tick_scheduler = TickScheduler(
+                dict.fromkeys(FrequencyUnit.list(), update_interval_secs)
+            )
+
+        return self._tick_scheduler
+
+    def _due(self, scheduler):
+        """Returns the groups due, backfilling the base histories when
+        a market session opened after the scheduler idled."""
+        due = scheduler.due()
+
+        if hasattr(scheduler, 'session_opened') and scheduler.session_opened():
+            self._backfill_base_histories()
+
+        return due
+
+    def _symbols_due(self, groups):
+        """Returns the symbols having a subscription whose frequency
+        unit is in `groups`."""
+        return [
+            symbol for symbol in self._subscription_index.symbols()
+            if any(parse_frequency(s[1]).unit in groups
+                   for s in self._subscription_index.subscriptions_for(symbol))
+        ]
+
+    def _list_subscription_changes(self):
+        """Returns the (added, removed) unique subscriptions since the
+        previous call, incrementally if the source tracks changes."""
+        if hasattr(self._stock_subscriptions_source, 'subscription_changes'):
+            return self._subscription_index.apply(
+                self._stock_subscriptions_source.subscription_changes()
+            )
+
+        return self._subscription_index.replace(
+            self._stock_subscriptions_source.list_subscriptions()
+        )
+
+    def _apply_subscription_changes(self, added, removed):
+        if not added and not removed:
+            return
+
+        for subscription in removed:
+            self._awaiting_price_history.pop(subscription, None)
+            self._price_history.pop(subscription, None)
+            self._candle_builders.pop(subscription, None)
+
+            if self._conflator is not None:
+                self._conflator.remove(subscription)
+
+        for subscription in added:
+            self._awaiting_price_history[subscription] = None
+
+        self._plan_base_series()
+        self._log_subscriptions()
+
+    def _plan_base_series(self):
+        """Re-plans the base price histories of all subscriptions,
+        dropping unused ones and starting the download of new ones."""
+        self._base_series = base_series(self._subscription_index.subscriptions())
+        planned = dict.fromkeys(self._base_series.values())
+
+        self._base_series_by_symbol = {}
+        for series in planned:
+            self._base_series_by_symbol.setdefault(series.symbol.upper(), []).append(series)
+
+        for series in list(self._pending_price_histories):
+            if series not in planned:
+                self._pending_price_histories.pop(series).cancel()
+
+        for series in list(self._base_histories):
+            if series not in planned:
+                del self._base_histories[series]
+                del self._base_candle_builders[series]
+
+        for series in planned:
+            if series not in self._base_histories and series not in self._pending_price_histories:
+                self._pending_price_histories[series] = self._start_price_history_load(series)
+
+    def _backfill_base_histories(self):
+        """Reloads all base price histories, e.g. the candles missed
+        while idling outside market sessions, and derives the price
+        histories of all subscriptions again once they arrived. With a
+        candle cache only the candles since the cached ones are
+        downloaded."""
+        for series in self._base_histories:
+            if series not in self._pending_price_histories:
+                self._pending_price_histories[series] = self._start_price_history_load(series)
+
+        for subscription in self._price_history:
+            self._awaiting_price_history[subscription] = None
+
+        logger.info(f'Backfilling {len(self._base_histories)} base price histories')
+
+    def _start_price_history_load(self, series):
+        """Returns a future of the `BaseSeries` price history."""
+        if self._bootstrap_executor is None:
+            self._bootstrap_executor = ThreadPoolExecutor(
+                max_workers=self._bootstrap_concurrency,
+                thread_name_prefix='bootstrap'
+            )
+
+        return self._bootstrap_executor.submit(
+            self._stock_data_provider.price_history,
+            **self._price_history_request_for(series)
+        )
+
+    def _collect_price_histories(self):
+        """Returns the feed items of the subscriptions whose base price
+        history was downloaded since the previous call. Failed downloads
+        are restarted."""
+        for series, future in list(self._pending_price_histories.items()):
+            if not future.done():
+                continue
 
-        price_history_ohlcv = self._stock_data_provider.price_history(
-            symbol=symbol,
-            frequency=frequency,
-            period=period,
-            end_date=int(datetime.datetime.now().timestamp() * 1000)
+            try:
+                self._store_base_history(series, future.result())
+                del self._pending_price_histories[series]
+            except UnableToRetrieveStockDataError:
+                PROVIDER_ERRORS.inc(call='price_history')
+                logger.error(traceback.format_exc())
+                self._pending_price_histories[series] = self._start_price_history_load(series)
+
+        return [
+            self._store_price_history(subscription)
+            for subscription in list(self._awaiting_price_history)
+            if self._base_series[subscription] in self._base_histories
+            and self._base_series[subscription] not in self._pending_price_histories
+        ]
+
+    def _price_history_request_for(self, series):
+        symbol, frequency, period = series
+
+        return {
+            'symbol': symbol,
+            'frequency': frequency,
+            'period': period,
+            'end_date': int(datetime.datetime.now().timestamp() * 1000)
+        }
+
+    def _store_base_history(self, series, price_history_ohlcv):
+        candle_store = CandleStore(self._candle_store_capacity)
+        candle_store.extend(price_history_message(price_history_ohlcv).candles)
+        candle_builder = CandleBuilder(series.frequency, self._timezone)
+
+        if len(candle_store):
+            candle_builder.seed(candle_store.last())
+
+        self._base_histories[series] = candle_store
+        self._base_candle_builders[series] = candle_builder
+
+    def _store_price_history(self, subscription):
+        """Derives the subscription's price history from its base and
+        returns its feed item."""
+        series = self._base_series[subscription]
+        candle_store = CandleStore(self._candle_store_capacity)
+        candle_store.extend(
+            derive(self._base_histories[series].candles(), series, subscription, self._timezone)
         )
 
-        self._price_history[subscription] = price_history_ohlcv
+        candle_builder = CandleBuilder(subscription[1], self._timezone)
+
+        if len(candle_store):
+            candle_builder.seed(candle_store.last())
+
+        del self._awaiting_price_history[subscription]
+        self._price_history[subscription] = candle_store
+        self._candle_builders[subscription] = candle_builder
+
+        message = history_message(candle_store.candles())
+
+        if self._conflator is not None:
+            self._conflator.admit(subscription, message)
+
+        return subscription, self._sequenced(subscription, message)
 
-        return subscription, json.dumps(self._price_history[subscription])
+    def _update_base_histories(self, symbol, quote_ohlcv):
+        """Folds a quote into the base histories of `symbol`, so that
+        subscriptions added later derive up-to-date candles."""
+        for series in self._base_series_by_symbol.get(symbol.upper(), ()):
+            if series not in self._base_candle_builders:
+                continue
+
+            for candle_event in self._base_candle_builders[series].add_quote(
+                quote_ohlcv['quoteTime'],
+                quote_ohlcv['lastPrice'],
+                int(quote_ohlcv['totalVolume'])
+            ):
+                self._base_histories[series].upsert(candle_event.candle)
+
+    def _quotes_feed_items(self, quotes_ohlcv, symbols=None):
+        """Returns the feed items for the subscriptions whose symbol is in
+        `quotes_ohlcv`, fanning each symbol's quote out to the candle
+        builders of all of its subscriptions. Missing symbols (e.g. from
+        a failed quotes chunk) and subscriptions still waiting for their
+        price history are skipped until the next tick.
+
+        @param: symbols The symbols quotes were requested for, defaults to all
+        """
+        feed_items = []
+
+        for symbol in self._subscription_index.symbols() if symbols is None else symbols:
+            if symbol.upper() not in quotes_ohlcv:
+                logger.warning(f'No quote for {symbol}, skipping this tick')
+                continue
+
+            quote_ohlcv = quotes_ohlcv[symbol.upper()]['quote']
+            self._update_base_histories(symbol, quote_ohlcv)
+
+            for subscription in self._subscription_index.subscriptions_for(symbol):
+                if subscription not in self._candle_builders:
+                    continue
+
+                candle_events = self._candle_builders[subscription].add_quote(
+                    quote_ohlcv['quoteTime'],
+                    quote_ohlcv['lastPrice'],
+                    int(quote_ohlcv['totalVolume'])
+                )
 
-    def _calc_unclosed_candles_close_timestamps(self):
-        for subscription, ph in self._price_history.items():
-            last_candle_timestamp = ph['candles'][-1]['datetime']
-            self._unclosed_candles_close_timestamps[subscription] = last_candle_timestamp + 60000
+                for candle_event in candle_events:
+                    self._price_history[subscription].upsert(candle_event.candle)
+                    message = self._candle_event_message(candle_event, quote_ohlcv['quoteTime'])
 
-    def _upsert_unclosed_candle_timestamp(self, subscription, quotes_ohlcv):
-        symbol = subscription[0]
-        quote_ohlcv = quotes_ohlcv[symbol.upper()]['quote']
-        quote_timestamp = quote_ohlcv['quoteTime']
+                    # Suppressed before numbering, consumers see no gap
+                    if self._conflator is not None and \
+                       not self._conflator.admit(subscription, message):
+                        continue
 
-        if (self._unclosed_candles_close_timestamps[subscription] - quote_timestamp) <= 0:  # Replace with frequency
-            self._unclosed_candles_close_timestamps[subscription] += 60000
+                    feed_items.append((subscription, self._sequenced(subscription, message)))
 
-        quote_ohlcv['quoteTime'] = self._unclosed_candles_close_timestamps[subscription]
+        if self._conflator is not None:
+            self._conflator.report()
 
-        return quote_ohlcv
+        return feed_items
 
+    def _candle_event_message(self, candle_event, timestamp):
+        message_type = MessageType.CANDLE_CLOSED if candle_event.closed \
+            else MessageType.CANDLE_UPDATE
+
+        return candle_message(message_type.value, candle_event.candle, timestamp)
+
+    def _continue_sequences(self, added):
+        """Continues the numbering of the channels of a previous run, as
+        recorded by their snapshots, since consumers drop the messages
+        numbered at or below the last one they applied."""
+        unsequenced = self._unsequenced(added)
+
+        if unsequenced:
+            self._seed_sequences(unsequenced, self._snapshots.sequences(
+                [self._channel_name(s) for s in unsequenced]
+            ))
+
+    def _unsequenced(self, subscriptions):
+        if self._snapshots is None:
+            return []
+
+        return [s for s in subscriptions if s not in self._sequences]
+
+    def _seed_sequences(self, subscriptions, sequences):
+        for subscription in subscriptions:
+            self._sequences[subscription] = sequences.get(self._channel_name(subscription), 0)
+
+    def _sequenced(self, subscription, message):
+        """Numbers the messages of each channel consecutively."""
+        self._sequences[subscription] = self._sequences.get(subscription, 0) + 1
+
+        return message._replace(sequence=self._sequences[subscription])
 
     def produce(self, subscriptions_data_feed):
         """Pushes the subscriptions and their market data to
         a Redis channel.
         """
-        for subscription, stock_ohlcv in subscriptions_data_feed:
-            retries = 3
+        for subscription, message in subscriptions_data_feed:
+            if self._snapshots is not None:
+                with STAGE_SECONDS.time(stage='snapshot'):
+                    self._snapshots.update([(self._channel_name(subscription), message)])
 
-            try:
-                symbol, frequency, period = subscription
-                channel_name = f'symbol-{symbol}-{frequency}-{period}'
-                redis_client.publish(channel_name, json.dumps(stock_ohlcv))
-                logger.info(f'Published ticker symbol data to channel: {channel_name}')
-            except redis.exceptions.ConnectionError as exc:
-                if retries == 0:
-                    raise exc
-
-                retries -= 1
-                time.sleep(0.5)
-
-    def _log_subscriptions(self, subscriptions):
+                message = _snapshot_notice(message)
+
+            with STAGE_SECONDS.time(stage='serialize'):
+                encoded_message = self._codec.encode(message)
+
+            with STAGE_SECONDS.time(stage='publish'):
+                self._publisher.publish(self._channel_name(subscription), encoded_message)
+
+            PUBLISHED_MESSAGES.inc()
+
+    def produce_ticks(self, subscriptions_data_ticks):
+        """Pushes the subscriptions and their market data to Redis
+        channels, sending each tick as one pipelined batch.
+        """
+        for tick in subscriptions_data_ticks:
+            if not tick:
+                continue
+
+            # Written before publishing, so that a consumer never
+            # receives a message newer than the snapshot it then loads
+            if self._snapshots is not None:
+                with STAGE_SECONDS.time(stage='snapshot'):
+                    self._snapshots.update(self._snapshot_messages(tick))
+
+            with STAGE_SECONDS.time(stage='serialize'):
+                channel_messages = self._channel_messages(tick)
+
+            with STAGE_SECONDS.time(stage='publish'):
+                self._publisher.publish_batch(channel_messages)
+
+            PUBLISHED_MESSAGES.inc(len(channel_messages))
+
+    def _snapshot_messages(self, tick):
+        return [(self._channel_name(subscription), message) for subscription, message in tick]
+
+    def _channel_messages(self, tick):
+        if self._snapshots is not None:
+            tick = [(subscription, _snapshot_notice(message)) for subscription, message in tick]
+
+        return [(self._channel_name(subscription), self._codec.encode(message))
+                for subscription, message in tick]
+
+    def _channel_name(self, subscription):
+        return channel_name(subscription)
+
+    def close(self):
+        """Releases the subscriptions source, e.g. the shard of a
+        sharded producer."""
+        if hasattr(self._stock_subscriptions_source, 'close'):
+            self._stock_subscriptions_source.close()
+
+    def _log_subscriptions(self):
         logger.info('Subscriptions:')
-        list(map(lambda s: logger.info(f'\t{s[0]}, {s[1]}'), subscriptions))
+        list(map(
+            lambda s: logger.info(
+                f'\t{s[0]}, {s[1]}, {s[2]} (x{self._subscription_index.ref_count(s)})'
+            ),
+            self._subscription_index.subscriptions()
+        ))
+
+
+class AsyncStockProducer(StockProducer):
+    """Asyncio variant of `StockProducer`.
+
+    Price histories are downloaded concurrently, at most
+    `bootstrap_concurrency` at a time, and the quote loop then runs
+    on the same event loop. Expects an async stock data provider
+    such as `AsyncSchwab`.
+    """
+
+    def __init__(self, stock_data_provider, stock_subscriptions_source,
+                 bootstrap_concurrency, publisher=None, codec=None,
+                 candle_store_capacity=CANDLE_STORE_CAPACITY, snapshots=None,
+                 conflator=None, tick_scheduler=None):
+        super().__init__(
+            stock_data_provider,
+            stock_subscriptions_source,
+            publisher,
+            codec,
+            bootstrap_concurrency,
+            candle_store_capacity,
+            snapshots,
+            conflator,
+            tick_scheduler
+        )
+        self._bootstrap_semaphore = None
+
+    async def subscriptions_data_feed(self, update_interval_secs):
+        """Async version of `StockProducer.subscriptions_data_feed`."""
+        async for tick in self.subscriptions_data_ticks(update_interval_secs):
+            for feed_item in tick:
+                yield feed_item
+
+    async def subscriptions_data_ticks(self, update_interval_secs):
+        """Async version of `StockProducer.subscriptions_data_ticks`."""
+        try:
+            while True:
+                with STAGE_SECONDS.time(stage='list_subscriptions'):
+                    subscription_changes = await asyncio.to_thread(self._list_subscription_changes)
+
+                self._apply_subscription_changes(*subscription_changes)
+                await self._continue_sequences(subscription_changes[0])
+
+                if self._price_history == {} and self._pending_price_histories:
+                    await asyncio.wait(self._pending_price_histories.values())
+
+                price_histories = self._collect_price_histories()
+
+                if price_histories:
+                    yield price_histories
+
+                symbols = await self._wait_for_quotes(update_interval_secs)
+
+                try:
+                    with STAGE_SECONDS.time(stage='fetch'):
+                        quotes_ohlcv = \
+                            await self._stock_data_provider.quotes(symbols) if symbols else {}
+                except UnableToRetrieveStockDataError:
+                    PROVIDER_ERRORS.inc(call='quotes')
+                    logger.error(traceback.format_exc())
+                    continue
+
+                with STAGE_SECONDS.time(stage='transform'):
+                    feed_items = self._quotes_feed_items(quotes_ohlcv, symbols)
+
+                yield feed_items
+
+                if self.shutdown:
+                    return
+        finally:
+            for task in self._pending_price_histories.values():
+                task.cancel()
+
+    async def _wait_for_quotes(self, update_interval_secs):
+        """Async version of `StockProducer._wait_for_quotes`."""
+        scheduler = self._scheduler(update_interval_secs)
+
+        if getattr(self._stock_data_provider, 'streaming', False):
+            await self._stock_data_provider.wait_for_quotes(scheduler.delay())
+            self._due(scheduler)
+            return self._subscription_index.symbols()
+
+        await asyncio.sleep(scheduler.delay())
+
+        return self._symbols_due(self._due(scheduler))
+
+    async def _continue_sequences(self, added):
+        """Async version of `StockProducer._continue_sequences`."""
+        unsequenced = self._unsequenced(added)
+
+        if unsequenced:
+            self._seed_sequences(unsequenced, await self._snapshots.sequences(
+                [self._channel_name(s) for s in unsequenced]
+            ))
+
+    def _start_price_history_load(self, series):
+        """Returns a task downloading the `BaseSeries` price history."""
+        if self._bootstrap_semaphore is None:
+            self._bootstrap_semaphore = asyncio.Semaphore(self._bootstrap_concurrency)
+
+        async def load():
+            async with self._bootstrap_semaphore:
+                return await self._stock_data_provider.price_history(
+                    **self._price_history_request_for(series)
+                )
+
+        return asyncio.ensure_future(load())
+
+    async def produce(self, subscriptions_data_feed):
+        """Async version of `StockProducer.produce`."""
+        async for subscription, message in subscriptions_data_feed:
+            if self._snapshots is not None:
+                with STAGE_SECONDS.time(stage='snapshot'):
+                    await self._snapshots.update([(self._channel_name(subscription), message)])
+
+                message = _snapshot_notice(message)
+
+            with STAGE_SECONDS.time(stage='serialize'):
+                encoded_message = self._codec.encode(message)
+
+            with STAGE_SECONDS.time(stage='publish'):
+                await self._publisher.publish(self._channel_name(subscription), encoded_message)
+
+            PUBLISHED_MESSAGES.inc()
+
+    async def produce_ticks(self, subscriptions_data_ticks):
+        """Async version of `StockProducer.produce_ticks`."""
+        async for tick in subscriptions_data_ticks:
+            if not tick:
+                continue
+
+            if self._snapshots is not None:
+                with STAGE_SECONDS.time(stage='snapshot'):
+                    await self._snapshots.update(self._snapshot_messages(tick))
+
+            with STAGE_SECONDS.time(stage='serialize'):
+                channel_messages = self._channel_messages(tick)
+
+            with STAGE_SECONDS.time(stage='publish'):
+                await self._publisher.publish_batch(channel_messages)
+
+            PUBLISHED_MESSAGES.inc(len(channel_messages))
+
+
+def _snapshot_notice(message):
+    """Price histories go to the snapshot only, the channel is told to reload it."""
+    if message.type == MessageType.PRICE_HISTORY.value:
+        return snapshot_message(message)
+
+    return message
+
+
+class StockProducerFactory:
+
+    def __init__(self, clients):
+        """
+        @param: clients The application's `core.clients.Clients`
+        """
+        self._clients = clients
+
+    def build(self):
+        # Shared so that sharding can split the rate between the workers
+        rate_limiter = self._sharded_rate_limiter()
+        stock_subscriptions_source = \
+            StockSubscriptionsSourceFactory(self._clients).build(rate_limiter)
+
+        if config.Stocks.Engine == StockProducerEngine.SYNC.value:
+            return StockProducer(
+                StockProviderFactory().build(rate_limiter),
+                stock_subscriptions_source,
+                self._publisher(),
+                CodecFactory().build(),
+                config.Stocks.BootstrapConcurrency,
+                config.Stocks.CandleStoreCapacity,
+                self._snapshots(RedisSnapshots, self._clients.redis()),
+                self._conflator(),
+                self._tick_scheduler()
+            )
+
+        if config.Stocks.Engine == StockProducerEngine.ASYNC.value:
+            return AsyncStockProducer(
+                StockProviderFactory().build_async(rate_limiter),
+                stock_subscriptions_source,
+                config.Stocks.BootstrapConcurrency,
+                self._async_publisher(),
+                CodecFactory().build(),
+                config.Stocks.CandleStoreCapacity,
+                self._snapshots(AsyncRedisSnapshots, self._clients.async_redis()),
+                self._conflator(),
+                self._tick_scheduler()
+            )
+
+        raise UnknownStockProducerEngineError(f'Engine: {config.Stocks.Engine}')
+
+    def _snapshots(self, snapshots_class, client):
+        if not (config.Redis.Snapshots and config.Redis.Snapshots.Enabled):
+            return None
+
+        return snapshots_class(
+            client,
+            config.Stocks.CandleStoreCapacity,
+            config.Redis.Snapshots.ExpireSecs,
+            config.Redis.PipelineFlushSize
+        )
+
+    def _tick_scheduler(self):
+        if not config.Stocks.Schedule:
+            return None
+
+        tick_scheduler = self._build_tick_scheduler()
+
+        for stat in ['ticks', 'late_ticks', 'skipped_ticks', 'max_lateness_secs']:
+            metrics.gauge(f'stock_producer_scheduler_{stat}',
+                          f'Tick scheduler {stat.replace("_", " ")}',
+                          lambda stat=stat: tick_scheduler.stats().get(stat, 0))
+
+        return tick_scheduler
+
+    def _build_tick_scheduler(self):
+        cadences = self._cadences(config.Stocks.Schedule.CadenceSecs)
+
+        if not (config.Stocks.Calendar and config.Stocks.Calendar.Enabled):
+            return TickScheduler(cadences, config.Stocks.Schedule.LateToleranceSecs)
+
+        calendar = MarketCalendar(
+            market_timezone(),
+            config.Stocks.Calendar.Holidays,
+            config.Stocks.Calendar.EarlyCloses
+        )
+        extended_hours_cadences = config.Stocks.Schedule.ExtendedHoursCadenceSecs
+        cadences_by_session = {MarketSession.REGULAR.value: cadences}
+
+        if extended_hours_cadences:
+            extended_hours = self._cadences(extended_hours_cadences)
+            cadences_by_session[MarketSession.PRE_MARKET.value] = extended_hours
+            cadences_by_session[MarketSession.AFTER_HOURS.value] = extended_hours
+
+        return SessionTickScheduler(
+            calendar,
+            cadences_by_session,
+            config.Stocks.Schedule.LateToleranceSecs,
+            config.Stocks.Schedule.IdleCheckSecs or 5
+        )
+
+    def _cadences(self, cadences):
+        return {
+            unit: (cadences or {}).get(unit, config.Schwab.MarketDataUpdateIntervalSecs)
+            for unit in FrequencyUnit.list()
+        }
+
+    def _conflator(self):
+        if not (config.Stocks.Conflation and config.Stocks.Conflation.Enabled):
+            return None
+
+        conflator = Conflator(
+            config.Stocks.Conflation.HeartbeatSecs,
+            config.Stocks.Conflation.ReportIntervalSecs
+        )
+
+        for stat in ['updates', 'suppressed', 'suppression_ratio']:
+            metrics.gauge(f'stock_producer_conflation_{stat}',
+                          f'Conflated candle {stat.replace("_", " ")}',
+                          lambda stat=stat: conflator.stats()[stat])
+
+        return conflator
+
+    def _publisher(self):
+        transport = config.Redis.Transport or Transport.PUBSUB.value
+
+        if transport == Transport.PUBSUB.value:
+            return RedisPubSub(self._clients.redis(), config.Redis.PipelineFlushSize)
+
+        if transport == Transport.STREAMS.value:
+            return RedisStreams(self._clients.redis(), config.Redis.Streams.MaxLen,
+                                config.Redis.PipelineFlushSize)
+
+        raise UnknownTransportError(f'Transport: {transport}')
+
+    def _async_publisher(self):
+        transport = config.Redis.Transport or Transport.PUBSUB.value
+
+        if transport == Transport.PUBSUB.value:
+            return AsyncRedisPubSub(self._clients.async_redis(), config.Redis.PipelineFlushSize)
+
+        if transport == Transport.STREAMS.value:
+            return AsyncRedisStreams(self._clients.async_redis(), config.Redis.Streams.MaxLen,
+                                     config.Redis.PipelineFlushSize)
+
+        raise UnknownTransportError(f'Transport: {transport}')
+
+    def _sharded_rate_limiter(self):
+        if not (config.Stocks.Sharding and config.Stocks.Sharding.Enabled):
+            return None
+
+        return TokenBucketRateLimiter(
+            rate=config.Schwab.RateLimit.RequestsPerSec,
+            capacity=config.Schwab.RateLimit.Burst
+        )
 
 
 if __name__ == '__main__':
-    stock_provider = StockProviderFactory().build()
-    stock_subscription_source = StockSubscriptionsSourceFactory().build()
-    stock_producer = StockProducer(stock_provider, stock_subscription_source)
+    configure_logging()
+    clients = Clients(config)
+    stock_producer = StockProducerFactory(clients).build()
+
+    if config.Metrics and config.Metrics.Enabled:
+        MetricsServer(metrics, port=config.Metrics.Port or 9100).start()
+
+    if config.Profiler and config.Profiler.Enabled:
+        profiler = SamplingProfiler(
+            config.Profiler.OutputDir,
+            config.Profiler.DurationSecs,
+            config.Profiler.IntervalSecs,
+            config.Profiler.TopAllocations
+        )
+        install_signal_trigger(profiler, getattr(signal, config.Profiler.Signal or 'SIGUSR2'))
+
+        if config.Profiler.ControlKey:
+            RedisProfilerTrigger(
+                clients.redis(),
+                config.Profiler.ControlKey,
+                profiler,
+                config.Profiler.ControlPollSecs
+            ).start()
 
     def signal_handler(sig, frame):
         logger.info('Gracefully shutting down')
@@ -177,8 +958,30 @@ if __name__ == '__main__':
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
 
-    stock_producer.produce(
-        stock_producer.subscriptions_data_feed(
-            config.Schwab.MarketDataUpdateIntervalSecs
-        )
-    )
+    update_interval_secs = config.Schwab.MarketDataUpdateIntervalSecs
+    pipelined = config.Redis.PublishMode == PublishMode.PIPELINE.value
+
+    async def produce_async():
+        if pipelined:
+            await stock_producer.produce_ticks(
+                stock_producer.subscriptions_data_ticks(update_interval_secs)
+            )
+        else:
+            await stock_producer.produce(
+                stock_producer.subscriptions_data_feed(update_interval_secs)
+            )
+
+    try:
+        if isinstance(stock_producer, AsyncStockProducer):
+            asyncio.run(produce_async())
+        elif pipelined:
+            stock_producer.produce_ticks(
+                stock_producer.subscriptions_data_ticks(update_interval_secs)
+            )
+        else:
+            stock_producer.produce(
+                stock_producer.subscriptions_data_feed(update_interval_secs)
+            )
+    finally:
+        stock_producer.close()
+        clients.close()
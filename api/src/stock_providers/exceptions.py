@@ -2,4 +2,7 @@ class UnauthorizedError(Exception):
     pass
 
 class UnableToRetrieveStockDataError(Exception):
-    pass
\ No newline at end of file
+    pass
+
+class StreamerLoginError(UnableToRetrieveStockDataError):
+    pass
@@ -0,0 +1,61 @@
+"""
+HTTP session helpers shared by the stock providers.
+"""
+
+import requests
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from core.metrics import metrics
+
+RETRIES = metrics.counter(
+    'stock_provider_http_retries_total',
+    'Transport errors of the provider requests, retried until the retries run out'
+)
+
+class CountingRetry(Retry):
+    """`Retry` counting the retries in `RETRIES`."""
+
+    def increment(self, *args, **kwargs):
+        RETRIES.inc()
+        return super().increment(*args, **kwargs)
+
+def build_session(pool_connections=4, pool_maxsize=16, max_retries=3,
+                  backoff_factor_secs=0.2, backoff_jitter_secs=0.1):
+    """Returns a long-lived `requests.Session` that keeps connections
+    alive between requests.
+
+    @param: pool_connections Number of per-host connection pools to keep
+    @param: pool_maxsize Max. number of connections kept per host
+    @param: max_retries Retries on transport errors (e.g. connection resets)
+    @param: backoff_factor_secs Exponential backoff base between retries
+    @param: backoff_jitter_secs Max. random jitter added to each backoff
+    @return: requests.Session
+
+    Only transport errors are retried, HTTP error statuses are returned
+    to the caller as they are. Requests block while all `pool_maxsize`
+    connections to a host are busy instead of opening extra ones.
+    """
+    retry = CountingRetry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=0,
+        backoff_factor=backoff_factor_secs,
+        backoff_jitter=backoff_jitter_secs,
+        raise_on_status=False
+    )
+
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=True,
+        max_retries=retry
+    )
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    return session
@@ -1,22 +1,38 @@
 """Wrapper for Polygon.io stock API."""
 
+import asyncio
 import base64
 import os
 import re
 import requests
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from json.decoder import JSONDecodeError
-from functools import wraps
-from urllib3.exceptions import ReadTimeoutError
-from requests.exceptions import ReadTimeout
+from functools import partial, wraps
 
+from core import config
 from core.logging import get_logger
+from core.metrics import metrics
+from core.rate_limiter import TokenBucketRateLimiter
 from stock_providers.exceptions import UnauthorizedError
 from stock_providers.exceptions import UnableToRetrieveStockDataError
+from stock_providers.http import build_session
 
 logger = get_logger(__name__)
 
-def authorize():
+REAUTHORIZATIONS = metrics.counter(
+    'schwab_reauthorizations_total',
+    'Access token refreshes after a 401 response'
+)
+REQUEST_ERRORS = metrics.counter(
+    'schwab_request_errors_total',
+    'Failed Schwab API requests',
+    ['reason']
+)
+
+SCHWAB_API_BASE_URL = 'https://api.schwabapi.com'
+
+def authorize(session, base_url=SCHWAB_API_BASE_URL):
     app_key = os.environ['SCHWAB_API_KEY']
     app_secret = os.environ['SCHWAB_API_SECRET']
     refresh_token = os.environ['SCHWAB_REFRESH_TOKEN']
@@ -35,8 +51,8 @@ def authorize():
         'Content-Type': 'application/x-www-form-urlencoded'
     }
 
-    response = requests.post(
-        url="https://api.schwabapi.com/v1/oauth/token",
+    response = session.post(
+        url=f"{base_url}/v1/oauth/token",
         headers=headers,
         data=payload,
     )
@@ -53,12 +69,13 @@ def authorize():
 
 def authorized(f):
     @wraps(f)
-    def decorated(*args, **kwargs):
+    def decorated(self, *args, **kwargs):
         try:
-            return f(*args, **kwargs)
+            return f(self, *args, **kwargs)
         except UnauthorizedError as ex:
-            authorize()
-            return f(*args, **kwargs)
+            REAUTHORIZATIONS.inc()
+            authorize(self._session, self._base_url)
+            return f(self, *args, **kwargs)
 
     return decorated
 
@@ -69,19 +86,51 @@ class Schwab:
     """
 
     PRICE_HISTORY_API_URL_PATTERN = ''.join([
-        'https://api.schwabapi.com/marketdata/v1/pricehistory?symbol={0}&',
+        '/marketdata/v1/pricehistory?symbol={0}&',
         'periodType={2}&period={1}&frequencyType={4}&frequency={3}'
     ])
 
     QUOTES_API_URL_PATTERN = ''.join([
-        'https://api.schwabapi.com/marketdata/v1/quotes?symbols={0}'
+        '/marketdata/v1/quotes?symbols={0}'
     ])
 
-    def __init__(self):
+    USER_PREFERENCE_API_URL = '/trader/v1/userPreference'
+
+    def __init__(self, session=None, base_url=None, rate_limiter=None):
+        """
+        @param: session A `requests.Session`, a pooled keep-alive session
+                        configured from `Schwab.Http` is built if omitted
+        @param: base_url The API base URL, defaults to `Schwab.BaseUrl`
+        @param: rate_limiter A `TokenBucketRateLimiter` every request
+                             waits on, built from `Schwab.RateLimit` if omitted
+        """
         self._api_key = os.environ['SCHWAB_API_KEY']
         self._api_secret = os.environ['SCHWAB_API_SECRET']
         self._access_token = os.environ['SCHWAB_ACCESS_TOKEN']
         self._refresh_token = None
+        self._base_url = base_url or config.Schwab.BaseUrl or SCHWAB_API_BASE_URL
+        self._timeout_secs = config.Schwab.Http.TimeoutSecs
+        self._session = session or build_session(
+            pool_connections=config.Schwab.Http.PoolConnections,
+            pool_maxsize=config.Schwab.Http.PoolMaxSize,
+            max_retries=config.Schwab.Http.MaxRetries,
+            backoff_factor_secs=config.Schwab.Http.BackoffFactorSecs,
+            backoff_jitter_secs=config.Schwab.Http.BackoffJitterSecs
+        )
+        self._rate_limiter = rate_limiter or TokenBucketRateLimiter(
+            rate=config.Schwab.RateLimit.RequestsPerSec,
+            capacity=config.Schwab.RateLimit.Burst
+        )
+        _register_rate_limiter_gauges(self._rate_limiter)
+        self._quotes_max_symbols_per_request = config.Schwab.Quotes.MaxSymbolsPerRequest
+        self._quotes_executor = ThreadPoolExecutor(
+            max_workers=config.Schwab.Quotes.MaxParallelRequests,
+            thread_name_prefix='schwab-quotes'
+        )
+
+    @property
+    def rate_limiter(self):
+        return self._rate_limiter
 
     def access_token_from_refresh_token(self):
         """Requests a new access token using the refresh token."""
@@ -121,7 +170,7 @@ class Schwab:
         period_multiplier, period_unit = \
             self._period_to_multiplier_and_unit(period)
 
-        url = Schwab.PRICE_HISTORY_API_URL_PATTERN.format(
+        url = self._base_url + Schwab.PRICE_HISTORY_API_URL_PATTERN.format(
             symbol.upper(),
             period_multiplier,
             period_unit,
@@ -140,37 +189,101 @@ class Schwab:
             url += f'&needExtendedData={value}'
 
         url += '&needPreviousClose=true'
-        headers={'Authorization': f'Bearer {os.environ["SCHWAB_ACCESS_TOKEN"]}'}
 
-        try:
-            response = requests.get(url, timeout=5, headers=headers)
-        except (JSONDecodeError, ReadTimeout, ReadTimeoutError) as e:
-            raise UnableToRetrieveStockDataError(f'Response: {response.text}') from e
+        return self._get(url)
 
-        if response.status_code == 401:
-            raise UnauthorizedError('API request returned 401.')
+    @authorized
+    def quotes(self, symbols):
+        """Returns the quotes for the ticker symbols keyed by upper-cased symbol.
+
+        @param: symbols List of ticker symbol strings
+        @return: dict
+
+        Symbols are requested in chunks of at most
+        `Schwab.Quotes.MaxSymbolsPerRequest`, several chunks at a time.
+        A chunk that fails is logged and its symbols are missing from
+        the result. Raises `UnableToRetrieveStockDataError` only if
+        every chunk fails.
+        """
+        symbols = [s.upper() for s in symbols]
+        chunk_size = self._quotes_max_symbols_per_request
+        chunks = [symbols[i:i + chunk_size]
+                  for i in range(0, len(symbols), chunk_size)]
 
-        symbol_data_dict = response.json()
+        if len(chunks) <= 1:
+            return self._quotes_chunk(symbols) if symbols else {}
+
+        symbol_data_dict = {}
+        failed_chunks = []
+        futures = {self._quotes_executor.submit(self._quotes_chunk, c): c
+                   for c in chunks}
+
+        for future in as_completed(futures):
+            try:
+                symbol_data_dict.update(future.result())
+            except UnableToRetrieveStockDataError as e:
+                logger.error(f'Unable to retrieve quotes for {",".join(futures[future])}: {e}')
+                failed_chunks.append(e)
+
+        if len(failed_chunks) == len(chunks):
+            raise UnableToRetrieveStockDataError('All quote chunks failed.') from failed_chunks[0]
 
         return symbol_data_dict
 
+    def authorize(self):
+        """Refreshes the access token, e.g. for the streamer login."""
+        authorize(self._session, self._base_url)
+
     @authorized
-    def quotes(self, symbols):
-        symbols = [s.upper() for s in symbols]
+    def streamer_info(self):
+        """Returns the connection details of the account's streamer, see
+        `stock_providers.schwab_streamer`.
+
+        @return: dict with streamerSocketUrl, schwabClientCustomerId,
+                 schwabClientCorrelId, schwabClientChannel and
+                 schwabClientFunctionId
+        """
+        user_preference = self._get(self._base_url + Schwab.USER_PREFERENCE_API_URL)
+
+        try:
+            return user_preference['streamerInfo'][0]
+        except (KeyError, IndexError, TypeError) as e:
+            raise UnableToRetrieveStockDataError(f'No streamer info: {user_preference}') from e
+
+    def close(self):
+        """Closes the pooled connections."""
+        self._quotes_executor.shutdown(wait=False)
+        self._session.close()
+
+    def _quotes_chunk(self, symbols):
         symbols_str = ','.join(symbols)
-        url = Schwab.QUOTES_API_URL_PATTERN.format(symbols_str)
+        url = self._base_url + Schwab.QUOTES_API_URL_PATTERN.format(symbols_str)
+
+        return self._get(url)
+
+    def _get(self, url):
+        wait_secs = self._rate_limiter.acquire()
+
+        if wait_secs > 0:
+            logger.debug(f'Rate limited, waited {wait_secs:.3f}s')
+
         headers={'Authorization': f'Bearer {os.environ["SCHWAB_ACCESS_TOKEN"]}'}
 
         try:
-            response = requests.get(url, timeout=5, headers=headers)
-            symbol_data_dict = response.json()
-        except (JSONDecodeError, ReadTimeout, ReadTimeoutError) as e:
-            raise UnableToRetrieveStockDataError(f'Response: {response.text}') from e
+            response = self._session.get(url, timeout=self._timeout_secs, headers=headers)
+        except requests.exceptions.RequestException as e:
+            REQUEST_ERRORS.inc(reason='request_failed')
+            raise UnableToRetrieveStockDataError(f'Request failed: {url}') from e
 
         if response.status_code == 401:
+            REQUEST_ERRORS.inc(reason='unauthorized')
             raise UnauthorizedError('API request returned 401.')
 
-        return symbol_data_dict
+        try:
+            return response.json()
+        except JSONDecodeError as e:
+            REQUEST_ERRORS.inc(reason='invalid_response')
+            raise UnableToRetrieveStockDataError(f'Response: {response.text}') from e
 
     def _frequency_to_multiplier_and_unit(self, frequency):
         split = re.split('(\d+)', frequency)
@@ -183,3 +296,68 @@ class Schwab:
         split = list(filter(None, split)) # Remove the '' as the first item
 
         return split
+
+
+def _register_rate_limiter_gauges(rate_limiter):
+    """Exposes the `TokenBucketRateLimiter.stats` of the limiter the
+    requests wait on, whether built here or shared by the factory."""
+    for stat, help_text in [
+        ('tokens_left', 'Tokens left in the Schwab rate limiter, negative while requests wait'),
+        ('waits_count', 'Schwab requests that waited for the rate limiter'),
+        ('wait_secs_total', 'Total seconds Schwab requests waited for the rate limiter')
+    ]:
+        metrics.gauge(f'schwab_rate_limiter_{stat}', help_text,
+                      lambda stat=stat: rate_limiter.stats()[stat])
+
+class AsyncSchwab:
+    """Asyncio variant of the Schwab provider.
+
+    Runs the blocking calls of a wrapped `Schwab` instance on a thread
+    pool so that many requests can be in flight on one event loop.
+    """
+
+    def __init__(self, provider, max_workers=None):
+        self._provider = provider
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='schwab'
+        )
+
+    async def price_history(self, symbol, frequency, period, start_date=None,
+                            end_date=None, include_extended_data=False):
+        """See `Schwab.price_history`."""
+        return await self._run(
+            self._provider.price_history,
+            symbol,
+            frequency,
+            period,
+            start_date,
+            end_date,
+            include_extended_data
+        )
+
+    async def quotes(self, symbols):
+        """See `Schwab.quotes`."""
+        return await self._run(self._provider.quotes, symbols)
+
+    @property
+    def streaming(self):
+        """Whether the wrapped provider pushes its quotes."""
+        return getattr(self._provider, 'streaming', False)
+
+    async def wait_for_quotes(self, timeout):
+        """See `StreamingQuotes.wait_for_quotes`, sleeps `timeout` for a
+        polling provider."""
+        if not hasattr(self._provider, 'wait_for_quotes'):
+            await asyncio.sleep(timeout)
+            return False
+
+        return await self._run(self._provider.wait_for_quotes, timeout)
+
+    def close(self):
+        """Releases the worker threads."""
+        self._executor.shutdown(wait=False)
+
+    async def _run(self, f, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(f, *args))
@@ -0,0 +1,297 @@
+"""
+Pushed level one quotes from the Schwab streamer.
+
+Instead of polling the quotes endpoint every tick, a WebSocket
+connection subscribes to the LEVELONE_EQUITIES service and receives an
+update whenever a quote changes. Updates only carry the changed fields,
+they are merged into the last known quote of each symbol.
+
+The price histories are still requested from the REST API:
+
+    streamer = SchwabStreamer(schwab.streamer_info, authorize=schwab.authorize)
+    provider = StreamingQuotes(schwab, streamer)
+"""
+
+import json
+import os
+import threading
+import time
+
+import websockets
+import websockets.sync.client
+
+from core.logging import get_logger
+from stock_providers.exceptions import StreamerLoginError, UnableToRetrieveStockDataError
+
+logger = get_logger(__name__)
+
+LEVEL_ONE_EQUITIES = 'LEVELONE_EQUITIES'
+
+# LEVELONE_EQUITIES field numbers to `Schwab.quotes` quote keys
+QUOTE_FIELDS = {
+    '3': 'lastPrice',
+    '8': 'totalVolume',
+    '35': 'quoteTime'  # trade time in epoch ms
+}
+
+class SchwabStreamer:
+    """Keeps a streamer connection open on a background thread,
+    reconnecting and resubscribing when it drops or fails, refreshing
+    the access token when the login is refused."""
+
+    def __init__(self, streamer_info, url=None, connect_timeout_secs=5,
+                 reconnect_delay_secs=1, coalesce_secs=0.05,
+                 connect=websockets.sync.client.connect, authorize=None):
+        """
+        @param: streamer_info Callable returning the streamer connection
+                details, e.g. `Schwab.streamer_info`
+        @param: url Overrides the streamer URL of `streamer_info`
+        @param: connect_timeout_secs Max. seconds the first `quotes` call
+                waits for the connection
+        @param: reconnect_delay_secs Seconds between connection attempts
+        @param: coalesce_secs Seconds `wait_for_quotes` keeps collecting
+                updates after the first one arrived
+        @param: authorize Callable refreshing SCHWAB_ACCESS_TOKEN, e.g.
+                `Schwab.authorize`, called before reconnecting after a
+                refused login
+        """
+        self._streamer_info = streamer_info
+        self._url = url
+        self._connect_timeout_secs = connect_timeout_secs
+        self._reconnect_delay_secs = reconnect_delay_secs
+        self._coalesce_secs = coalesce_secs
+        self._connect = connect
+        self._authorize = authorize
+        self._condition = threading.Condition()
+        self._connected = threading.Event()
+        self._closed = False
+        self._thread = None
+        self._connection = None
+        self._info = None
+        self._request_id = 0
+        self._symbols = set()
+        self._quotes = {}
+        self._updated = False
+
+    def quotes(self, symbols):
+        """Subscribes to the symbols not subscribed yet, unsubscribes the
+        others, and returns the last known quotes.
+
+        @param: symbols List of ticker symbol strings
+        @return: dict keyed by upper-cased symbol like `Schwab.quotes`,
+                 without the symbols no quote was received for yet
+
+        Raises `UnableToRetrieveStockDataError` while disconnected.
+        """
+        self._start()
+        self._set_symbols({s.upper() for s in symbols})
+
+        if not self._connected.is_set():
+            raise UnableToRetrieveStockDataError('Streamer is not connected.')
+
+        with self._condition:
+            self._updated = False
+
+            return {
+                symbol: {'quote': dict(quote)}
+                for symbol, quote in self._quotes.items()
+                if symbol in self._symbols and len(quote) == len(QUOTE_FIELDS)
+            }
+
+    def wait_for_quotes(self, timeout):
+        """Blocks until an update arrived since the previous `quotes` call,
+        at most `timeout` seconds.
+
+        @return: whether an update arrived
+        """
+        with self._condition:
+            updated = self._condition.wait_for(lambda: self._updated or self._closed, timeout)
+
+        if updated and self._coalesce_secs:
+            time.sleep(self._coalesce_secs)
+
+        return updated
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+        if self._connection is not None:
+            self._connection.close()
+
+        if self._thread is not None:
+            self._thread.join(timeout=self._connect_timeout_secs)
+
+    def _start(self):
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(target=self._run, name='schwab-streamer', daemon=True)
+        self._thread.start()
+        self._connected.wait(self._connect_timeout_secs)
+
+    def _run(self):
+        while not self._closed:
+            try:
+                self._stream()
+            except StreamerLoginError as e:
+                logger.error(f'Streamer login failed: {e!r}')
+                self._refresh_access_token()
+            except Exception as e:  # pylint:disable=broad-except
+                # The thread is started once, it must outlive any failure,
+                # e.g. a malformed message
+                logger.error(f'Streamer connection failed: {e!r}')
+            finally:
+                self._connected.clear()
+                self._connection = None
+
+            if not self._closed:
+                time.sleep(self._reconnect_delay_secs)
+
+    def _stream(self):
+        if self._info is None:
+            self._info = self._streamer_info()
+
+        with self._connect(self._url or self._info['streamerSocketUrl']) as connection:
+            self._connection = connection
+            self._login(connection)
+
+            # Under the lock so that no symbol change slips in between
+            with self._condition:
+                symbols = sorted(self._symbols)
+
+                if symbols:
+                    self._send('SUBS', symbols)
+
+                self._connected.set()
+
+            logger.info(f'Streamer connected, {len(symbols)} symbols subscribed')
+
+            for raw_message in connection:
+                self._handle(json.loads(raw_message))
+
+    def _refresh_access_token(self):
+        if self._authorize is None:
+            return
+
+        try:
+            self._authorize()
+        except Exception as e:  # pylint:disable=broad-except
+            logger.error(f'Unable to refresh the access token: {e!r}')
+
+    def _login(self, connection):
+        if 'SCHWAB_ACCESS_TOKEN' not in os.environ:
+            raise StreamerLoginError('No access token')
+
+        connection.send(json.dumps({'requests': [self._request('ADMIN', 'LOGIN', {
+            'Authorization': os.environ['SCHWAB_ACCESS_TOKEN'],
+            'SchwabClientChannel': self._info['schwabClientChannel'],
+            'SchwabClientFunctionId': self._info['schwabClientFunctionId']
+        })]}))
+
+        login_response = json.loads(connection.recv(timeout=self._connect_timeout_secs))
+
+        for response in login_response.get('response', []):
+            if response['command'] == 'LOGIN' and response['content']['code'] != 0:
+                raise StreamerLoginError(f'Login refused: {response["content"]}')
+
+    def _set_symbols(self, symbols):
+        with self._condition:
+            added = sorted(symbols - self._symbols)
+            removed = sorted(self._symbols - symbols)
+            self._symbols = symbols
+
+            for symbol in removed:
+                self._quotes.pop(symbol, None)
+
+            if not self._connected.is_set():
+                return  # subscribed on (re)connect
+
+            try:
+                if added:
+                    self._send('ADD', added)
+
+                if removed:
+                    self._send('UNSUBS', removed)
+            except (OSError, websockets.exceptions.WebSocketException) as e:
+                # The reconnect subscribes the current symbols
+                logger.error(f'Streamer subscription failed: {e!r}')
+
+    def _send(self, command, symbols):
+        parameters = {'keys': ','.join(symbols)}
+
+        if command != 'UNSUBS':
+            parameters['fields'] = ','.join(['0', *QUOTE_FIELDS])
+
+        self._connection.send(json.dumps({
+            'requests': [self._request(LEVEL_ONE_EQUITIES, command, parameters)]
+        }))
+
+    def _request(self, service, command, parameters):
+        self._request_id += 1
+
+        return {
+            'service': service,
+            'command': command,
+            'requestid': str(self._request_id),
+            'SchwabClientCustomerId': self._info['schwabClientCustomerId'],
+            'SchwabClientCorrelId': self._info['schwabClientCorrelId'],
+            'parameters': parameters
+        }
+
+    def _handle(self, message):
+        for response in message.get('response', []):
+            if response['content'].get('code', 0) != 0:
+                logger.error(f'Streamer {response["command"]} failed: {response["content"]}')
+
+        updates = [
+            content
+            for data in message.get('data', [])
+            if data['service'] == LEVEL_ONE_EQUITIES
+            for content in data['content']
+        ]
+
+        if not updates:
+            return
+
+        with self._condition:
+            for update in updates:
+                if update['key'] not in self._symbols:
+                    continue
+
+                quote = self._quotes.setdefault(update['key'], {})
+                quote.update(
+                    {key: update[field] for field, key in QUOTE_FIELDS.items() if field in update}
+                )
+
+            self._updated = True
+            self._condition.notify_all()
+
+class StreamingQuotes:
+    """Stock provider taking the quotes from a `SchwabStreamer` and the
+    price histories from a polling provider."""
+
+    streaming = True
+
+    def __init__(self, provider, streamer):
+        self._provider = provider
+        self._streamer = streamer
+
+    def price_history(self, *args, **kwargs):
+        """See `Schwab.price_history`."""
+        return self._provider.price_history(*args, **kwargs)
+
+    def quotes(self, symbols):
+        """See `SchwabStreamer.quotes`."""
+        return self._streamer.quotes(symbols)
+
+    def wait_for_quotes(self, timeout):
+        """See `SchwabStreamer.wait_for_quotes`."""
+        return self._streamer.wait_for_quotes(timeout)
+
+    def close(self):
+        self._streamer.close()
+
+        if hasattr(self._provider, 'close'):
+            self._provider.close()
@@ -0,0 +1,97 @@
+"""
+Publishes stock market data to Redis pub/sub channels.
+"""
+
+import time
+
+from core.logging import get_logger
+from stock_publishers.retries import with_retries, with_retries_async
+
+logger = get_logger(__name__)
+
+class RedisPubSub:
+    """Publishes messages to Redis channels, one at a time or a whole
+    batch per pipeline round trip."""
+
+    def __init__(self, redis_client, flush_size=500):
+        """
+        @param: redis_client A `redis.Redis` client
+        @param: flush_size Max. number of messages sent in one pipeline
+        """
+        self._redis_client = redis_client
+        self._flush_size = flush_size
+
+    def publish(self, channel_name, message):
+        """Publishes one message, retrying on connection errors."""
+        with_retries(lambda: self._redis_client.publish(channel_name, message))
+        logger.debug(f'Published ticker symbol data to channel: {channel_name}')
+
+    def publish_batch(self, channel_messages):
+        """Publishes a list of (channel name, message) tuples using one
+        pipeline per `flush_size` messages.
+
+        @return: dict with the number of messages and pipelines sent and
+                 the latency of the whole batch in seconds
+        """
+        start = time.perf_counter()
+        batches = _split(channel_messages, self._flush_size)
+
+        for batch in batches:
+            with_retries(lambda batch=batch: self._execute_pipeline(batch))
+
+        return _batch_stats(channel_messages, batches, start)
+
+    def _execute_pipeline(self, channel_messages):
+        pipeline = self._redis_client.pipeline(transaction=False)
+
+        for channel_name, message in channel_messages:
+            pipeline.publish(channel_name, message)
+
+        pipeline.execute()
+
+class AsyncRedisPubSub:
+    """Asyncio variant of `RedisPubSub` for a `redis.asyncio.Redis` client."""
+
+    def __init__(self, redis_client, flush_size=500):
+        self._redis_client = redis_client
+        self._flush_size = flush_size
+
+    async def publish(self, channel_name, message):
+        """See `RedisPubSub.publish`."""
+        await with_retries_async(lambda: self._redis_client.publish(channel_name, message))
+        logger.debug(f'Published ticker symbol data to channel: {channel_name}')
+
+    async def publish_batch(self, channel_messages):
+        """See `RedisPubSub.publish_batch`."""
+        start = time.perf_counter()
+        batches = _split(channel_messages, self._flush_size)
+
+        for batch in batches:
+            await with_retries_async(lambda batch=batch: self._execute_pipeline(batch))
+
+        return _batch_stats(channel_messages, batches, start)
+
+    async def _execute_pipeline(self, channel_messages):
+        pipeline = self._redis_client.pipeline(transaction=False)
+
+        for channel_name, message in channel_messages:
+            pipeline.publish(channel_name, message)
+
+        await pipeline.execute()
+
+def _split(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def _batch_stats(channel_messages, batches, start):
+    stats = {
+        'messages': len(channel_messages),
+        'pipelines': len(batches),
+        'latency_secs': time.perf_counter() - start
+    }
+
+    logger.debug(
+        f'Published {stats["messages"]} messages in {stats["pipelines"]} '
+        f'pipeline(s) in {stats["latency_secs"] * 1000:.1f} ms'
+    )
+
+    return stats
@@ -0,0 +1,170 @@
+"""
+Keeps the snapshot of every channel's series in Redis, so that consumers
+joining late can start from it instead of waiting for a price history.
+
+A snapshot is a sorted set of the candles scored by their datetime, plus
+a hash with the `sequence` of the last message applied and its
+`timestamp`. A consumer subscribes first, then loads the snapshot, then
+applies the messages numbered after it; a gap in the numbers means it
+missed messages and has to load the snapshot again:
+
+    history = snapshots.load(channel)
+"""
+
+import struct
+
+from core.logging import get_logger
+from messaging.messages import Candle, Message, MessageType
+from stock_publishers.retries import with_retries, with_retries_async
+
+logger = get_logger(__name__)
+
+CANDLE = struct.Struct('<qddddq')
+
+class RedisSnapshots:
+    """Applies published messages to the snapshots and loads them."""
+
+    def __init__(self, redis_client, capacity=20000, expire_secs=86400, flush_size=500):
+        """
+        @param: redis_client A `redis.Redis` client
+        @param: capacity Max. number of candles kept per snapshot
+        @param: expire_secs Snapshots not updated for this long are deleted
+        @param: flush_size Max. number of messages applied in one transaction
+        """
+        self._redis_client = redis_client
+        self._capacity = capacity
+        self._expire_secs = expire_secs
+        self._flush_size = flush_size
+
+    def update(self, channel_messages):
+        """Applies a list of (channel name, `Message`) tuples to the
+        snapshots. A price history replaces the snapshot, a candle is
+        upserted by its datetime."""
+        for i in range(0, len(channel_messages), self._flush_size):
+            batch = channel_messages[i:i + self._flush_size]
+            with_retries(lambda batch=batch: self._execute_update(batch))
+
+    def load(self, channel_name):
+        """Returns the snapshot as a price history `Message` numbered
+        with the sequence of the last message applied to it, or None if
+        the channel has no snapshot."""
+        return _snapshot_message(*with_retries(lambda: self._execute_load(channel_name)))
+
+    def sequences(self, channel_names):
+        """Returns the sequence of the last message applied to each
+        channel's snapshot, that a restarted producer continues from.
+        Channels without a snapshot are left out."""
+        return _sequences(
+            channel_names, with_retries(lambda: self._execute_sequences(channel_names))
+        )
+
+    def _execute_update(self, channel_messages):
+        pipeline = self._redis_client.pipeline(transaction=True)
+        _queue_update(pipeline, channel_messages, self._capacity, self._expire_secs)
+        pipeline.execute()
+
+    def _execute_load(self, channel_name):
+        pipeline = self._redis_client.pipeline(transaction=True)
+        _queue_load(pipeline, channel_name)
+
+        return pipeline.execute()
+
+    def _execute_sequences(self, channel_names):
+        pipeline = self._redis_client.pipeline(transaction=False)
+        _queue_sequences(pipeline, channel_names)
+
+        return pipeline.execute()
+
+class AsyncRedisSnapshots(RedisSnapshots):
+    """Asyncio variant of `RedisSnapshots` for a `redis.asyncio.Redis` client."""
+
+    async def update(self, channel_messages):
+        """See `RedisSnapshots.update`."""
+        for i in range(0, len(channel_messages), self._flush_size):
+            batch = channel_messages[i:i + self._flush_size]
+            await with_retries_async(lambda batch=batch: self._execute_update(batch))
+
+    async def load(self, channel_name):
+        """See `RedisSnapshots.load`."""
+        return _snapshot_message(
+            *await with_retries_async(lambda: self._execute_load(channel_name))
+        )
+
+    async def sequences(self, channel_names):
+        """See `RedisSnapshots.sequences`."""
+        return _sequences(
+            channel_names,
+            await with_retries_async(lambda: self._execute_sequences(channel_names))
+        )
+
+    async def _execute_update(self, channel_messages):
+        pipeline = self._redis_client.pipeline(transaction=True)
+        _queue_update(pipeline, channel_messages, self._capacity, self._expire_secs)
+        await pipeline.execute()
+
+    async def _execute_load(self, channel_name):
+        pipeline = self._redis_client.pipeline(transaction=True)
+        _queue_load(pipeline, channel_name)
+
+        return await pipeline.execute()
+
+    async def _execute_sequences(self, channel_names):
+        pipeline = self._redis_client.pipeline(transaction=False)
+        _queue_sequences(pipeline, channel_names)
+
+        return await pipeline.execute()
+
+def snapshot_keys(channel_name):
+    """Returns the (candles, metadata) keys of a channel's snapshot."""
+    return f'{channel_name}:snapshot', f'{channel_name}:snapshot:meta'
+
+def _queue_update(pipeline, channel_messages, capacity, expire_secs):
+    for channel_name, message in channel_messages:
+        candles_key, meta_key = snapshot_keys(channel_name)
+
+        if message.type == MessageType.PRICE_HISTORY.value:
+            pipeline.delete(candles_key)
+
+            if message.candles:
+                pipeline.zadd(
+                    candles_key,
+                    {CANDLE.pack(*c): c.datetime for c in message.candles[-capacity:]}
+                )
+        elif message.type in (MessageType.CANDLE_UPDATE.value, MessageType.CANDLE_CLOSED.value):
+            for candle in message.candles:
+                pipeline.zremrangebyscore(candles_key, candle.datetime, candle.datetime)
+                pipeline.zadd(candles_key, {CANDLE.pack(*candle): candle.datetime})
+
+            pipeline.zremrangebyrank(candles_key, 0, -capacity - 1)
+        else:
+            continue
+
+        pipeline.hset(
+            meta_key, mapping={'sequence': message.sequence, 'timestamp': message.timestamp}
+        )
+        pipeline.expire(candles_key, expire_secs)
+        pipeline.expire(meta_key, expire_secs)
+
+def _queue_load(pipeline, channel_name):
+    candles_key, meta_key = snapshot_keys(channel_name)
+    pipeline.zrange(candles_key, 0, -1)
+    pipeline.hgetall(meta_key)
+
+def _queue_sequences(pipeline, channel_names):
+    for channel_name in channel_names:
+        pipeline.hget(snapshot_keys(channel_name)[1], 'sequence')
+
+def _sequences(channel_names, sequences):
+    return {channel_name: int(sequence)
+            for channel_name, sequence in zip(channel_names, sequences) if sequence is not None}
+
+def _snapshot_message(packed_candles, meta):
+    if not meta:
+        return None
+
+    return Message(
+        MessageType.PRICE_HISTORY.value,
+        int(meta[b'timestamp']),
+        tuple(Candle(*CANDLE.unpack(c)) for c in packed_candles),
+        sequence=int(meta[b'sequence'])
+    )
@@ -0,0 +1,209 @@
+"""
+Publishes stock market data to Redis streams and reads it back with
+consumer groups.
+
+Every channel is a stream of the same name, capped at about `max_len`
+entries. Unlike pub/sub, the entries outlive the publish: a consumer
+group receives every entry at least once, entries stay pending until
+acknowledged, and any retained entry can be replayed by ID.
+"""
+
+import os
+import socket
+import time
+
+import redis
+
+from core.logging import get_logger
+from stock_publishers.redis_pubsub import AsyncRedisPubSub, RedisPubSub
+from stock_publishers.retries import with_retries, with_retries_async
+from stock_publishers.transports import UnsupportedSubscriptionError
+
+logger = get_logger(__name__)
+
+DATA_FIELD = b'data'
+
+class RedisStreams(RedisPubSub):
+    """Appends messages to Redis streams, one at a time or a whole batch
+    per pipeline round trip."""
+
+    def __init__(self, redis_client, max_len=10000, flush_size=500):
+        """
+        @param: redis_client A `redis.Redis` client
+        @param: max_len Approx. number of entries kept per stream
+        @param: flush_size Max. number of messages sent in one pipeline
+        """
+        super().__init__(redis_client, flush_size)
+        self._max_len = max_len
+
+    def publish(self, channel_name, message):
+        """Appends one message, retrying on connection errors."""
+        with_retries(lambda: self._redis_client.xadd(
+            channel_name, {DATA_FIELD: message}, maxlen=self._max_len, approximate=True
+        ))
+        logger.debug(f'Appended ticker symbol data to stream: {channel_name}')
+
+    def _execute_pipeline(self, channel_messages):
+        pipeline = self._redis_client.pipeline(transaction=False)
+
+        for channel_name, message in channel_messages:
+            pipeline.xadd(
+                channel_name, {DATA_FIELD: message}, maxlen=self._max_len, approximate=True
+            )
+
+        pipeline.execute()
+
+class AsyncRedisStreams(AsyncRedisPubSub):
+    """Asyncio variant of `RedisStreams` for a `redis.asyncio.Redis` client."""
+
+    def __init__(self, redis_client, max_len=10000, flush_size=500):
+        super().__init__(redis_client, flush_size)
+        self._max_len = max_len
+
+    async def publish(self, channel_name, message):
+        """See `RedisStreams.publish`."""
+        await with_retries_async(lambda: self._redis_client.xadd(
+            channel_name, {DATA_FIELD: message}, maxlen=self._max_len, approximate=True
+        ))
+        logger.debug(f'Appended ticker symbol data to stream: {channel_name}')
+
+    async def _execute_pipeline(self, channel_messages):
+        pipeline = self._redis_client.pipeline(transaction=False)
+
+        for channel_name, message in channel_messages:
+            pipeline.xadd(
+                channel_name, {DATA_FIELD: message}, maxlen=self._max_len, approximate=True
+            )
+
+        await pipeline.execute()
+
+class RedisStreamsSubscriber:
+    """Reads streams as a member of a consumer group, behind the same
+    `subscribe`/`unsubscribe`/`get_message` interface as a Redis `PubSub`.
+
+    Received messages stay pending in the group until `ack` is called,
+    so a consumer that dies mid-message gets it again on restart: the
+    first read of every stream returns the consumer's pending entries
+    before the new ones.
+    """
+
+    def __init__(self, redis_client, group, consumer=None, start_id='0', count=100):
+        """
+        @param: redis_client A `redis.Redis` client
+        @param: group Name of the consumer group, created if missing
+        @param: consumer Name of this consumer in the group, defaults to <hostname>-<pid>
+        @param: start_id Entry a new group starts after, '0' reads the
+                retained entries, '$' only the ones appended from now on
+        @param: count Max. entries read per stream and call
+        """
+        self._redis_client = redis_client
+        self._group = group
+        self._consumer = consumer or f'{socket.gethostname()}-{os.getpid()}'
+        self._start_id = start_id
+        self._count = count
+        self._read_ids = {}
+        self._buffer = []
+
+    def psubscribe(self, *patterns):
+        raise UnsupportedSubscriptionError(
+            'Redis streams cannot be read by pattern, subscribe to the channels'
+        )
+
+    def subscribe(self, *channels):
+        for channel in channels:
+            self._create_group(channel)
+            # '0' returns this consumer's pending entries, '>' the new ones
+            self._read_ids[channel] = '0'
+
+    def unsubscribe(self, *channels):
+        for channel in channels:
+            self._read_ids.pop(channel, None)
+
+        self._buffer = [m for m in self._buffer if m['channel'].decode('utf-8') in self._read_ids]
+
+    def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        """@return: the next entry as a pub/sub message dict with its
+                    stream `id`, or None if none arrived within `timeout`"""
+        if not self._read_ids:
+            # Waits out the timeout like a `PubSub` without subscriptions,
+            # so that polling loops don't spin
+            time.sleep(timeout or 0)
+            return None
+
+        while not self._buffer and self._read_ids:
+            reading_pending = any(read_id != '>' for read_id in self._read_ids.values())
+            self._read(timeout)
+
+            # Only the blocking read of new entries may come back empty
+            if not reading_pending:
+                break
+
+        return self._buffer.pop(0) if self._buffer else None
+
+    def ack(self, message):
+        """Removes a message returned by `get_message` from the pending entries."""
+        self._redis_client.xack(message['channel'], self._group, message['id'])
+
+    def replay(self, channel, start_id='-', count=None):
+        """Returns the retained entries of a stream from `start_id` on,
+        without moving the group.
+
+        @return: list of (entry ID, data)
+        """
+        entries = self._redis_client.xrange(channel, min=start_id, count=count)
+
+        return [(entry_id, fields[DATA_FIELD]) for entry_id, fields in entries]
+
+    def backlog(self):
+        """Number of delivered but unacknowledged entries per stream,
+        growing when this group falls behind the producer.
+
+        @return: dict of channel to pending entries
+        """
+        return {
+            channel: self._redis_client.xpending(channel, self._group)['pending']
+            for channel in self._read_ids
+        }
+
+    def _create_group(self, channel):
+        try:
+            self._redis_client.xgroup_create(channel, self._group, id=self._start_id, mkstream=True)
+        except redis.exceptions.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    def _read(self, timeout):
+        block = None if timeout is None else max(1, int(timeout * 1000))
+
+        # Pending entries are returned at once, don't block on new ones behind them
+        if any(read_id != '>' for read_id in self._read_ids.values()):
+            block = None
+
+        response = self._redis_client.xreadgroup(
+            self._group, self._consumer, dict(self._read_ids), count=self._count, block=block
+        ) or []
+        entries_by_channel = {
+            (stream.decode('utf-8') if isinstance(stream, bytes) else stream): entries
+            for stream, entries in response
+        }
+
+        for channel, read_id in list(self._read_ids.items()):
+            entries = entries_by_channel.get(channel, [])
+
+            if read_id != '>':
+                # Continues after the last pending entry, '>' once they are all read
+                self._read_ids[channel] = entries[-1][0] if entries else '>'
+
+            for entry_id, fields in entries:
+                # Pending entries trimmed by MAXLEN come back without fields
+                if not fields:
+                    self._redis_client.xack(channel, self._group, entry_id)
+                    continue
+
+                self._buffer.append({
+                    'type': 'message',
+                    'pattern': None,
+                    'channel': channel.encode('utf-8'),
+                    'data': fields[DATA_FIELD],
+                    'id': entry_id
+                })
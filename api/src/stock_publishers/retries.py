@@ -0,0 +1,35 @@
+"""
+Retries of Redis commands over dropped connections, shared by the
+publishers.
+"""
+
+import asyncio
+import time
+
+import redis
+
+RETRIES = 3
+RETRY_DELAY_SECS = 0.5
+
+def with_retries(f):
+    """Returns `f()`, calling it again after a connection error, at most
+    `RETRIES` times in all."""
+    for retries_left in reversed(range(RETRIES)):
+        try:
+            return f()
+        except redis.exceptions.ConnectionError:
+            if retries_left == 0:
+                raise
+
+            time.sleep(RETRY_DELAY_SECS)
+
+async def with_retries_async(f):
+    """Async version of `with_retries`, `f` returns an awaitable."""
+    for retries_left in reversed(range(RETRIES)):
+        try:
+            return await f()
+        except redis.exceptions.ConnectionError:
+            if retries_left == 0:
+                raise
+
+            await asyncio.sleep(RETRY_DELAY_SECS)
@@ -0,0 +1,16 @@
+"""
+Redis transports the market data can be published on.
+"""
+
+from core.utils import ExtendedEnum
+
+class Transport(ExtendedEnum):
+    PUBSUB = 'pubsub'  # fire-and-forget, only connected subscribers receive
+    STREAMS = 'streams'  # one capped stream per channel, read by consumer groups
+
+class UnknownTransportError(Exception):
+    """Returned when the transport is unknown."""
+
+class UnsupportedSubscriptionError(Exception):
+    """Raised when the transport cannot subscribe as asked, e.g. to
+    streams by pattern."""
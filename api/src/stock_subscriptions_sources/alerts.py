@@ -1,6 +1,215 @@
+import datetime
+import time
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from core import config
+from core.logging import get_logger
 from core.models import Alert
+from core.utils import ExtendedEnum
+from stock_subscriptions_sources.subscription_index import SubscriptionChanges
+
+logger = get_logger(__name__)
+
+class ChangeTracking(ExtendedEnum):
+    CHANGE_STREAM = 'change_stream'
+    POLLING = 'polling'
 
 class Alerts:
+    """Subscriptions of the alerts in the database.
+
+    `subscription_changes` reports what changed since its previous call
+    without re-reading the collection: from a MongoDB change stream, or
+    by polling alerts by `updated_at` when change streams are disabled
+    or unsupported (they need a replica set).
+
+    Subclasses can track other records of the alerts by overriding
+    `TRACKED_FIELDS`, `_record` and `_document_record`.
+    """
+
+    SUBSCRIPTION_FIELDS = ('id', 'symbol', 'frequency', 'period', 'updated_at')
+    TRACKED_FIELDS = SUBSCRIPTION_FIELDS
+
+    # Default seconds the polling cursor moves back, see `_polled_changes`
+    POLL_OVERLAP_SECS = 60
+    # Max. milliseconds the server holds a change stream read without
+    # events, as it is read on every tick of the caller
+    CHANGE_STREAM_MAX_AWAIT_MS = 10
+    # Events after which the change stream no longer tracks the alerts
+    INVALIDATING_OPERATIONS = ('drop', 'rename', 'dropDatabase', 'invalidate')
+
+    def __init__(self, change_tracking=None, poll_interval_secs=None,
+                 clock=time.monotonic, poll_overlap_secs=None):
+        self._change_tracking = change_tracking or config.Stocks.Alerts.ChangeTracking
+        self._poll_interval_secs = (
+            config.Stocks.Alerts.PollIntervalSecs
+            if poll_interval_secs is None else poll_interval_secs
+        )
+        if poll_overlap_secs is None:
+            poll_overlap_secs = config.Stocks.Alerts.PollOverlapSecs
+
+        self._poll_overlap = datetime.timedelta(seconds=(
+            Alerts.POLL_OVERLAP_SECS if poll_overlap_secs is None else poll_overlap_secs
+        ))
+        self._clock = clock
+        self._subscriptions_by_id = None
+        self._updated_since = None
+        self._next_poll_at = 0
+        self._change_stream = None
 
     def list_subscriptions(self):
-        return list((a.symbol, a.frequency, a.period) for a in Alert.objects.all())
\ No newline at end of file
+        return list((a.symbol, a.frequency, a.period) for a in Alert.objects.all())
+
+    def subscription_changes(self):
+        """Returns the `SubscriptionChanges` since the previous call. The
+        first call returns every alert as added."""
+        changes = SubscriptionChanges([], [])
+
+        if self._subscriptions_by_id is None:
+            if self._change_tracking == ChangeTracking.CHANGE_STREAM.value:
+                self._open_change_stream()
+
+            self._subscriptions_by_id = {}
+            self._rescan(changes)
+
+            return changes
+
+        if self._change_stream is not None:
+            try:
+                self._change_stream_changes(changes)
+                return changes
+            except PyMongoError:
+                # The events read so far are kept, the poll catches up
+                # with the ones after them
+                logger.exception('Alerts change stream failed, falling back to polling')
+                self._close_change_stream()
+                self._next_poll_at = 0
+
+        self._polled_changes(changes)
+
+        return changes
+
+    def _rescan(self, changes):
+        """Compares every alert with the tracked ones."""
+        existing_ids = set()
+
+        for alert in Alert.objects.only(*self.TRACKED_FIELDS):
+            self._upsert(alert.id, self._record(alert), changes)
+            self._track_updated_at(alert)
+            existing_ids.add(alert.id)
+
+        for alert_id in list(self._subscriptions_by_id):
+            if alert_id not in existing_ids:
+                self._delete(alert_id, changes)
+
+        self._next_poll_at = self._clock() + self._poll_interval_secs
+
+    def _open_change_stream(self):
+        # Opened before the initial scan so no change falls in between,
+        # changes seen by both are deduplicated by `_upsert`.
+        try:
+            self._change_stream = Alert._get_collection().watch(
+                full_document='updateLookup',
+                max_await_time_ms=Alerts.CHANGE_STREAM_MAX_AWAIT_MS
+            )
+        except OperationFailure as e:
+            logger.warning(f'Alerts change stream unavailable, polling instead: {e}')
+
+    def _close_change_stream(self):
+        try:
+            self._change_stream.close()
+        except PyMongoError:
+            pass
+
+        self._change_stream = None
+
+    def _change_stream_changes(self, changes):
+        while True:
+            event = self._change_stream.try_next()
+
+            if event is None:
+                return
+
+            if event['operationType'] in Alerts.INVALIDATING_OPERATIONS:
+                logger.warning(f'Alerts change stream ended by {event["operationType"]}, '
+                               'rescanning and polling instead')
+                self._close_change_stream()
+                self._rescan(changes)
+                return
+
+            if 'documentKey' not in event:
+                continue
+
+            alert_id = event['documentKey']['_id']
+            document = event.get('fullDocument')
+
+            if event['operationType'] == 'delete' or \
+               (event['operationType'] in ('update', 'replace') and document is None):
+                self._delete(alert_id, changes)
+            elif document is not None:
+                self._upsert(alert_id, self._document_record(document), changes)
+
+    def _polled_changes(self, changes):
+        if self._clock() < self._next_poll_at:
+            return
+
+        self._next_poll_at = self._clock() + self._poll_interval_secs
+        # `updated_at` is set by the clocks of the writers, an alert saved
+        # by a lagging one may be older than the cursor. Re-reading an
+        # overlap window catches it; alerts seen unchanged are no change.
+        updated_alerts = Alert.objects(updated_at__gte=self._updated_since - self._poll_overlap) \
+            if self._updated_since is not None else Alert.objects
+
+        for alert in updated_alerts.only(*self.TRACKED_FIELDS):
+            self._upsert(alert.id, self._record(alert), changes)
+            self._track_updated_at(alert)
+
+        # Deletes leave no trace to poll for, nor do alerts saved later
+        # than the overlap behind the cursor. A cheap count tells whether
+        # the ids must be compared.
+        if Alert.objects.count() != len(self._subscriptions_by_id):
+            self._reconcile_ids(changes)
+
+    def _reconcile_ids(self, changes):
+        existing_ids = set(Alert.objects.scalar('id'))
+
+        for alert_id in list(self._subscriptions_by_id):
+            if alert_id not in existing_ids:
+                self._delete(alert_id, changes)
+
+        missing_ids = existing_ids.difference(self._subscriptions_by_id)
+
+        if missing_ids:
+            for alert in Alert.objects(id__in=list(missing_ids)).only(*self.TRACKED_FIELDS):
+                self._upsert(alert.id, self._record(alert), changes)
+
+    def _upsert(self, alert_id, subscription, changes):
+        previous_subscription = self._subscriptions_by_id.get(alert_id)
+
+        if previous_subscription == subscription:
+            return
+
+        if previous_subscription is not None:
+            changes.removed.append(previous_subscription)
+
+        self._subscriptions_by_id[alert_id] = subscription
+        changes.added.append(subscription)
+
+    def _delete(self, alert_id, changes):
+        previous_subscription = self._subscriptions_by_id.pop(alert_id, None)
+
+        if previous_subscription is not None:
+            changes.removed.append(previous_subscription)
+
+    def _record(self, alert):
+        """Returns what is tracked of an `Alert`, its subscription."""
+        return (alert.symbol, alert.frequency, alert.period)
+
+    def _document_record(self, document):
+        """Returns what is tracked of a raw alert document."""
+        return (document['symbol'], document['frequency'], document['period'])
+
+    def _track_updated_at(self, alert):
+        if alert.updated_at is not None and \
+           (self._updated_since is None or alert.updated_at > self._updated_since):
+            self._updated_since = alert.updated_at
@@ -0,0 +1,122 @@
+"""
+Deduplicated index of stock subscriptions.
+"""
+
+from typing import NamedTuple
+
+class SubscriptionChanges(NamedTuple):
+    """Subscriptions added and removed since the last check, one entry
+    per subscriber (duplicates are meaningful)."""
+    added: list
+    removed: list
+
+class SubscriptionIndex:
+    """Keeps each (symbol, frequency, period) subscription once with the
+    number of subscribers referencing it, and maps every symbol to its
+    subscriptions so one quote can be fanned out to all of them.
+
+    Symbols are matched case-insensitively when looking up a symbol's
+    subscriptions.
+    """
+
+    def __init__(self):
+        self._ref_counts = {}
+        self._subscriptions_by_symbol = {}
+
+    def __len__(self):
+        return len(self._ref_counts)
+
+    def __contains__(self, subscription):
+        return subscription in self._ref_counts
+
+    def add(self, subscription):
+        """Adds a reference to the subscription. Returns True if the
+        subscription is new to the index."""
+        ref_count = self._ref_counts.get(subscription, 0)
+        self._ref_counts[subscription] = ref_count + 1
+
+        if ref_count > 0:
+            return False
+
+        symbol_key = subscription[0].upper()
+        self._subscriptions_by_symbol.setdefault(symbol_key, {})[subscription] = None
+
+        return True
+
+    def remove(self, subscription):
+        """Removes a reference to the subscription. Returns True if it
+        was the last one and the subscription left the index."""
+        ref_count = self._ref_counts.get(subscription, 0)
+
+        if ref_count > 1:
+            self._ref_counts[subscription] = ref_count - 1
+            return False
+
+        if ref_count == 0:
+            return False
+
+        del self._ref_counts[subscription]
+        symbol_key = subscription[0].upper()
+        symbol_subscriptions = self._subscriptions_by_symbol[symbol_key]
+        del symbol_subscriptions[subscription]
+
+        if not symbol_subscriptions:
+            del self._subscriptions_by_symbol[symbol_key]
+
+        return True
+
+    def replace(self, subscriptions):
+        """Replaces the index contents with a full list of (possibly
+        duplicate) subscriptions.
+
+        @return: tuple of (added, removed) lists of unique subscriptions
+        """
+        ref_counts = {}
+
+        for subscription in subscriptions:
+            ref_counts[subscription] = ref_counts.get(subscription, 0) + 1
+
+        removed = [s for s in self._ref_counts if s not in ref_counts]
+        added = [s for s in ref_counts if s not in self._ref_counts]
+
+        for subscription in removed:
+            self._ref_counts[subscription] = 1
+            self.remove(subscription)
+
+        for subscription in added:
+            self.add(subscription)
+
+        self._ref_counts.update(ref_counts)
+
+        return added, removed
+
+    def apply(self, changes):
+        """Applies incremental `SubscriptionChanges`.
+
+        @return: tuple of (added, removed) lists of subscriptions that
+                 entered or left the index
+        """
+        added = [s for s in changes.added if self.add(s)]
+        removed = [s for s in changes.removed if self.remove(s)]
+        readded = set(added) & set(removed)
+
+        return (
+            [s for s in added if s not in readded],
+            [s for s in removed if s not in readded]
+        )
+
+    def ref_count(self, subscription):
+        return self._ref_counts.get(subscription, 0)
+
+    def subscriptions(self):
+        """Returns the unique subscriptions."""
+        return list(self._ref_counts)
+
+    def symbols(self):
+        """Returns the unique symbols, spelled as in their first subscription."""
+        return [next(iter(subscriptions))[0]
+                for subscriptions in self._subscriptions_by_symbol.values()]
+
+    def subscriptions_for(self, symbol):
+        """Returns the unique subscriptions of the symbol."""
+        return list(self._subscriptions_by_symbol.get(symbol.upper(), ()))
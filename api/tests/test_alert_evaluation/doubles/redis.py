@@ -0,0 +1,25 @@
+class PubSubStub:
+    """Records subscriptions and serves the queued messages."""
+
+    def __init__(self, messages=()):
+        self.messages = list(messages)
+        self.patterns = []
+        self.channels = set()
+
+    def psubscribe(self, *patterns):
+        self.patterns.extend(patterns)
+
+    def subscribe(self, *channels):
+        self.channels.update(channels)
+
+    def unsubscribe(self, *channels):
+        self.channels.difference_update(channels)
+
+    def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        if not self.messages:
+            return None
+
+        channel, data = self.messages.pop(0)
+
+        return {'type': 'pmessage', 'pattern': b'symbol-*',
+                'channel': channel.encode('utf-8'), 'data': data}
@@ -0,0 +1,52 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import unittest
+
+from alert_evaluation.index import AlertIndex
+from alert_evaluation.rules import AlertRule
+from stock_subscriptions_sources.subscription_index import SubscriptionChanges
+
+CHANNEL = 'symbol-aapl-1minute-1day'
+
+def rule(rule_id, value, condition='crosses_above', channel=CHANNEL, indicator='rsi14'):
+    return AlertRule(rule_id, f'alert {rule_id}', channel, indicator, condition, value)
+
+class Test_Index_AlertIndex(unittest.TestCase):
+
+    def test_crossed_returns_rules_crossed_upwards(self):
+        alert_index = AlertIndex()
+        alert_index.apply(SubscriptionChanges([rule('1', 30), rule('2', 50), rule('3', 70), rule('4', 50, 'crosses_below')], []))
+
+        self.assertEqual(alert_index.crossed(CHANNEL, 'rsi14', 30, 60), [rule('2', 50)])
+        self.assertEqual(alert_index.crossed(CHANNEL, 'rsi14', 29.9, 70), [rule('1', 30), rule('2', 50), rule('3', 70)])
+
+    def test_crossed_returns_rules_crossed_downwards(self):
+        alert_index = AlertIndex()
+        alert_index.apply(SubscriptionChanges([rule('1', 30, 'crosses_below'), rule('2', 50, 'crosses_below'), rule('3', 50)], []))
+
+        self.assertEqual(alert_index.crossed(CHANNEL, 'rsi14', 50, 20), [rule('1', 30, 'crosses_below')])
+        self.assertEqual(alert_index.crossed(CHANNEL, 'rsi14', 50, 50), [])
+
+    def test_crossed_ignores_other_channels_and_indicators(self):
+        alert_index = AlertIndex()
+        alert_index.apply(SubscriptionChanges([rule('1', 50, channel='symbol-msft-1minute-1day'), rule('2', 50, indicator='stoch14')], []))
+
+        self.assertEqual(alert_index.crossed(CHANNEL, 'rsi14', 0, 100), [])
+
+    def test_apply_replaces_changed_rule_and_reports_channel_changes(self):
+        alert_index = AlertIndex()
+        self.assertEqual(alert_index.apply(SubscriptionChanges([rule('1', 30)], [])), {CHANNEL})
+
+        changed_channels = alert_index.apply(SubscriptionChanges([rule('1', 60)], [rule('1', 30)]))
+
+        self.assertEqual(changed_channels, set())
+        self.assertEqual(alert_index.crossed(CHANNEL, 'rsi14', 0, 100), [rule('1', 60)])
+
+    def test_apply_drops_channel_with_last_rule_removed(self):
+        alert_index = AlertIndex()
+        alert_index.apply(SubscriptionChanges([rule('1', 30)], []))
+
+        self.assertEqual(alert_index.apply(SubscriptionChanges([], [rule('1', 30)])), {CHANNEL})
+        self.assertEqual(alert_index.channels(), set())
+        self.assertEqual(len(alert_index), 0)
@@ -0,0 +1,35 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import datetime
+import unittest
+
+from unittest.mock import patch
+
+from bson import ObjectId
+
+from alert_evaluation.rules import AlertRule, AlertRules
+from factories import AlertFactory
+
+ALERT_ID = ObjectId()
+
+class Test_Rules_AlertRules(unittest.TestCase):
+
+    @patch('stock_subscriptions_sources.alerts.Alert')
+    def test_subscription_changes_returns_rules_of_alerts(self, mock_alert):
+        mock_alert.objects.only.return_value = [
+            AlertFactory(id=ALERT_ID, name='oversold', value=30, symbol='aapl', frequency='1minute', period='1day',
+                         indicator='rsi14', condition='crosses_below', updated_at=datetime.datetime(2024, 6, 1))
+        ]
+
+        changes = AlertRules(change_tracking='polling', poll_interval_secs=5).subscription_changes()
+
+        self.assertEqual(changes.added, [AlertRule(str(ALERT_ID), 'oversold', 'symbol-aapl-1minute-1day', 'rsi14', 'crosses_below', 30)])
+
+    def test_document_record_defaults_indicator_and_condition(self):
+        rules = AlertRules(change_tracking='polling', poll_interval_secs=5)
+
+        self.assertEqual(
+            rules._document_record({'_id': ALERT_ID, 'name': 'n', 'value': 70, 'symbol': 'aapl', 'frequency': '1minute', 'period': '1day'}),
+            AlertRule(str(ALERT_ID), 'n', 'symbol-aapl-1minute-1day', 'rsi14', 'crosses_above', 70)
+        )
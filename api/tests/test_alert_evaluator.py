@@ -0,0 +1,183 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import json
+import unittest
+
+from alert_evaluator import AlertEvaluator, UnknownSubscribeModeError
+from alert_evaluation.rules import AlertRule
+from messaging.codecs import JsonCodec
+from messaging.messages import Candle, Message
+from stock_publishers.redis_snapshots import RedisSnapshots
+from stock_publishers.redis_streams import RedisStreamsSubscriber
+from stock_subscriptions_sources.subscription_index import SubscriptionChanges
+from test_alert_evaluation.doubles.redis import PubSubStub
+from test_core.doubles.clock import FakeClock
+from test_stock_publishers.doubles.redis import PublisherSpy, RedisSnapshotsStub, RedisStreamsStub
+from test_stock_subscriptions_sources.doubles.alerts import ScriptedSubscriptionChangesAlertsStub
+
+CHANNEL = 'symbol-aapl-1minute-1day'
+ABOVE_4 = AlertRule('1', 'above 4', CHANNEL, 'sma2', 'crosses_above', 4)
+BELOW_2 = AlertRule('2', 'below 2', CHANNEL, 'sma2', 'crosses_below', 2)
+
+def candle(i, close):
+    return Candle(i * 60000, close, close, close, close, 100)
+
+def payload(message_type, *candles, sequence=0):
+    return JsonCodec().encode(Message(message_type, candles[-1].datetime if candles else 0, candles, sequence=sequence))
+
+HISTORY = payload('history', candle(0, 1.0), candle(1, 3.0), candle(2, 3.0))  # sma2 3.0
+
+class Test_AlertEvaluator_AlertEvaluator(unittest.TestCase):
+
+    def setUp(self):
+        self.publisher_spy = PublisherSpy()
+        self.pubsub_stub = PubSubStub()
+
+    def alert_evaluator(self, changes, subscribe_mode='pattern'):
+        return AlertEvaluator(
+            ScriptedSubscriptionChangesAlertsStub(changes),
+            self.pubsub_stub,
+            self.publisher_spy,
+            ['sma2'],
+            subscribe_mode=subscribe_mode
+        )
+
+    def test_evaluate_publishes_alerts_whose_threshold_the_indicator_crossed(self):
+        alert_evaluator = self.alert_evaluator([SubscriptionChanges([ABOVE_4, BELOW_2], [])])
+        alert_evaluator.reload()
+        alert_evaluator.evaluate(CHANNEL, HISTORY)
+
+        triggered = alert_evaluator.evaluate(CHANNEL, payload('candle_update', candle(2, 7.0)))  # sma2 5.0
+
+        self.assertEqual(triggered, [(ABOVE_4, 5.0)])
+        self.assertEqual(self.publisher_spy.published[0][0], 'alerts-triggered')
+        self.assertEqual(
+            json.loads(self.publisher_spy.published[0][1]),
+            {'id': '1', 'name': 'above 4', 'channel': CHANNEL, 'indicator': 'sma2', 'condition': 'crosses_above',
+             'value': 4, 'indicator_value': 5.0, 'timestamp': 120000}
+        )
+
+    def test_evaluate_does_not_trigger_on_history(self):
+        alert_evaluator = self.alert_evaluator([SubscriptionChanges([ABOVE_4], [])])
+        alert_evaluator.reload()
+        alert_evaluator.evaluate(CHANNEL, HISTORY)
+
+        self.assertEqual(alert_evaluator.evaluate(CHANNEL, payload('history', candle(0, 9.0), candle(1, 9.0))), [])
+
+    def snapshot_evaluator(self):
+        self.snapshots = RedisSnapshots(RedisSnapshotsStub())
+        self.snapshots.update([(CHANNEL, Message('history', 120000, (candle(0, 1.0), candle(1, 3.0), candle(2, 3.0)), sequence=5))])
+        alert_evaluator = AlertEvaluator(
+            ScriptedSubscriptionChangesAlertsStub([SubscriptionChanges([ABOVE_4], [])]),
+            self.pubsub_stub, self.publisher_spy, ['sma2'], snapshots=self.snapshots
+        )
+        alert_evaluator.reload()
+
+        return alert_evaluator
+
+    def test_evaluate_starts_late_channel_from_its_snapshot(self):
+        alert_evaluator = self.snapshot_evaluator()
+
+        triggered = alert_evaluator.evaluate(CHANNEL, payload('candle_update', candle(2, 7.0), sequence=6))
+
+        self.assertEqual(triggered, [(ABOVE_4, 5.0)])
+
+    def test_evaluate_skips_messages_already_in_the_snapshot(self):
+        alert_evaluator = self.snapshot_evaluator()
+
+        self.assertEqual(alert_evaluator.evaluate(CHANNEL, payload('candle_update', candle(2, 7.0), sequence=5)), [])
+        self.assertEqual(alert_evaluator.evaluate(CHANNEL, payload('candle_update', candle(2, 7.0), sequence=6)), [(ABOVE_4, 5.0)])
+
+    def test_evaluate_reloads_snapshot_after_a_gap(self):
+        alert_evaluator = self.snapshot_evaluator()
+        alert_evaluator.evaluate(CHANNEL, payload('candle_update', candle(2, 3.0), sequence=6))
+        # 7 and 8 are missed, the snapshot has them
+        self.snapshots.update([(CHANNEL, Message('candle_closed', 180000, (candle(2, 3.5),), sequence=8))])
+
+        with self.assertLogs('alert_evaluator', 'WARNING'):
+            triggered = alert_evaluator.evaluate(CHANNEL, payload('candle_update', candle(3, 5.0), sequence=9))
+
+        # sma2 from (3.5 + 3.5) / 2 to (3.5 + 5.0) / 2
+        self.assertEqual(triggered, [(ABOVE_4, 4.25)])
+
+    def test_evaluate_reloads_snapshot_on_snapshot_notice(self):
+        alert_evaluator = self.snapshot_evaluator()
+        alert_evaluator.evaluate(CHANNEL, payload('candle_update', candle(2, 3.0), sequence=6))
+        self.snapshots.update([(CHANNEL, Message('history', 60000, (candle(0, 5.0), candle(1, 5.0)), sequence=1))])
+
+        self.assertEqual(alert_evaluator.evaluate(CHANNEL, payload('snapshot', sequence=1)), [])
+        self.assertEqual(alert_evaluator.evaluate(CHANNEL, payload('candle_update', candle(1, 1.0), sequence=2)), [])
+        self.assertEqual(alert_evaluator.evaluate(CHANNEL, payload('candle_update', candle(1, 9.0), sequence=3)), [(ABOVE_4, 7.0)])
+
+    def test_evaluate_waits_for_snapshot_of_new_channel(self):
+        alert_evaluator = self.snapshot_evaluator()
+
+        self.assertEqual(alert_evaluator.evaluate('symbol-msft-1minute-1day', payload('candle_update', candle(2, 7.0), sequence=3)), [])
+
+    def test_evaluate_skips_undecodable_message(self):
+        alert_evaluator = self.alert_evaluator([SubscriptionChanges([ABOVE_4], [])])
+
+        self.assertEqual(alert_evaluator.evaluate(CHANNEL, b'not json'), [])
+
+    def test_reload_applies_removed_alerts(self):
+        alert_evaluator = self.alert_evaluator([SubscriptionChanges([ABOVE_4], []), SubscriptionChanges([], [ABOVE_4])])
+        alert_evaluator.reload()
+        alert_evaluator.reload()
+        alert_evaluator.evaluate(CHANNEL, HISTORY)
+
+        self.assertEqual(alert_evaluator.evaluate(CHANNEL, payload('candle_update', candle(2, 7.0))), [])
+
+    def test_reload_in_channels_mode_subscribes_only_channels_with_alerts(self):
+        alert_evaluator = self.alert_evaluator([SubscriptionChanges([ABOVE_4, BELOW_2], []), SubscriptionChanges([], [ABOVE_4, BELOW_2])], 'channels')
+
+        alert_evaluator.reload()
+        self.assertEqual(self.pubsub_stub.channels, {CHANNEL})
+
+        alert_evaluator.reload()
+        self.assertEqual(self.pubsub_stub.channels, set())
+
+    def test_run_pattern_subscribes_and_evaluates_received_messages(self):
+        clock = FakeClock()
+        self.pubsub_stub.messages = [(CHANNEL, HISTORY), (CHANNEL, payload('candle_closed', candle(2, 7.0)))]
+        alert_evaluator = AlertEvaluator(
+            ScriptedSubscriptionChangesAlertsStub([SubscriptionChanges([ABOVE_4], [])]),
+            self.pubsub_stub, self.publisher_spy, ['sma2'], clock=clock
+        )
+        original_get_message = self.pubsub_stub.get_message
+
+        def get_message(**kwargs):
+            message = original_get_message(**kwargs)
+            alert_evaluator.shutdown = not self.pubsub_stub.messages
+            return message
+
+        self.pubsub_stub.get_message = get_message
+        alert_evaluator.run()
+
+        self.assertEqual(self.pubsub_stub.patterns, ['symbol-*'])
+        self.assertEqual(len(self.publisher_spy.published), 1)
+
+    def test_run_acknowledges_stream_entries_after_evaluating_them(self):
+        redis_stub = RedisStreamsStub()
+        redis_stub.add(CHANNEL, HISTORY)
+        redis_stub.add(CHANNEL, payload('candle_closed', candle(2, 7.0)))
+        subscriber = RedisStreamsSubscriber(redis_stub, 'alert-evaluator', 'a')
+        alert_evaluator = AlertEvaluator(
+            ScriptedSubscriptionChangesAlertsStub([SubscriptionChanges([ABOVE_4], [])]),
+            subscriber, self.publisher_spy, ['sma2'], subscribe_mode='channels', clock=FakeClock()
+        )
+        original_ack = subscriber.ack
+
+        def ack(message):
+            original_ack(message)
+            alert_evaluator.shutdown = not redis_stub.pending[(CHANNEL, 'alert-evaluator')]
+
+        subscriber.ack = ack
+        alert_evaluator.run()
+
+        self.assertEqual(len(self.publisher_spy.published), 1)
+        self.assertEqual(subscriber.backlog(), {CHANNEL: 0})
+
+    def test_unknown_subscribe_mode_raises(self):
+        with self.assertRaises(UnknownSubscribeModeError):
+            self.alert_evaluator([], 'sharded')
@@ -0,0 +1,33 @@
+from messaging.messages import Candle
+
+MINUTE_MS = 60000
+
+class PriceHistoryProviderStub:
+    """Serves `count` 1minute candles ending at `end`, honouring
+    `start_date`, and records the calls."""
+
+    def __init__(self, end, count):
+        self.end = end
+        self.count = count
+        self.price_history_calls = []
+        self.closed = False
+
+    def price_history(self, symbol, frequency, period, start_date=None,
+                      end_date=None, include_extended_data=False):
+        self.price_history_calls.append((symbol, frequency, period, start_date))
+        candles = [candle_at(self.end - i * MINUTE_MS) for i in reversed(range(self.count))]
+
+        if start_date is not None:
+            candles = [c for c in candles if c.datetime >= start_date]
+
+        return {'symbol': symbol.upper(), 'empty': not candles,
+                'candles': [c._asdict() for c in candles]}
+
+    def quotes(self, symbols):
+        return {}
+
+    def close(self):
+        self.closed = True
+
+def candle_at(timestamp):
+    return Candle(timestamp, 10.0, 11.0, 9.0, 10.5, timestamp // MINUTE_MS % 1000)
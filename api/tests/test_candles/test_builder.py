@@ -0,0 +1,68 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import unittest
+
+from zoneinfo import ZoneInfo
+
+from candles.builder import CandleBuilder, CandleEvent
+from messaging.messages import Candle
+
+NEW_YORK = ZoneInfo('America/New_York')
+
+class Test_Builder_CandleBuilder(unittest.TestCase):
+
+    def test_add_quote_opens_candle_at_start_of_its_period(self):
+        candle_builder = CandleBuilder('5minute', NEW_YORK)
+
+        self.assertEqual(
+            candle_builder.add_quote(420000, 10.0, 1000),
+            [CandleEvent(False, Candle(300000, 10.0, 10.0, 10.0, 10.0, 0))]
+        )
+
+    def test_add_quote_updates_ohlc_and_volume_within_period(self):
+        candle_builder = CandleBuilder('1minute', NEW_YORK)
+        candle_builder.add_quote(0, 10.0, 1000)
+        candle_builder.add_quote(10000, 12.0, 1200)
+
+        self.assertEqual(
+            candle_builder.add_quote(20000, 9.0, 1500),
+            [CandleEvent(False, Candle(0, 10.0, 12.0, 9.0, 9.0, 500))]
+        )
+
+    def test_add_quote_at_period_end_closes_candle_and_opens_next(self):
+        candle_builder = CandleBuilder('1minute', NEW_YORK)
+        candle_builder.add_quote(0, 10.0, 1000)
+        candle_builder.add_quote(30000, 11.0, 1400)
+
+        self.assertEqual(
+            candle_builder.add_quote(60000, 12.0, 1500),
+            [
+                CandleEvent(True, Candle(0, 10.0, 11.0, 10.0, 11.0, 400)),
+                CandleEvent(False, Candle(60000, 12.0, 12.0, 12.0, 12.0, 100))
+            ]
+        )
+
+    def test_add_quote_after_gap_opens_candle_of_quote_period(self):
+        candle_builder = CandleBuilder('1minute', NEW_YORK)
+        candle_builder.add_quote(0, 10.0, 1000)
+
+        events = candle_builder.add_quote(185000, 12.0, 1000)
+
+        self.assertEqual(events[1].candle.datetime, 180000)
+
+    def test_seeded_candle_keeps_history_volume_and_adds_traded_volume(self):
+        candle_builder = CandleBuilder('1minute', NEW_YORK)
+        candle_builder.seed(Candle(60414, 10.0, 11.0, 9.0, 10.5, 300))
+        candle_builder.add_quote(70000, 10.6, 5000)
+
+        self.assertEqual(
+            candle_builder.add_quote(80000, 11.5, 5100),
+            [CandleEvent(False, Candle(60000, 10.0, 11.5, 9.0, 11.5, 400))]
+        )
+
+    def test_volume_reset_restarts_volume_base(self):
+        candle_builder = CandleBuilder('1daily', NEW_YORK)
+        candle_builder.add_quote(0, 10.0, 5000)
+
+        self.assertEqual(candle_builder.add_quote(1000, 10.0, 200)[0].candle.volume, 200)
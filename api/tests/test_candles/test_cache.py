@@ -0,0 +1,111 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import os
+import tempfile
+import unittest
+
+from zoneinfo import ZoneInfo
+
+from candles.cache import CachedPriceHistory, CandleCache
+from messaging.messages import Candle
+from test_candles.doubles.provider import MINUTE_MS, PriceHistoryProviderStub, candle_at
+
+NEW_YORK = ZoneInfo('America/New_York')
+MARCH_7_10AM = 1709823600000
+
+def march_7_10am():
+    return MARCH_7_10AM / 1000
+
+class Test_Cache_CandleCache(unittest.TestCase):
+
+    def test_load_returns_saved_candles_after_reopening(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache', 'candles.sqlite3')
+            candle_cache = CandleCache(path)
+            candle_cache.save('aapl', '1minute', '1day', [candle_at(MINUTE_MS), candle_at(0)])
+            candle_cache.close()
+
+            candle_cache = CandleCache(path)
+
+            self.assertEqual(candle_cache.load('AAPL', '1minute'), (candle_at(0), candle_at(MINUTE_MS)))
+            self.assertEqual(candle_cache.period('AAPL', '1minute'), '1day')
+            candle_cache.close()
+
+    def test_save_replaces_candles_and_deletes_candles_before_keep_from(self):
+        candle_cache = CandleCache(':memory:')
+        candle_cache.save('AAPL', '1minute', '1day', [candle_at(0), candle_at(MINUTE_MS)])
+        candle_cache.save('AAPL', '1minute', '1day', [Candle(MINUTE_MS, 1.0, 1.0, 1.0, 1.0, 1)], keep_from=MINUTE_MS)
+
+        self.assertEqual(candle_cache.load('AAPL', '1minute'), (Candle(MINUTE_MS, 1.0, 1.0, 1.0, 1.0, 1),))
+
+    def test_period_of_unknown_series_is_none(self):
+        self.assertIsNone(CandleCache(':memory:').period('AAPL', '1minute'))
+
+class Test_Cache_CachedPriceHistory(unittest.TestCase):
+
+    def test_price_history_downloads_only_tail_after_restart(self):
+        candle_cache = CandleCache(':memory:')
+        provider_stub = PriceHistoryProviderStub(MARCH_7_10AM, 30)
+        CachedPriceHistory(provider_stub, candle_cache, NEW_YORK, march_7_10am).price_history('aapl', '1minute', '1day')
+
+        provider_stub.end += 5 * MINUTE_MS  # five minutes later
+        price_history = CachedPriceHistory(provider_stub, candle_cache, NEW_YORK, march_7_10am).price_history('aapl', '1minute', '1day')
+
+        self.assertEqual(provider_stub.price_history_calls, [
+            ('aapl', '1minute', '1day', None),
+            ('aapl', '1minute', '1day', MARCH_7_10AM)
+        ])
+        self.assertEqual(
+            [c['datetime'] for c in price_history['candles']],
+            [MARCH_7_10AM - i * MINUTE_MS for i in reversed(range(-5, 30))]
+        )
+        self.assertEqual(len(candle_cache.load('aapl', '1minute')), 35)
+
+    def test_price_history_downloads_in_full_if_cached_period_is_shorter(self):
+        candle_cache = CandleCache(':memory:')
+        provider_stub = PriceHistoryProviderStub(MARCH_7_10AM, 3)
+        cached_price_history = CachedPriceHistory(provider_stub, candle_cache, NEW_YORK, march_7_10am)
+        cached_price_history.price_history('aapl', '1minute', '1day')
+
+        cached_price_history.price_history('aapl', '1minute', '5day')
+
+        self.assertEqual(provider_stub.price_history_calls[-1], ('aapl', '1minute', '5day', None))
+        self.assertEqual(candle_cache.period('aapl', '1minute'), '5day')
+
+    def test_price_history_downloads_in_full_if_cached_ytd_starts_after_requested_period(self):
+        candle_cache = CandleCache(':memory:')
+        candle_cache.save('AAPL', '1daily', '1ytd', [candle_at(MARCH_7_10AM)])
+        provider_stub = PriceHistoryProviderStub(MARCH_7_10AM, 1)
+        cached_price_history = CachedPriceHistory(provider_stub, candle_cache, NEW_YORK, march_7_10am)
+
+        cached_price_history.price_history('aapl', '1daily', '1year')
+        candle_cache.save('MSFT', '1daily', '1ytd', [candle_at(MARCH_7_10AM)])
+        cached_price_history.price_history('msft', '1daily', '6month')
+
+        self.assertEqual(provider_stub.price_history_calls, [
+            ('aapl', '1daily', '1year', None),
+            ('msft', '1daily', '6month', None)
+        ])
+
+    def test_price_history_trims_cached_series_to_requested_period(self):
+        candle_cache = CandleCache(':memory:')
+        day = 86400000
+        candle_cache.save('AAPL', '1daily', '1year', [candle_at(MARCH_7_10AM - i * 35 * day) for i in range(3)])
+        provider_stub = PriceHistoryProviderStub(MARCH_7_10AM, 1)
+
+        price_history = CachedPriceHistory(provider_stub, candle_cache, NEW_YORK, march_7_10am).price_history('aapl', '1daily', '1month')
+
+        self.assertEqual([c['datetime'] for c in price_history['candles']], [MARCH_7_10AM])
+
+    def test_price_history_with_start_date_bypasses_cache(self):
+        provider_stub = PriceHistoryProviderStub(MARCH_7_10AM, 3)
+        CachedPriceHistory(provider_stub, CandleCache(':memory:'), NEW_YORK, march_7_10am).price_history('aapl', '1minute', '1day', start_date=MARCH_7_10AM)
+
+        self.assertEqual(provider_stub.price_history_calls, [('aapl', '1minute', '1day', MARCH_7_10AM)])
+
+    def test_close_closes_provider(self):
+        provider_stub = PriceHistoryProviderStub(MARCH_7_10AM, 3)
+        CachedPriceHistory(provider_stub, CandleCache(':memory:'), NEW_YORK, march_7_10am).close()
+
+        self.assertTrue(provider_stub.closed)
@@ -0,0 +1,59 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import datetime
+import unittest
+
+from zoneinfo import ZoneInfo
+
+from candles.exceptions import UnknownFrequencyError
+from candles.frequency import Frequency, parse_frequency
+
+NEW_YORK = ZoneInfo('America/New_York')
+
+def ms(*args):
+    return int(datetime.datetime(*args, tzinfo=NEW_YORK).timestamp() * 1000)
+
+class Test_Frequency_Frequency(unittest.TestCase):
+
+    def test_parse_frequency_splits_multiplier_and_unit(self):
+        self.assertEqual(parse_frequency('5minute'), Frequency(5, 'minute'))
+        self.assertEqual(parse_frequency('1daily'), Frequency(1, 'daily'))
+
+    def test_parse_frequency_raises_unknownfrequencyerror_for_unknown_unit_or_multiplier(self):
+        for frequency in ('5hour', 'minute', '0minute', '1minute1'):
+            with self.assertRaises(UnknownFrequencyError):
+                parse_frequency(frequency)
+
+    def test_minute_candles_are_aligned_to_multiples_of_their_size(self):
+        frequency = parse_frequency('5minute')
+        start = frequency.candle_start(ms(2024, 3, 7, 9, 33, 12), NEW_YORK)
+
+        self.assertEqual(start, ms(2024, 3, 7, 9, 30))
+        self.assertEqual(frequency.candle_end(start, NEW_YORK), ms(2024, 3, 7, 9, 35))
+
+    def test_daily_candles_start_at_market_midnight(self):
+        frequency = parse_frequency('1daily')
+        start = frequency.candle_start(ms(2024, 3, 7, 23, 59), NEW_YORK)
+
+        self.assertEqual(start, ms(2024, 3, 7))
+        self.assertEqual(frequency.candle_end(start, NEW_YORK), ms(2024, 3, 8))
+
+    def test_daily_candle_spanning_dst_change_ends_at_next_midnight(self):
+        frequency = parse_frequency('1daily')
+
+        self.assertEqual(frequency.candle_end(ms(2024, 3, 10), NEW_YORK), ms(2024, 3, 11))
+
+    def test_weekly_candles_start_on_monday(self):
+        frequency = parse_frequency('1weekly')
+        start = frequency.candle_start(ms(2024, 3, 7, 12), NEW_YORK)  # Thursday
+
+        self.assertEqual(start, ms(2024, 3, 4))
+        self.assertEqual(frequency.candle_end(start, NEW_YORK), ms(2024, 3, 11))
+
+    def test_monthly_candles_start_on_first_of_month(self):
+        frequency = parse_frequency('1monthly')
+        start = frequency.candle_start(ms(2024, 12, 17, 12), NEW_YORK)
+
+        self.assertEqual(start, ms(2024, 12, 1))
+        self.assertEqual(frequency.candle_end(start, NEW_YORK), ms(2025, 1, 1))
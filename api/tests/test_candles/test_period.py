@@ -0,0 +1,48 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import datetime
+import unittest
+
+from zoneinfo import ZoneInfo
+
+from candles.exceptions import UnknownPeriodError
+from candles.period import Period, parse_period
+from messaging.messages import Candle
+
+NEW_YORK = ZoneInfo('America/New_York')
+
+def candle_on(*args):
+    return Candle(int(datetime.datetime(*args, tzinfo=NEW_YORK).timestamp() * 1000), 1.0, 1.0, 1.0, 1.0, 1)
+
+class Test_Period_Period(unittest.TestCase):
+
+    def test_parse_period_splits_multiplier_and_unit(self):
+        self.assertEqual(parse_period('10day'), Period(10, 'day'))
+
+    def test_parse_period_raises_unknownperioderror_for_unknown_unit(self):
+        with self.assertRaises(UnknownPeriodError):
+            parse_period('1week')
+
+    def test_start_date_counts_back_from_today(self):
+        today = datetime.date(2024, 3, 31)
+
+        self.assertEqual(parse_period('10day').start_date(today), datetime.date(2024, 3, 17))
+        self.assertEqual(parse_period('1month').start_date(today), datetime.date(2024, 2, 29))
+        self.assertEqual(parse_period('1year').start_date(today), datetime.date(2023, 3, 31))
+        self.assertEqual(parse_period('1ytd').start_date(today), datetime.date(2024, 1, 1))
+
+    def test_trim_counts_days_with_candles(self):
+        candles = (candle_on(2024, 3, 7, 10), candle_on(2024, 3, 8, 10), candle_on(2024, 3, 11, 10), candle_on(2024, 3, 11, 11))
+
+        self.assertEqual(parse_period('2day').trim(candles, NEW_YORK), candles[1:])
+
+    def test_trim_counts_months_back_from_last_candle(self):
+        candles = (candle_on(2024, 1, 30), candle_on(2024, 2, 29), candle_on(2024, 3, 31))
+
+        self.assertEqual(parse_period('1month').trim(candles, NEW_YORK), candles[1:])
+
+    def test_trim_ytd_keeps_candles_of_last_candle_year(self):
+        candles = (candle_on(2023, 12, 29), candle_on(2024, 1, 2))
+
+        self.assertEqual(parse_period('1ytd').trim(candles, NEW_YORK), candles[1:])
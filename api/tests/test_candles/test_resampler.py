@@ -0,0 +1,75 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import datetime
+import unittest
+
+from zoneinfo import ZoneInfo
+
+from candles.frequency import parse_frequency
+from candles.resampler import BaseSeries, base_series, derive, resample
+from messaging.messages import Candle
+
+NEW_YORK = ZoneInfo('America/New_York')
+
+class Test_Resampler_Resampler(unittest.TestCase):
+
+    def test_base_series_uses_finest_common_minute_frequency_and_longest_period(self):
+        plan = base_series([
+            ('AAPL', '5minute', '1day'),
+            ('aapl', '15minute', '10day'),
+            ('MSFT', '30minute', '2day')
+        ])
+
+        self.assertEqual(plan[('AAPL', '5minute', '1day')], BaseSeries('AAPL', '5minute', '10day'))
+        self.assertEqual(plan[('aapl', '15minute', '10day')], BaseSeries('AAPL', '5minute', '10day'))
+        self.assertEqual(plan[('MSFT', '30minute', '2day')], BaseSeries('MSFT', '30minute', '2day'))
+
+    def test_base_series_derives_weekly_and_monthly_from_daily_separately_from_intraday(self):
+        plan = base_series([
+            ('AAPL', '1minute', '1day'),
+            ('AAPL', '1weekly', '1year'),
+            ('AAPL', '1monthly', '6month')
+        ])
+
+        self.assertEqual(plan[('AAPL', '1minute', '1day')], BaseSeries('AAPL', '1minute', '1day'))
+        self.assertEqual(plan[('AAPL', '1weekly', '1year')], BaseSeries('AAPL', '1daily', '1year'))
+        self.assertEqual(plan[('AAPL', '1monthly', '6month')], BaseSeries('AAPL', '1daily', '1year'))
+
+    def test_base_series_uses_period_starting_earliest_with_ytd(self):
+        subscriptions = [('AAPL', '1daily', '1ytd'), ('AAPL', '1daily', '1year'), ('MSFT', '1daily', '1ytd'), ('MSFT', '1daily', '6month')]
+
+        in_march = base_series(subscriptions, today=datetime.date(2024, 3, 15))
+        in_october = base_series(subscriptions, today=datetime.date(2024, 10, 15))
+
+        self.assertEqual(in_march[('AAPL', '1daily', '1ytd')], BaseSeries('AAPL', '1daily', '1year'))
+        self.assertEqual(in_march[('MSFT', '1daily', '1ytd')], BaseSeries('MSFT', '1daily', '6month'))
+        self.assertEqual(in_october[('AAPL', '1daily', '1ytd')], BaseSeries('AAPL', '1daily', '1year'))
+        self.assertEqual(in_october[('MSFT', '1daily', '6month')], BaseSeries('MSFT', '1daily', '1ytd'))
+
+    def test_resample_aggregates_ohlcv_per_period(self):
+        candles = [Candle(i * 60000, 10.0 + i, 11.0 + i, 9.0 + i, 10.5 + i, 100) for i in range(7)]
+
+        self.assertEqual(
+            resample(candles, parse_frequency('5minute'), NEW_YORK),
+            (
+                Candle(0, 10.0, 15.0, 9.0, 14.5, 500),
+                Candle(300000, 15.0, 17.0, 14.0, 16.5, 200)
+            )
+        )
+
+    def test_derive_returns_base_candles_for_base_timeframe(self):
+        candles = [Candle(60414, 10.0, 11.0, 9.0, 10.5, 100)]
+        series = BaseSeries('AAPL', '1minute', '1day')
+
+        self.assertEqual(derive(candles, series, ('AAPL', '1minute', '1day'), NEW_YORK), tuple(candles))
+
+    def test_derive_trims_to_subscription_period(self):
+        day = 86400000
+        candles = [Candle(1709704800000 + i * day, 10.0, 11.0, 9.0, 10.5, 100) for i in range(3)]
+        series = BaseSeries('AAPL', '1minute', '10day')
+
+        self.assertEqual(
+            derive(candles, series, ('AAPL', '5minute', '2day'), NEW_YORK),
+            (Candle(1709791200000, 10.0, 11.0, 9.0, 10.5, 100), Candle(1709877600000, 10.0, 11.0, 9.0, 10.5, 100))
+        )
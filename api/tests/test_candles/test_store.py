@@ -0,0 +1,75 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import json
+import unittest
+
+from candles.store import CandleStore
+from messaging.messages import Candle
+
+def candle(i):
+    return Candle(i * 60000, 10.0 + i, 11.0 + i, 9.0 + i, 10.5 + i, 100 + i)
+
+class Test_Store_CandleStore(unittest.TestCase):
+
+    def test_candles_returns_appended_candles_oldest_first(self):
+        candle_store = CandleStore(100)
+        candle_store.extend(candle(i) for i in range(3))
+
+        self.assertEqual(candle_store.candles(), (candle(0), candle(1), candle(2)))
+        self.assertEqual(candle_store.last(), candle(2))
+
+    def test_candles_are_plain_python_values(self):
+        candle_store = CandleStore(100)
+        candle_store.append(candle(1))
+
+        self.assertEqual(json.dumps(candle_store.last()), '[60000, 11.0, 12.0, 10.0, 11.5, 101]')
+
+    def test_append_beyond_capacity_drops_oldest_candles(self):
+        candle_store = CandleStore(100)
+        candle_store.extend(candle(i) for i in range(250))
+
+        self.assertEqual(len(candle_store), 100)
+        self.assertEqual(candle_store.candles(), tuple(candle(i) for i in range(150, 250)))
+
+    def test_extend_wrapping_around_full_store_matches_appends(self):
+        for appended, extended in [(70, 10), (100, 60), (130, 100), (5, 300)]:
+            extended_store, appended_store = CandleStore(100), CandleStore(100)
+
+            for i in range(appended):
+                extended_store.append(candle(i))
+
+            extended_store.extend(candle(i) for i in range(appended, appended + extended))
+
+            for i in range(appended + extended):
+                appended_store.append(candle(i))
+
+            self.assertEqual(extended_store.candles(), appended_store.candles())
+            extended_store.append(candle(1000))
+            self.assertEqual(extended_store.candles(2), (appended_store.last(), candle(1000)))
+
+    def test_window_returns_contiguous_views_of_newest_candles(self):
+        candle_store = CandleStore(100)
+        candle_store.extend(candle(i) for i in range(130))
+
+        window = candle_store.window(50)
+
+        self.assertEqual(window.datetime.tolist(), [i * 60000 for i in range(80, 130)])
+        self.assertTrue(window.close.flags.c_contiguous)
+        self.assertFalse(window.close.flags.owndata)
+        self.assertFalse(window.close.flags.writeable)
+
+    def test_upsert_replaces_open_candle_and_appends_next(self):
+        candle_store = CandleStore(100)
+        candle_store.extend([candle(0), candle(1)])
+
+        candle_store.upsert(Candle(60000, 1.0, 2.0, 0.5, 1.5, 7))
+        candle_store.upsert(candle(2))
+
+        self.assertEqual(candle_store.candles(), (candle(0), Candle(60000, 1.0, 2.0, 0.5, 1.5, 7), candle(2)))
+
+    def test_empty_store_has_no_candles(self):
+        candle_store = CandleStore(10)
+
+        self.assertIsNone(candle_store.last())
+        self.assertEqual(candle_store.candles(), ())
@@ -0,0 +1,22 @@
+from test_stock_publishers.doubles.redis import AsyncRedisStub, RedisStub
+
+class ClientsStub:
+    """`core.clients.Clients` handing out Redis stubs and counting the
+    requests of the Mongo connection."""
+
+    def __init__(self):
+        self.redis_client = RedisStub()
+        self.async_redis_client = AsyncRedisStub()
+        self.mongo_calls = 0
+
+    def redis(self):
+        return self.redis_client
+
+    def async_redis(self):
+        return self.async_redis_client
+
+    def mongo(self):
+        self.mongo_calls += 1
+
+    def close(self):
+        pass
@@ -0,0 +1,13 @@
+class FakeClock:
+    """Manually advanced monotonic clock. `sleep` advances it."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, secs):
+        self.slept.append(secs)
+        self.now += secs
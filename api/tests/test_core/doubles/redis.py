@@ -0,0 +1,18 @@
+import redis
+
+class RedisKeysStub:
+    """Redis client keeping plain keys. With `failing` set, every call
+    raises a connection error."""
+
+    def __init__(self, keys=None):
+        self.keys = dict(keys or {})
+        self.failing = False
+
+    def set(self, name, value):
+        self.keys[name] = value if isinstance(value, bytes) else str(value).encode('utf-8')
+
+    def getdel(self, name):
+        if self.failing:
+            raise redis.exceptions.ConnectionError('connection refused')
+
+        return self.keys.pop(name, None)
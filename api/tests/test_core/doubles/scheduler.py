@@ -0,0 +1,23 @@
+class ScriptedTickSchedulerStub:
+    """Never waits, each `due` call returns the next of the given sets
+    of groups, then the last one again."""
+
+    def __init__(self, due_groups):
+        self._due_groups = list(due_groups)
+
+    def delay(self):
+        return 0
+
+    def due(self):
+        return self._due_groups.pop(0) if len(self._due_groups) > 1 else self._due_groups[0]
+
+class ScriptedSessionTickSchedulerStub(ScriptedTickSchedulerStub):
+    """`ScriptedTickSchedulerStub` whose `session_opened` calls return
+    the given booleans, then False."""
+
+    def __init__(self, due_groups, session_opened):
+        super().__init__(due_groups)
+        self._session_opened = list(session_opened)
+
+    def session_opened(self):
+        return self._session_opened.pop(0) if self._session_opened else False
@@ -0,0 +1,42 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import unittest
+from unittest.mock import patch
+
+from core.clients import Clients
+from core.utils import DotDict
+
+CONFIG = DotDict({
+    'Redis': {'Host': 'localhost', 'Port': 6379, 'MaxConnections': 5},
+    'Database': {'ConnectionString': 'mongodb://localhost:27017', 'Name': 'alertos', 'MaxPoolSize': 10}
+})
+
+class TestClients_Clients(unittest.TestCase):
+
+    def test_redis_client_is_created_once_with_pool(self):
+        clients = Clients(CONFIG)
+
+        self.assertIsNone(clients._redis)
+        self.assertIs(clients.redis(), clients.redis())
+        self.assertEqual(clients.redis().connection_pool.max_connections, 5)
+
+        clients.close()
+        self.assertIsNone(clients._redis)
+
+    def test_async_redis_client_is_created_once_with_pool(self):
+        clients = Clients(CONFIG)
+
+        self.assertIs(clients.async_redis(), clients.async_redis())
+        self.assertEqual(clients.async_redis().connection_pool.max_connections, 5)
+
+    @patch('core.clients.mongoengine')
+    def test_mongo_connects_once(self, mongoengine_mock):
+        clients = Clients(CONFIG)
+
+        clients.mongo()
+        clients.mongo()
+        clients.close()
+
+        mongoengine_mock.connect.assert_called_once_with(host='mongodb://localhost:27017', db='alertos', maxPoolSize=10)
+        mongoengine_mock.disconnect.assert_called_once_with()
@@ -8,12 +8,19 @@ from pathlib import Path
 from core.config import Config
 from core.config import InvalidEnvironmentError
 from core.config import Environment
+from core.config import LazyConfig
 from core.utils import DotDict
 
 class TestConfig_Config(unittest.TestCase):
 
     test_config_fixture_path_pattern = Path(__file__).parent / Path('fixtures', 'test_config_{0}.yml')
 
+    def setUp(self):
+        self.config_file_path_pattern = Config.config_file_path_pattern
+
+    def tearDown(self):
+        Config.config_file_path_pattern = self.config_file_path_pattern
+
     def test_to_dotdict_returns_dotdict_instance(self):
         Config.config_file_path_pattern = TestConfig_Config.test_config_fixture_path_pattern
         actual_config = Config(Environment.DEV.value).to_dotdict()
@@ -37,3 +44,21 @@ class TestConfig_Config(unittest.TestCase):
         actual_value = Config(Environment.DEV.value)['MySection']['key']
         expected_value = 'value'
         self.assertEqual(actual_value, expected_value)
+
+
+class TestConfig_LazyConfig(unittest.TestCase):
+
+    def setUp(self):
+        self.config_file_path_pattern = Config.config_file_path_pattern
+        Config.config_file_path_pattern = TestConfig_Config.test_config_fixture_path_pattern
+
+    def tearDown(self):
+        Config.config_file_path_pattern = self.config_file_path_pattern
+
+    def test_loads_config_file_on_first_access(self):
+        config = LazyConfig(Environment.DEV.value)
+        self.assertIsNone(config._dotdict)
+
+        self.assertEqual(config.MySection.key, 'value')
+        self.assertEqual(config['MySection']['key'], 'value')
+        self.assertIs(config.load(), config.load())
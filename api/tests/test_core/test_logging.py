@@ -5,7 +5,7 @@ import logging
 import unittest
 from unittest.mock import patch
 
-from core.logging import get_logger
+from core.logging import configure_logging, get_logger
 from core.utils import DotDict
 
 class TestUtils(unittest.TestCase):
@@ -16,7 +16,13 @@ class TestUtils(unittest.TestCase):
             'Level': 'INFO'
         }
     }))
+    @patch('core.logging._configured', False)
+    @patch('core.logging._logger_names', [])
     def test_returns_logger_instance_with_expected_log_level(self):
         actual_logger = get_logger(__name__)
         self.assertIsInstance(actual_logger, logging.Logger)
+        self.assertEqual(actual_logger.level, logging.NOTSET)
+
+        configure_logging()
+
         self.assertEqual(actual_logger.level, logging.INFO)
\ No newline at end of file
@@ -0,0 +1,40 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import datetime
+import unittest
+
+from zoneinfo import ZoneInfo
+
+from core.market_calendar import MarketCalendar
+
+NEW_YORK = ZoneInfo('America/New_York')
+
+def at(*args):
+    return datetime.datetime(*args, tzinfo=NEW_YORK).timestamp()
+
+class TestMarketCalendar_MarketCalendar(unittest.TestCase):
+
+    def setUp(self):
+        self.calendar = MarketCalendar(NEW_YORK, holidays=['2026-12-25'], early_closes=[datetime.date(2026, 12, 24)])
+
+    def test_session_of_a_weekday(self):
+        self.assertEqual(
+            [self.calendar.session(at(2026, 10, 19, h, m)) for h, m in [(3, 59), (4, 0), (9, 30), (15, 59), (16, 0), (20, 0)]],
+            ['closed', 'pre_market', 'regular', 'regular', 'after_hours', 'closed']
+        )
+
+    def test_weekend_and_holiday_are_closed(self):
+        self.assertEqual(self.calendar.session(at(2026, 10, 17, 12, 0)), 'closed')
+        self.assertEqual(self.calendar.session(at(2026, 12, 25, 12, 0)), 'closed')
+
+    def test_early_close_shortens_regular_and_after_hours_sessions(self):
+        self.assertEqual(self.calendar.session(at(2026, 12, 24, 13, 0)), 'after_hours')
+        self.assertEqual(self.calendar.session(at(2026, 12, 24, 17, 0)), 'closed')
+
+    def test_next_open_skips_weekend_and_holiday(self):
+        self.assertEqual(self.calendar.next_open(at(2026, 10, 16, 20, 0)), at(2026, 10, 19, 4, 0))
+        self.assertEqual(self.calendar.next_open(at(2026, 12, 24, 17, 0)), at(2026, 12, 28, 4, 0))
+
+    def test_next_open_within_a_day_is_the_next_session(self):
+        self.assertEqual(self.calendar.next_open(at(2026, 10, 19, 5, 0)), at(2026, 10, 19, 9, 30))
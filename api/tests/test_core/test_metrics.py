@@ -0,0 +1,90 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import unittest
+import urllib.error
+import urllib.request
+
+from core.metrics import MetricsRegistry, MetricsServer
+
+class TestMetrics_MetricsRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_exposes_counter_per_label_values(self):
+        counter = self.registry.counter('errors_total', 'Errors', ['call'])
+        counter.inc(call='quotes')
+        counter.inc(2, call='quotes')
+        counter.inc(call='price_history')
+
+        self.assertEqual(self.registry.expose(), '\n'.join([
+            '# HELP errors_total Errors',
+            '# TYPE errors_total counter',
+            'errors_total{call="quotes"} 3',
+            'errors_total{call="price_history"} 1'
+        ]) + '\n')
+
+    def test_exposes_cumulative_histogram_buckets(self):
+        histogram = self.registry.histogram('stage_seconds', 'Stages', ['stage'], buckets=[0.1, 1])
+        histogram.observe(0.05, stage='fetch')
+        histogram.observe(0.1, stage='fetch')
+        histogram.observe(5, stage='fetch')
+
+        self.assertIn('\n'.join([
+            'stage_seconds_bucket{stage="fetch",le="0.1"} 2',
+            'stage_seconds_bucket{stage="fetch",le="1"} 2',
+            'stage_seconds_bucket{stage="fetch",le="+Inf"} 3',
+            'stage_seconds_sum{stage="fetch"} 5.15',
+            'stage_seconds_count{stage="fetch"} 3'
+        ]), self.registry.expose())
+
+    def test_time_observes_duration(self):
+        histogram = self.registry.histogram('stage_seconds', 'Stages', ['stage'])
+
+        with histogram.time(stage='publish'):
+            pass
+
+        self.assertEqual(histogram.count(stage='publish'), 1)
+
+    def test_counter_is_created_once(self):
+        self.assertIs(self.registry.counter('errors_total', 'Errors'), self.registry.counter('errors_total', 'Errors'))
+
+        with self.assertRaises(ValueError):
+            self.registry.histogram('errors_total', 'Errors')
+
+    def test_gauge_reads_callback_and_escapes_labels(self):
+        self.registry.gauge('backlog', 'Backlog', lambda: {('a"b',): 4}, ['channel'])
+
+        self.assertIn('backlog{channel="a\\"b"} 4', self.registry.expose())
+
+    def test_failing_gauge_is_left_out(self):
+        self.registry.gauge('broken', 'Broken', lambda: 1 / 0)
+        self.registry.counter('errors_total', 'Errors').inc()
+
+        with self.assertLogs('core.metrics', 'ERROR'):
+            exposed = self.registry.expose()
+
+        self.assertNotIn('broken', exposed)
+        self.assertIn('errors_total 1', exposed)
+
+class TestMetrics_MetricsServer(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.registry.counter('errors_total', 'Errors').inc()
+        self.server = MetricsServer(self.registry, '127.0.0.1', 0).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+
+    def test_serves_metrics(self):
+        with urllib.request.urlopen(f'http://127.0.0.1:{self.server.port}/metrics') as response:
+            self.assertEqual(response.headers['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+            self.assertIn('errors_total 1', response.read().decode('utf-8'))
+
+    def test_responds_404_to_other_paths(self):
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            urllib.request.urlopen(f'http://127.0.0.1:{self.server.port}/')
+
+        self.assertEqual(context.exception.code, 404)
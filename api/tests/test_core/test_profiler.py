@@ -0,0 +1,124 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import os
+import signal
+import tempfile
+import threading
+import unittest
+
+from core.profiler import RedisProfilerTrigger, SamplingProfiler, install_signal_trigger
+from test_core.doubles.redis import RedisKeysStub
+
+def busy_loop_of_the_test(stopped, allocations):
+    while not stopped.is_set():
+        allocations.append(bytearray(1024))
+
+class ProfilerSpy:
+
+    def __init__(self):
+        self.durations = []
+
+    def start(self, duration_secs=None):
+        self.durations.append(duration_secs)
+        return True
+
+class TestProfiler_SamplingProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.TemporaryDirectory()
+        self.profiler = SamplingProfiler(self.output_dir.name, duration_secs=0.2, interval_secs=0.005, top_allocations=3, clock=lambda: 0)
+
+    def tearDown(self):
+        self.output_dir.cleanup()
+
+    def profile(self):
+        stopped = threading.Event()
+        worker = threading.Thread(target=busy_loop_of_the_test, args=(stopped, []), name='worker')
+        worker.start()
+
+        try:
+            self.assertTrue(self.profiler.start())
+            self.profiler.join()
+        finally:
+            stopped.set()
+            worker.join()
+
+        return {name: open(os.path.join(self.output_dir.name, name), encoding='utf-8').read().splitlines()
+                for name in os.listdir(self.output_dir.name)}
+
+    def test_writes_collapsed_stacks_of_other_threads(self):
+        files = self.profile()
+        stacks = files[f'profile-19700101-000000-{os.getpid()}.collapsed']
+
+        worker_stacks = [line for line in stacks if line.startswith('thread worker;')]
+        self.assertTrue(worker_stacks)
+        self.assertIn('busy_loop_of_the_test (test_profiler.py:', worker_stacks[0])
+        self.assertTrue(all(int(line.rsplit(' ', 1)[1]) > 0 for line in stacks))
+        self.assertFalse([line for line in stacks if line.startswith('thread profiler;')])
+
+    def test_writes_top_allocations(self):
+        files = self.profile()
+        allocations = files[f'allocations-19700101-000000-{os.getpid()}.txt']
+
+        self.assertEqual(len(allocations), 3)
+        self.assertTrue(any('test_profiler.py' in line for line in allocations))
+
+    def test_start_is_ignored_while_running(self):
+        self.profiler.start(duration_secs=0.1)
+
+        with self.assertLogs('core.profiler', 'WARNING'):
+            self.assertFalse(self.profiler.start())
+
+        self.profiler.join()
+
+    def test_signal_starts_profile(self):
+        profiler_spy = ProfilerSpy()
+        previous_handler = signal.getsignal(signal.SIGUSR2)
+        install_signal_trigger(profiler_spy, signal.SIGUSR2)
+
+        try:
+            os.kill(os.getpid(), signal.SIGUSR2)
+        finally:
+            signal.signal(signal.SIGUSR2, previous_handler)
+
+        self.assertEqual(profiler_spy.durations, [None])
+
+class TestProfiler_RedisProfilerTrigger(unittest.TestCase):
+
+    def setUp(self):
+        self.redis_client = RedisKeysStub()
+        self.profiler_spy = ProfilerSpy()
+        self.trigger = RedisProfilerTrigger(self.redis_client, 'stock-producer:profile', self.profiler_spy)
+
+    def test_poll_starts_profile_and_deletes_key(self):
+        self.assertFalse(self.trigger.poll())
+
+        self.redis_client.set('stock-producer:profile', 60)
+
+        self.assertTrue(self.trigger.poll())
+        self.assertEqual(self.profiler_spy.durations, [60.0])
+        self.assertEqual(self.redis_client.keys, {})
+
+    def test_poll_uses_default_duration_if_value_invalid(self):
+        self.redis_client.set('stock-producer:profile', 'now')
+
+        with self.assertLogs('core.profiler', 'ERROR'):
+            self.trigger.poll()
+
+        self.assertEqual(self.profiler_spy.durations, [None])
+
+    def test_background_polling_survives_redis_errors(self):
+        self.redis_client.failing = True
+        trigger = RedisProfilerTrigger(self.redis_client, 'stock-producer:profile', self.profiler_spy, poll_interval_secs=0.01)
+
+        with self.assertLogs('core.profiler', 'ERROR'):
+            trigger.start()
+            threading.Event().wait(0.05)
+
+        self.redis_client.failing = False
+        self.redis_client.set('stock-producer:profile', '')
+        threading.Event().wait(0.05)
+        trigger.stop()
+
+        self.assertEqual(self.profiler_spy.durations, [None])
@@ -0,0 +1,80 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import threading
+import time
+import unittest
+
+from core.rate_limiter import TokenBucketRateLimiter
+from test_core.doubles.clock import FakeClock
+
+class TestRateLimiter_TokenBucketRateLimiter(unittest.TestCase):
+
+    def test_acquire_does_not_wait_within_burst_capacity(self):
+        clock = FakeClock()
+        limiter = TokenBucketRateLimiter(rate=10, capacity=5, clock=clock, sleep=clock.sleep)
+
+        waits = [limiter.acquire() for _ in range(5)]
+
+        self.assertEqual(waits, [0.0] * 5)
+        self.assertEqual(clock.slept, [])
+        self.assertEqual(limiter.tokens_left, 0)
+
+    def test_acquire_waits_for_refill_once_burst_is_used(self):
+        clock = FakeClock()
+        limiter = TokenBucketRateLimiter(rate=10, capacity=2, clock=clock, sleep=clock.sleep)
+
+        for _ in range(4):
+            limiter.acquire()
+
+        self.assertEqual(len(clock.slept), 2)
+        self.assertAlmostEqual(clock.slept[0], 0.1)
+        self.assertAlmostEqual(clock.slept[1], 0.1)
+        self.assertAlmostEqual(limiter.wait_secs_total, 0.2)
+
+    def test_tokens_refill_up_to_capacity(self):
+        clock = FakeClock()
+        limiter = TokenBucketRateLimiter(rate=10, capacity=3, clock=clock, sleep=clock.sleep)
+        limiter.acquire(3)
+        clock.now += 10
+
+        self.assertEqual(limiter.tokens_left, 3)
+
+    def test_try_acquire_returns_false_instead_of_waiting(self):
+        clock = FakeClock()
+        limiter = TokenBucketRateLimiter(rate=1, capacity=1, clock=clock, sleep=clock.sleep)
+
+        self.assertTrue(limiter.try_acquire())
+        self.assertFalse(limiter.try_acquire())
+        self.assertEqual(clock.slept, [])
+
+    def test_stats_returns_metrics(self):
+        clock = FakeClock()
+        limiter = TokenBucketRateLimiter(rate=10, capacity=1, clock=clock, sleep=clock.sleep)
+        limiter.acquire()
+        limiter.acquire()
+
+        self.assertEqual(
+            limiter.stats(),
+            {'tokens_left': 0.0, 'acquired_count': 2, 'waits_count': 1, 'wait_secs_total': 0.1}
+        )
+
+    def test_acquire_raises_if_tokens_exceed_capacity(self):
+        limiter = TokenBucketRateLimiter(rate=10, capacity=2)
+
+        with self.assertRaises(ValueError):
+            limiter.acquire(3)
+
+    def test_acquire_enforces_rate_across_threads(self):
+        limiter = TokenBucketRateLimiter(rate=100, capacity=10)
+        start = time.monotonic()
+        threads = [threading.Thread(target=limiter.acquire) for _ in range(30)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        # 10 tokens in the burst, the remaining 20 at 100/s
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
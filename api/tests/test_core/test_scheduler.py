@@ -0,0 +1,118 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import datetime
+import unittest
+
+from zoneinfo import ZoneInfo
+
+from core.market_calendar import MarketCalendar
+from core.scheduler import SessionTickScheduler, TickScheduler
+from test_core.doubles.clock import FakeClock
+
+class TestScheduler_TickScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.monotonic = FakeClock(100.0)
+
+    def scheduler(self, cadences, wall_now=1000.3):
+        return TickScheduler(cadences, late_tolerance_secs=0.1, clock=lambda: wall_now, monotonic=self.monotonic)
+
+    def test_first_deadline_is_aligned_to_the_next_wall_clock_multiple(self):
+        scheduler = self.scheduler({'minute': 1, 'daily': 5})
+
+        self.assertAlmostEqual(scheduler.delay(), 0.7)
+        self.assertEqual(scheduler.due(), set())
+
+        self.monotonic.sleep(scheduler.delay())
+
+        self.assertEqual(scheduler.due(), {'minute'})
+        self.assertAlmostEqual(scheduler.delay(), 1.0)
+
+    def test_groups_fire_at_their_own_cadence(self):
+        scheduler = self.scheduler({'minute': 1, 'daily': 5}, wall_now=1000.0)
+        fired = []
+
+        for _ in range(5):
+            self.monotonic.sleep(scheduler.delay())
+            fired.append(sorted(scheduler.due()))
+
+        self.assertEqual(fired, [['minute'], ['minute'], ['minute'], ['minute'], ['daily', 'minute']])
+
+    def test_deadlines_do_not_drift_with_the_tick_work(self):
+        scheduler = self.scheduler({'minute': 1}, wall_now=1000.0)
+        self.monotonic.sleep(scheduler.delay())
+        scheduler.due()
+
+        self.monotonic.now += 0.05  # fetching and publishing
+
+        self.assertAlmostEqual(scheduler.delay(), 0.95)
+
+    def test_late_tick_is_recorded_and_missed_ticks_are_skipped(self):
+        scheduler = self.scheduler({'minute': 1}, wall_now=1000.0)
+        self.monotonic.now += 3.5
+
+        with self.assertLogs('core.scheduler', 'WARNING'):
+            self.assertEqual(scheduler.due(), {'minute'})
+
+        self.assertAlmostEqual(scheduler.delay(), 0.5)
+        self.assertEqual(scheduler.stats(), {'ticks': 1, 'late_ticks': 1, 'skipped_ticks': 2, 'max_lateness_secs': 2.5})
+
+    def test_tick_within_tolerance_is_not_late(self):
+        scheduler = self.scheduler({'minute': 1}, wall_now=1000.0)
+        self.monotonic.now += 1.05
+
+        scheduler.due()
+
+        self.assertEqual(scheduler.stats()['late_ticks'], 0)
+
+    def test_zero_cadence_is_always_due(self):
+        scheduler = self.scheduler({'minute': 0})
+
+        self.assertEqual(scheduler.delay(), 0)
+        self.assertEqual(scheduler.due(), {'minute'})
+        self.assertEqual(scheduler.due(), {'minute'})
+
+class TestScheduler_SessionTickScheduler(unittest.TestCase):
+
+    def setUp(self):
+        # Monday, 10 minutes before the pre-market opens
+        self.clock = FakeClock(datetime.datetime(2026, 10, 19, 3, 50, tzinfo=ZoneInfo('America/New_York')).timestamp())
+        self.scheduler = SessionTickScheduler(
+            MarketCalendar(ZoneInfo('America/New_York')),
+            {'pre_market': {'minute': 5}, 'regular': {'minute': 1}},
+            idle_check_secs=60, clock=self.clock, monotonic=self.clock
+        )
+
+    def test_idles_outside_sessions(self):
+        self.assertEqual(self.scheduler.due(), set())
+        self.assertEqual(self.scheduler.delay(), 60)
+
+    def test_delay_while_idling_ends_at_the_next_open(self):
+        self.clock.now += 9.5 * 60
+
+        self.assertAlmostEqual(self.scheduler.delay(), 30)
+
+    def test_cadences_follow_the_session(self):
+        self.scheduler.due()
+        self.clock.now += 10 * 60
+
+        self.assertEqual(self.scheduler.due(), set())
+        self.assertEqual(self.scheduler.delay(), 5)
+
+        self.clock.now += 5.5 * 3600  # regular session
+
+        self.assertEqual(self.scheduler.due(), set())
+        self.assertEqual(self.scheduler.delay(), 1)
+
+    def test_session_opened_once_after_idling(self):
+        self.assertFalse(self.scheduler.session_opened())
+
+        self.scheduler.due()
+        self.clock.now += 10 * 60
+        self.scheduler.due()
+        self.clock.now += 5.5 * 3600
+        self.scheduler.due()
+
+        self.assertTrue(self.scheduler.session_opened())
+        self.assertFalse(self.scheduler.session_opened())
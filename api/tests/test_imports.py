@@ -0,0 +1,48 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+from pathlib import Path
+
+SRC_PATH = Path(__file__).parent / '..' / 'src'
+
+# Cold start, a fresh interpreter importing the module, measures ~0.5s
+IMPORT_TIME_BUDGET_SECS = 2.0
+
+COLD_IMPORT = '''
+import json, time
+started = time.perf_counter()
+import {module}
+import_secs = time.perf_counter() - started
+import core, mongoengine.connection
+print(json.dumps({{
+    'import_secs': import_secs,
+    'config_loaded': core.config._dotdict is not None,
+    'mongo_connections': list(mongoengine.connection._connection_settings)
+}}))
+'''
+
+def cold_import(module):
+    env = {**os.environ, 'PYTHONPATH': str(SRC_PATH)}
+    output = subprocess.run([sys.executable, '-c', COLD_IMPORT.format(module=module)],
+                            env=env, capture_output=True, check=True, text=True).stdout
+
+    return json.loads(output)
+
+class Test_Imports_ColdStart(unittest.TestCase):
+
+    def test_importing_entry_points_has_no_side_effects(self):
+        for module in ['stock_producer', 'alert_evaluator']:
+            with self.subTest(module=module):
+                result = cold_import(module)
+
+                self.assertFalse(result['config_loaded'])
+                self.assertEqual(result['mongo_connections'], [])
+
+    def test_importing_stock_producer_stays_within_budget(self):
+        self.assertLess(cold_import('stock_producer')['import_secs'], IMPORT_TIME_BUDGET_SECS)
@@ -0,0 +1,60 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import math
+import unittest
+
+from indicators.engine import IndicatorEngine, IndicatorStreams
+from messaging.messages import Candle, Message
+
+def candle(i, close):
+    return Candle(i * 60000, close, close, close, close, 100)
+
+class Test_Engine_IndicatorEngine(unittest.TestCase):
+
+    def test_bootstrap_returns_value_per_candle_and_treats_last_candle_as_open(self):
+        engine = IndicatorEngine(['sma2'])
+
+        series = engine.bootstrap((candle(0, 1.0), candle(1, 3.0), candle(2, 5.0)))
+
+        self.assertEqual(series['sma2'][1:].tolist(), [2.0, 4.0])
+        self.assertEqual(engine.values, {'sma2': 4.0})
+
+    def test_update_of_open_candle_previews_and_newer_candle_commits_it(self):
+        engine = IndicatorEngine(['sma2'])
+        engine.bootstrap((candle(0, 1.0), candle(1, 3.0)))
+
+        self.assertEqual(engine.update(candle(1, 5.0), closed=False), {'sma2': 3.0})
+        self.assertEqual(engine.update(candle(2, 7.0), closed=False), {'sma2': 6.0})
+
+    def test_closed_candle_is_committed_once(self):
+        engine = IndicatorEngine(['sma2'])
+        engine.bootstrap((candle(0, 1.0), candle(1, 3.0)))
+
+        engine.update(candle(1, 3.0), closed=True)
+
+        self.assertEqual(engine.update(candle(2, 7.0), closed=False), {'sma2': 5.0})
+
+    def test_values_are_nan_without_history(self):
+        self.assertTrue(math.isnan(IndicatorEngine(['rsi14']).values['rsi14']))
+
+class Test_Engine_IndicatorStreams(unittest.TestCase):
+
+    def test_apply_bootstraps_on_history_and_updates_on_live_candles(self):
+        streams = IndicatorStreams(['sma2'])
+        stream = ('AAPL', '1minute', '1day')
+
+        self.assertIsNone(streams.apply(stream, Message('candle_update', 0, (candle(0, 1.0),))))
+        streams.apply(stream, Message('history', 60000, (candle(0, 1.0), candle(1, 3.0))))
+
+        self.assertEqual(streams.apply(stream, Message('candle_closed', 60000, (candle(1, 5.0),))), {'sma2': 3.0})
+        self.assertEqual(streams.values(stream), {'sma2': 3.0})
+
+    def test_remove_forgets_stream(self):
+        streams = IndicatorStreams(['sma2'])
+        stream = ('AAPL', '1minute', '1day')
+        streams.apply(stream, Message('history', 0, (candle(0, 1.0),)))
+
+        streams.remove(stream)
+
+        self.assertIsNone(streams.values(stream))
@@ -0,0 +1,87 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import math
+import unittest
+
+import numpy as np
+
+from candles.store import candle_window
+from indicators.exceptions import UnknownIndicatorError
+from indicators.indicators import EMA, RSI, SMA, Stochastic, parse_indicator
+from messaging.messages import Candle
+
+def candles_of(closes):
+    return tuple(Candle(i * 60000, c, c + 1.0, c - 1.0, c, 100) for i, c in enumerate(closes))
+
+def random_candles(count, seed=7):
+    closes = 100 + np.cumsum(np.random.default_rng(seed).normal(0, 1, count))
+    spreads = np.random.default_rng(seed + 1).uniform(0.1, 2.0, count)
+
+    return tuple(Candle(i * 60000, float(c), float(c + s), float(c - s), float(c), 100)
+                 for i, (c, s) in enumerate(zip(closes, spreads)))
+
+class Test_Indicators_Indicators(unittest.TestCase):
+
+    def test_sma_batch_averages_last_closes(self):
+        values = SMA(3).batch(candle_window(candles_of([1.0, 2.0, 3.0, 4.0, 5.0])))
+
+        np.testing.assert_allclose(values, [np.nan, np.nan, 2.0, 3.0, 4.0])
+
+    def test_ema_batch_is_seeded_with_sma(self):
+        values = EMA(3).batch(candle_window(candles_of([1.0, 2.0, 3.0, 4.0, 5.0])))
+
+        np.testing.assert_allclose(values, [np.nan, np.nan, 2.0, 3.0, 4.0])
+
+    def test_rsi_of_rising_closes_is_100_and_of_flat_closes_is_50(self):
+        self.assertEqual(RSI(3).batch(candle_window(candles_of([1.0, 2.0, 3.0, 4.0])))[-1], 100.0)
+        self.assertEqual(RSI(3).batch(candle_window(candles_of([1.0] * 5)))[-1], 50.0)
+
+    def test_rsi_matches_wilders_definition(self):
+        closes = [44.34, 44.09, 44.15, 43.61, 44.33, 44.83, 45.10, 45.42, 45.84, 46.08, 45.89, 46.03, 45.61, 46.28, 46.28, 46.00]
+        values = RSI(14).batch(candle_window(candles_of(closes)))
+
+        self.assertAlmostEqual(values[14], 70.46, places=2)
+        self.assertAlmostEqual(values[15], 66.25, places=2)
+
+    def test_stochastic_k_is_position_of_close_in_range(self):
+        candles = (Candle(0, 1.0, 10.0, 0.0, 5.0, 1), Candle(60000, 1.0, 4.0, 2.0, 7.5, 1))
+
+        self.assertEqual(Stochastic(2).batch(candle_window(candles))[-1], 75.0)
+
+    def test_commit_continues_batch_exactly(self):
+        candles = random_candles(300)
+
+        for name in ('sma20', 'ema20', 'ema2', 'rsi14', 'rsi1', 'stoch14', 'stoch14_3', 'stoch1'):
+            with self.subTest(indicator=name):
+                expected = parse_indicator(name).batch(candle_window(candles))
+                indicator = parse_indicator(name)
+                indicator.batch(candle_window(candles[:100]))
+
+                committed = [indicator.commit(candle) for candle in candles[100:]]
+
+                np.testing.assert_allclose(committed, expected[100:], rtol=1e-9)
+
+    def test_preview_returns_commit_value_without_changing_state(self):
+        candles = random_candles(50)
+
+        for name in ('sma5', 'ema5', 'rsi5', 'stoch5_3'):
+            with self.subTest(indicator=name):
+                indicator = parse_indicator(name)
+                indicator.batch(candle_window(candles[:-1]))
+
+                indicator.preview(Candle(0, 1.0, 1000.0, 0.5, 999.0, 1))
+                preview = indicator.preview(candles[-1])
+
+                self.assertAlmostEqual(preview, indicator.commit(candles[-1]))
+
+    def test_commit_during_warm_up_returns_nan(self):
+        indicator = parse_indicator('rsi14')
+        indicator.batch(candle_window(()))
+
+        self.assertTrue(math.isnan(indicator.commit(candles_of([1.0])[0])))
+
+    def test_parse_indicator_raises_unknownindicatorerror_for_unknown_names(self):
+        for name in ('macd12', 'rsi', 'rsi0', 'sma5_3'):
+            with self.assertRaises(UnknownIndicatorError):
+                parse_indicator(name)
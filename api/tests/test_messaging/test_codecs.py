@@ -0,0 +1,85 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import json
+import unittest
+from unittest.mock import patch
+
+from messaging.codecs import CodecFactory, JsonCodec, MsgpackCodec, StructCodec
+from messaging.exceptions import MessageDecodeError
+from messaging.exceptions import UnknownWireFormatError
+from messaging.exceptions import UnsupportedMessageVersionError
+from messaging.messages import Candle, Message
+
+MESSAGE = Message('history', 1709791200414, (
+    Candle(1709704800414, 585.06, 585.24, 582.68, 583.12, 68588121),
+    Candle(1709791200414, 583.15, 584.73, 582.49, 583.0, 71765475)
+), sequence=42)
+
+class TestCodecs_Codecs(unittest.TestCase):
+
+    def test_codecs_decode_what_they_encode(self):
+        for codec in [JsonCodec(), MsgpackCodec(), StructCodec()]:
+            with self.subTest(codec=type(codec).__name__):
+                self.assertEqual(codec.decode(codec.encode(MESSAGE)), MESSAGE)
+
+    def test_codecs_decode_unnumbered_version_1_messages(self):
+        message = MESSAGE._replace(version=1, sequence=0)
+
+        for codec in [JsonCodec(), MsgpackCodec(), StructCodec()]:
+            with self.subTest(codec=type(codec).__name__):
+                self.assertEqual(codec.decode(codec.encode(message)), message)
+
+    def test_json_codec_decodes_version_1_payload_without_sequence(self):
+        payload = b'{"v":1,"t":"candle_update","ts":2,"c":[[1,1.0,1.0,1.0,1.0,5]]}'
+
+        self.assertEqual(JsonCodec().decode(payload), Message('candle_update', 2, (Candle(1, 1.0, 1.0, 1.0, 1.0, 5),), 1, 0))
+
+    def test_codecs_encode_snapshot_notice_without_candles(self):
+        message = Message('snapshot', 1709791200414, (), sequence=7)
+
+        for codec in [JsonCodec(), MsgpackCodec(), StructCodec()]:
+            with self.subTest(codec=type(codec).__name__):
+                self.assertEqual(codec.decode(codec.encode(message)), message)
+
+    def test_json_codec_encodes_compact_single_encoded_json(self):
+        payload = JsonCodec().encode(MESSAGE)
+
+        self.assertEqual(json.loads(payload)['c'][0], [1709704800414, 585.06, 585.24, 582.68, 583.12, 68588121])
+        self.assertNotIn(b' ', payload)
+
+    def test_struct_codec_encodes_fixed_size_layout(self):
+        payload = StructCodec().encode(MESSAGE)
+
+        self.assertEqual(len(payload), StructCodec.HEADER.size + 2 * StructCodec.CANDLE.size)
+
+    def test_decode_raises_for_unsupported_version(self):
+        for codec in [JsonCodec(), MsgpackCodec(), StructCodec()]:
+            with self.subTest(codec=type(codec).__name__):
+                with self.assertRaises(UnsupportedMessageVersionError):
+                    codec.decode(codec.encode(MESSAGE._replace(version=99)))
+
+    def test_decode_raises_for_malformed_payload(self):
+        for codec in [JsonCodec(), StructCodec()]:
+            with self.subTest(codec=type(codec).__name__):
+                with self.assertRaises(MessageDecodeError):
+                    codec.decode(b'\x01\x02')
+
+        with self.assertRaises(MessageDecodeError):
+            StructCodec().decode(b'')
+
+    @patch('messaging.codecs.msgpack', None)
+    def test_msgpack_codec_raises_if_msgpack_not_installed(self):
+        with self.assertRaises(UnknownWireFormatError):
+            MsgpackCodec()
+
+class TestCodecs_CodecFactory(unittest.TestCase):
+
+    def test_build_returns_codec_for_wire_format(self):
+        self.assertIsInstance(CodecFactory().build('json'), JsonCodec)
+        self.assertIsInstance(CodecFactory().build('msgpack'), MsgpackCodec)
+        self.assertIsInstance(CodecFactory().build('struct'), StructCodec)
+
+    def test_build_raises_if_wire_format_unknown(self):
+        with self.assertRaises(UnknownWireFormatError):
+            CodecFactory().build('xml')
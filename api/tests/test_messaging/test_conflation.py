@@ -0,0 +1,73 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import unittest
+
+from messaging.conflation import Conflator
+from messaging.messages import Candle, Message
+from test_core.doubles.clock import FakeClock
+
+def update(close, volume=100):
+    return Message('candle_update', 0, (Candle(0, 1.0, close, 1.0, close, volume),))
+
+class TestConflation_Conflator(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.conflator = Conflator(heartbeat_secs=30, report_interval_secs=60, clock=self.clock)
+
+    def test_admit_suppresses_unchanged_update(self):
+        self.assertTrue(self.conflator.admit('a', update(2.0)))
+        self.assertFalse(self.conflator.admit('a', update(2.0)))
+        self.assertTrue(self.conflator.admit('a', update(2.0, volume=200)))
+
+    def test_admit_compares_per_channel(self):
+        self.conflator.admit('a', update(2.0))
+
+        self.assertTrue(self.conflator.admit('b', update(2.0)))
+
+    def test_admit_publishes_unchanged_update_as_heartbeat(self):
+        self.conflator.admit('a', update(2.0))
+        self.clock.now = 29
+
+        self.assertFalse(self.conflator.admit('a', update(2.0)))
+
+        self.clock.now = 30
+
+        self.assertTrue(self.conflator.admit('a', update(2.0)))
+        self.assertFalse(self.conflator.admit('a', update(2.0)))
+
+    def test_admit_always_publishes_histories_and_closed_candles(self):
+        candles = update(2.0).candles
+
+        self.assertTrue(self.conflator.admit('a', Message('history', 0, candles)))
+        self.assertTrue(self.conflator.admit('a', Message('candle_closed', 0, candles)))
+        self.assertTrue(self.conflator.admit('a', Message('candle_closed', 0, candles)))
+
+    def test_admit_compares_with_last_history_candle(self):
+        self.conflator.admit('a', Message('history', 0, (Candle(-60000, 1, 1, 1, 1, 1),) + update(2.0).candles))
+
+        self.assertFalse(self.conflator.admit('a', update(2.0)))
+
+    def test_remove_forgets_channel(self):
+        self.conflator.admit('a', update(2.0))
+        self.conflator.remove('a')
+
+        self.assertTrue(self.conflator.admit('a', update(2.0)))
+
+    def test_stats_reports_suppression_ratio(self):
+        for _ in range(4):
+            self.conflator.admit('a', update(2.0))
+
+        self.assertEqual(self.conflator.stats(), {'updates': 4, 'suppressed': 3, 'suppression_ratio': 0.75})
+
+    def test_report_logs_at_most_once_per_interval(self):
+        self.conflator.admit('a', update(2.0))
+        self.conflator.report()
+        self.clock.now = 60
+
+        with self.assertLogs('messaging.conflation', 'INFO') as logs:
+            self.conflator.report()
+            self.conflator.report()
+
+        self.assertEqual(logs.output, ['INFO:messaging.conflation:Conflation suppressed 0 of 1 candle updates (0.0%)'])
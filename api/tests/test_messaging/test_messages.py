@@ -0,0 +1,34 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import unittest
+
+from messaging.messages import Candle, Message, candle_message, price_history_message
+from test_stock_providers.fixtures import api_fixtures
+
+class TestMessages_Messages(unittest.TestCase):
+
+    def test_price_history_message_keeps_only_ohlcv_and_timestamps(self):
+        message = price_history_message(
+            api_fixtures.schwab_price_history_api_response_success('aapl', 1)
+        )
+
+        self.assertEqual(
+            message,
+            Message('history', 1709704800414, (Candle(1709704800414, 585.06, 585.24, 582.6800000000001, 583.12, 68588121),))
+        )
+
+    def test_price_history_message_of_empty_history_has_no_candles(self):
+        message = price_history_message(
+            api_fixtures.schwab_price_history_api_response_success('aapl', 0, empty=True)
+        )
+
+        self.assertEqual(message, Message('history', 0, ()))
+
+    def test_candle_message_carries_single_candle_and_quote_timestamp(self):
+        candle = Candle(60000, 909.91, 912.91, 904.17, 906.575, 9380745)
+
+        self.assertEqual(
+            candle_message('candle_closed', candle, 1000),
+            Message('candle_closed', 1000, (candle,))
+        )
@@ -0,0 +1,50 @@
+import redis
+
+class RedisSortedSetsPipelineStub:
+
+    def __init__(self, redis_stub):
+        self._redis_stub = redis_stub
+        self._commands = []
+
+    def __getattr__(self, name):
+        return lambda *args: self._commands.append((name, args))
+
+    def execute(self):
+        return [getattr(self._redis_stub, name)(*args) for name, args in self._commands]
+
+class RedisSortedSetsStub:
+    """In-memory sorted sets of one or more clients sharing `sorted_sets`.
+    Raises a connection error while `failing`."""
+
+    def __init__(self, sorted_sets=None):
+        self.sorted_sets = {} if sorted_sets is None else sorted_sets
+        self.failing = False
+
+    def pipeline(self, transaction=True):
+        return RedisSortedSetsPipelineStub(self)
+
+    def zadd(self, key, mapping):
+        self._raise_if_failing()
+        self.sorted_sets.setdefault(key, {}).update(mapping)
+
+    def zremrangebyscore(self, key, min_score, max_score):
+        self._raise_if_failing()
+        members = self.sorted_sets.get(key, {})
+
+        for member, score in list(members.items()):
+            if float(min_score) <= score <= float(max_score):
+                del members[member]
+
+    def zrange(self, key, start, end):
+        self._raise_if_failing()
+        members = sorted(self.sorted_sets.get(key, {}).items(), key=lambda item: item[1])
+
+        return [member.encode('utf-8') for member, _ in members]
+
+    def zrem(self, key, member):
+        self._raise_if_failing()
+        self.sorted_sets.get(key, {}).pop(member, None)
+
+    def _raise_if_failing(self):
+        if self.failing:
+            raise redis.exceptions.ConnectionError('connection refused')
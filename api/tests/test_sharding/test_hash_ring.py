@@ -0,0 +1,36 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import unittest
+
+from collections import Counter
+
+from sharding.hash_ring import HashRing
+
+SYMBOLS = [f'SYM{i}' for i in range(2000)]
+
+class Test_HashRing_HashRing(unittest.TestCase):
+
+    def test_owner_is_the_same_for_any_member_order(self):
+        ring, reordered_ring = HashRing(['a', 'b', 'c']), HashRing(['c', 'a', 'b'])
+
+        self.assertEqual([ring.owner(s) for s in SYMBOLS], [reordered_ring.owner(s) for s in SYMBOLS])
+
+    def test_keys_are_spread_over_members(self):
+        ring = HashRing(['a', 'b', 'c', 'd'])
+        shares = Counter(ring.owner(s) for s in SYMBOLS)
+
+        self.assertEqual(set(shares), {'a', 'b', 'c', 'd'})
+        self.assertTrue(all(300 < share < 700 for share in shares.values()), shares)
+
+    def test_joining_member_only_takes_keys_from_others(self):
+        before = HashRing(['a', 'b', 'c'])
+        after = HashRing(['a', 'b', 'c', 'd'])
+
+        moved = [s for s in SYMBOLS if before.owner(s) != after.owner(s)]
+
+        self.assertTrue(all(after.owner(s) == 'd' for s in moved))
+        self.assertLess(len(moved), len(SYMBOLS) / 3)
+
+    def test_owner_of_empty_ring_is_none(self):
+        self.assertIsNone(HashRing().owner('AAPL'))
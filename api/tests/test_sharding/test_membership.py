@@ -0,0 +1,34 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import unittest
+
+from sharding.membership import RedisMembership
+from test_core.doubles.clock import FakeClock
+from test_sharding.doubles.redis import RedisSortedSetsStub
+
+class Test_Membership_RedisMembership(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.redis_stub = RedisSortedSetsStub()
+
+    def membership(self, worker_id):
+        return RedisMembership(self.redis_stub, 'stock-producer', worker_id, 15, self.clock)
+
+    def test_heartbeat_returns_live_members(self):
+        self.membership('a').heartbeat()
+
+        self.assertEqual(self.membership('b').heartbeat(), ['a', 'b'])
+
+    def test_member_without_heartbeat_for_lease_expires(self):
+        self.membership('a').heartbeat()
+        self.clock.now += 16
+
+        self.assertEqual(self.membership('b').heartbeat(), ['b'])
+
+    def test_leave_removes_member(self):
+        self.membership('a').heartbeat()
+        self.membership('a').leave()
+
+        self.assertEqual(self.membership('b').heartbeat(), ['b'])
@@ -0,0 +1,107 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import time
+import unittest
+
+from core.rate_limiter import TokenBucketRateLimiter
+from sharding.hash_ring import HashRing
+from sharding.membership import RedisMembership
+from sharding.subscriptions import ShardedSubscriptions
+from stock_subscriptions_sources.subscription_index import SubscriptionChanges
+from test_core.doubles.clock import FakeClock
+from test_sharding.doubles.redis import RedisSortedSetsStub
+from test_stock_subscriptions_sources.doubles.alerts import ManySubscriptionsAlertsStub
+from test_stock_subscriptions_sources.doubles.alerts import ScriptedSubscriptionChangesAlertsStub
+
+class Test_Subscriptions_ShardedSubscriptions(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.sorted_sets = {}
+
+    def worker(self, worker_id, source=None, rate_limiter=None):
+        membership = RedisMembership(RedisSortedSetsStub(self.sorted_sets), 'stock-producer', worker_id, 15, self.clock)
+
+        return ShardedSubscriptions(source or ManySubscriptionsAlertsStub(100), membership, 5,
+                                    rate_limiter=rate_limiter, total_rate=120, clock=self.clock)
+
+    def test_workers_split_subscriptions_by_symbol_owner(self):
+        worker_a, worker_b = self.worker('a'), self.worker('b')
+        worker_a.subscription_changes()
+        owned_b = worker_b.subscription_changes().added
+        self.clock.now += 5
+
+        owned_a = worker_a.subscription_changes()
+        ring = HashRing(['a', 'b'])
+
+        self.assertTrue(all(ring.owner(s[0].upper()) == 'b' for s in owned_b))
+        self.assertTrue(all(ring.owner(s[0].upper()) == 'b' for s in owned_a.removed))
+        self.assertEqual(len(owned_a.removed), len(owned_b))
+        self.assertTrue(0 < len(owned_b) < 100)
+
+    def test_subscriptions_of_dead_worker_are_taken_over(self):
+        worker_a, worker_b = self.worker('a'), self.worker('b')
+        worker_a.subscription_changes()
+        owned_b = worker_b.subscription_changes().added
+        self.clock.now += 5
+        worker_a.subscription_changes()
+
+        self.clock.now += 16  # b stops heartbeating
+        changes = worker_a.subscription_changes()
+
+        self.assertCountEqual(changes.added, owned_b)
+        self.assertEqual(changes.removed, [])
+
+    def test_source_changes_are_filtered_to_the_shard(self):
+        aapl = ('aapl', '1minute', '1day')
+        worker = self.worker('a', ScriptedSubscriptionChangesAlertsStub([
+            SubscriptionChanges([aapl, aapl], []),
+            SubscriptionChanges([], [aapl]),
+            SubscriptionChanges([], [aapl])
+        ]))
+
+        self.assertEqual(worker.subscription_changes(), ([aapl], []))
+        self.assertEqual(worker.subscription_changes(), ([], []))  # still referenced once
+        self.assertEqual(worker.subscription_changes(), ([], [aapl]))
+
+    def test_heartbeat_failure_keeps_current_shard(self):
+        worker = self.worker('a')
+        owned = worker.subscription_changes().added
+        worker._membership._redis_client.failing = True
+        self.clock.now += 5
+
+        self.assertEqual(worker.subscription_changes(), ([], []))
+        self.assertEqual(len(owned), 100)
+
+    def test_rate_limit_is_split_between_workers(self):
+        rate_limiter = TokenBucketRateLimiter(120, clock=self.clock)
+        worker_a, worker_b = self.worker('a', rate_limiter=rate_limiter), self.worker('b')
+        worker_a.subscription_changes()
+        worker_b.subscription_changes()
+        self.clock.now += 5
+
+        worker_a.subscription_changes()
+
+        self.assertEqual(rate_limiter.rate, 60)
+
+    def test_started_worker_renews_lease_without_subscription_changes(self):
+        membership = RedisMembership(RedisSortedSetsStub(self.sorted_sets), 'stock-producer', 'a', 15, self.clock)
+        worker = ShardedSubscriptions(ManySubscriptionsAlertsStub(100), membership, 0.01, clock=self.clock).start()
+        self.clock.now += 100  # e.g. blocked on the first bootstrap
+
+        deadline = time.monotonic() + 5
+        while self.sorted_sets.get('stock-producer:members', {}).get('a') != 115 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        worker.close()
+
+        self.assertEqual(self.sorted_sets['stock-producer:members'], {})
+        self.assertLess(time.monotonic(), deadline)
+
+    def test_close_leaves_group(self):
+        worker = self.worker('a')
+        worker.subscription_changes()
+
+        worker.close()
+
+        self.assertEqual(self.sorted_sets['stock-producer:members'], {})
@@ -1,20 +1,39 @@
 # pylint:disable=missing-module-docstring, missing-class-docstring
 # pylint:disable=missing-function-docstring, invalid-name, line-too-long
 
-import json
 import os
+import time
 import unittest
+
+from concurrent.futures import wait
 from unittest.mock import create_autospec, patch
 
+from candles.cache import CachedPriceHistory
+from core.scheduler import SessionTickScheduler
 from core.utils import DotDict
+from messaging.codecs import JsonCodec, StructCodec
+from messaging.conflation import Conflator
+from messaging.messages import Candle, Message
 from stock_producer import StockProviderFactory
 from stock_producer import UnknownStockProviderError
-from stock_producer import StockProducer
+from stock_producer import PUBLISHED_MESSAGES, STAGE_SECONDS, StockProducer
+from stock_producer import AsyncStockProducer
+from stock_producer import StockProducerFactory
+from stock_producer import UnknownStockProducerEngineError
+from stock_producer import UnknownQuotesModeError
 from stock_producer import StockSubscriptionsSourceFactory
 from stock_producer import UnknownStockSubscriptionsSourceError
-from stock_providers.schwab import Schwab
+from stock_providers.schwab import AsyncSchwab, Schwab
+from stock_providers.schwab_streamer import SchwabStreamer, StreamingQuotes
+from stock_publishers.redis_snapshots import RedisSnapshots
+from stock_publishers.redis_streams import AsyncRedisStreams
+from stock_publishers.transports import UnknownTransportError
+from stock_subscriptions_sources.subscription_index import SubscriptionChanges
 from stock_subscriptions_sources.alerts import Alerts
 from test_stock_subscriptions_sources.doubles.alerts import AlertsStub
+from test_stock_subscriptions_sources.doubles.alerts import ManySubscriptionsAlertsStub
+from test_stock_subscriptions_sources.doubles.alerts import DuplicateSubscriptionsAlertsStub
+from test_stock_subscriptions_sources.doubles.alerts import ScriptedSubscriptionChangesAlertsStub
 from test_stock_subscriptions_sources.doubles.alerts import OneMinuteSubscriptionAlertsStub
 from test_stock_providers.fixtures import api_fixtures
 from test_stock_providers.doubles.schwab import SchwabStub, SchwabQuoteUpdate2SecondsAfterPriceHistoryCandleStub
@@ -22,6 +41,13 @@ from test_stock_providers.doubles.schwab import SchwabStub, SchwabQuoteUpdate60S
 from test_stock_providers.doubles.schwab import SchwabQuoteUpdateWithin1MinuteAndAfter1DayStub
 from test_stock_providers.doubles.schwab import SchwabUnauthorizedStub
 from test_stock_providers.doubles.schwab import SchwabJsonDecoderErrorStub
+from test_stock_providers.doubles.schwab import AsyncSchwabStub
+from test_stock_providers.doubles.schwab import SchwabPartialQuotesStub
+from test_stock_providers.doubles.schwab import SchwabBlockingPriceHistoryStub
+from test_stock_providers.doubles.schwab_streamer_server import STREAMER_INFO, SchwabStreamerStandInServer, wait_until
+from test_core.doubles.clients import ClientsStub
+from test_core.doubles.scheduler import ScriptedSessionTickSchedulerStub, ScriptedTickSchedulerStub
+from test_stock_publishers.doubles.redis import PublisherSpy, RedisSnapshotsStub
 
 class Test_StockProducer_StockProviderFactory(unittest.TestCase):
 
@@ -41,6 +67,21 @@ class Test_StockProducer_StockProviderFactory(unittest.TestCase):
         stock_provider = factory.build()
         self.assertIsInstance(stock_provider, Schwab)
 
+    @patch('stock_producer.config', DotDict({'Stocks': {'Provider': 'Schwab', 'CandleCachePath': ':memory:'}}))
+    def test_build_wraps_stock_provider_in_candle_cache_if_configured(self):
+        stock_provider = StockProviderFactory().build()
+        self.assertIsInstance(stock_provider, CachedPriceHistory)
+
+    @patch('stock_producer.config', DotDict({'Stocks': {'Provider': 'Schwab', 'QuotesMode': 'streaming'}, 'Schwab': {'Streamer': {'ReconnectDelaySecs': 1, 'CoalesceSecs': 0}}}))
+    def test_build_returns_streaming_quotes_for_streaming_quotes_mode(self):
+        stock_provider = StockProviderFactory().build()
+        self.assertIsInstance(stock_provider, StreamingQuotes)
+
+    @patch('stock_producer.config', DotDict({'Stocks': {'Provider': 'Schwab', 'QuotesMode': 'carrier-pigeon'}}))
+    def test_build_raises_if_quotes_mode_unknown(self):
+        with self.assertRaises(UnknownQuotesModeError):
+            StockProviderFactory().build()
+
     @patch('stock_producer.config', DotDict({'Stocks': {'Provider': 'Unknown'}}))
     def test_build_raises_if_stock_provider_unknown(self):
         factory = StockProviderFactory()
@@ -48,6 +89,57 @@ class Test_StockProducer_StockProviderFactory(unittest.TestCase):
         with self.assertRaises(UnknownStockProviderError):
             factory.build()
 
+    @patch('stock_producer.config', DotDict({'Stocks': {'Provider': 'Schwab', 'BootstrapConcurrency': 4}}))
+    def test_build_async_returns_async_schwab_stock_provider_instance(self):
+        factory = StockProviderFactory()
+        stock_provider = factory.build_async()
+        self.assertIsInstance(stock_provider, AsyncSchwab)
+        stock_provider.close()
+
+class Test_StockProducer_StockProducerFactory(unittest.TestCase):
+
+    def setUp(self):
+        os.environ['SCHWAB_API_KEY'] = 'key'
+        os.environ['SCHWAB_API_SECRET'] = 'secret'
+        os.environ['SCHWAB_ACCESS_TOKEN'] = 'secret'
+
+    def tearDown(self):
+        del os.environ['SCHWAB_API_KEY']
+        del os.environ['SCHWAB_API_SECRET']
+        del os.environ['SCHWAB_ACCESS_TOKEN']
+
+    @patch('stock_producer.config', DotDict({'Stocks': {'Provider': 'Schwab', 'SubscriptionsSource': 'alerts', 'Engine': 'sync', 'CandleStoreCapacity': 100}, 'Redis': {'PipelineFlushSize': 10}}))
+    def test_build_returns_stock_producer_for_sync_engine(self):
+        stock_producer = StockProducerFactory(ClientsStub()).build()
+        self.assertIs(type(stock_producer), StockProducer)
+
+    @patch('stock_producer.config', DotDict({'Stocks': {'Provider': 'Schwab', 'SubscriptionsSource': 'alerts', 'Engine': 'async', 'BootstrapConcurrency': 4, 'CandleStoreCapacity': 100}, 'Redis': {'PipelineFlushSize': 10}}))
+    def test_build_returns_async_stock_producer_for_async_engine(self):
+        stock_producer = StockProducerFactory(ClientsStub()).build()
+        self.assertIsInstance(stock_producer, AsyncStockProducer)
+
+    @patch('stock_producer.config', DotDict({'Stocks': {'Provider': 'Schwab', 'SubscriptionsSource': 'alerts', 'Engine': 'async', 'BootstrapConcurrency': 4, 'CandleStoreCapacity': 100}, 'Redis': {'PipelineFlushSize': 10, 'Transport': 'streams', 'Streams': {'MaxLen': 1000}}}))
+    def test_build_publishes_to_streams_for_streams_transport(self):
+        clients = ClientsStub()
+        stock_producer = StockProducerFactory(clients).build()
+        self.assertIsInstance(stock_producer._publisher, AsyncRedisStreams)
+        self.assertIs(stock_producer._publisher._redis_client, clients.async_redis_client)
+
+    @patch('stock_producer.config', DotDict({'Stocks': {'Provider': 'Schwab', 'SubscriptionsSource': 'alerts', 'Engine': 'sync', 'CandleStoreCapacity': 100}, 'Redis': {'PipelineFlushSize': 10, 'Transport': 'kafka'}}))
+    def test_build_raises_if_transport_unknown(self):
+        with self.assertRaises(UnknownTransportError):
+            StockProducerFactory(ClientsStub()).build()
+
+    @patch('stock_producer.config', DotDict({'Stocks': {'Provider': 'Schwab', 'SubscriptionsSource': 'alerts', 'Engine': 'sync', 'CandleStoreCapacity': 100, 'Schedule': {'CadenceSecs': {'minute': 1}}, 'Calendar': {'Enabled': True, 'Holidays': ['2026-12-25']}}, 'Schwab': {'MarketDataUpdateIntervalSecs': 1}, 'Redis': {'PipelineFlushSize': 10}}))
+    def test_build_schedules_by_market_session_if_calendar_enabled(self):
+        stock_producer = StockProducerFactory(ClientsStub()).build()
+        self.assertIsInstance(stock_producer._tick_scheduler, SessionTickScheduler)
+
+    @patch('stock_producer.config', DotDict({'Stocks': {'Provider': 'Schwab', 'SubscriptionsSource': 'alerts', 'Engine': 'unknown'}}))
+    def test_build_raises_if_engine_unknown(self):
+        with self.assertRaises(UnknownStockProducerEngineError):
+            StockProducerFactory(ClientsStub()).build()
+
 class Test_StockProducer_StockSubscriptionsSourceFactory(unittest.TestCase):
 
     def setUp(self):
@@ -62,13 +154,15 @@ class Test_StockProducer_StockSubscriptionsSourceFactory(unittest.TestCase):
 
     @patch('stock_producer.config', DotDict({'Stocks': {'SubscriptionsSource': 'alerts'}}))
     def test_build_returns_alerts_model(self):
-        factory = StockSubscriptionsSourceFactory()
+        clients = ClientsStub()
+        factory = StockSubscriptionsSourceFactory(clients)
         subscriptions_provider = factory.build()
         self.assertIsInstance(subscriptions_provider, Alerts)
+        self.assertEqual(clients.mongo_calls, 1)
 
     @patch('stock_producer.config', DotDict({'Stocks': {'SubscriptionsSource': 'unknown'}}))
     def test_build_raises_if_stock_subscription_details_source_unknown(self):
-        factory = StockSubscriptionsSourceFactory()
+        factory = StockSubscriptionsSourceFactory(ClientsStub())
 
         with self.assertRaises(UnknownStockSubscriptionsSourceError):
             factory.build()
@@ -87,15 +181,11 @@ class Test_StockProducer_StockProducer(unittest.TestCase):
         self.assertEqual(feed_item[0], ('aapl', '1minute', '1day'))
 
         self.assertEqual(
-            json.loads(feed_item[1]),
-            {
-                "candles": [
-                    {"open": 585.06, "high": 585.24, "low": 582.6800000000001, "close": 583.12, "volume": 68588121, "datetime": 1709704800414},
-                    {"open": 583.15, "high": 584.73, "low": 582.49, "close": 583.0, "volume": 71765475, "datetime": 1709791200414}
-                ],
-                "symbol": "aapl",
-                "empty": False
-            }
+            feed_item[1],
+            Message('history', 1709791200414, (
+                Candle(1709704800414, 585.06, 585.24, 582.6800000000001, 583.12, 68588121),
+                Candle(1709791200414, 583.15, 584.73, 582.49, 583.0, 71765475)
+            ), sequence=1)
         )
 
         feed_item = next(feed)
@@ -103,64 +193,48 @@ class Test_StockProducer_StockProducer(unittest.TestCase):
         self.assertEqual(feed_item[0], ('msft', '5minute', '10day'))
 
         self.assertEqual(
-            json.loads(feed_item[1]),
-            {
-                "candles": [
-                    {"open": 613.06, "high": 613.24, "low": 610.6800000000001, "close": 611.12, "volume": 68588149, "datetime": 1709704800442},
-                    {"open": 611.15, "high": 612.73, "low": 610.49, "close": 611.0, "volume": 71765503, "datetime": 1709791200442}
-                ],
-                "symbol": "msft",
-                "empty": False
-            }
+            feed_item[1],
+            Message('history', 1709791200442, (
+                Candle(1709704800442, 613.06, 613.24, 610.6800000000001, 611.12, 68588149),
+                Candle(1709791200442, 611.15, 612.73, 610.49, 611.0, 71765503)
+            ), sequence=1)
         )
 
-    def test_subscriptions_data_feed_returns_last_price_with_timestamp_set_to_one_frequency_ahead_if_quote_update_arrived_within_frequency_step(self):
+    def test_subscriptions_data_feed_updates_last_history_candle_if_quote_arrived_within_its_period(self):
         stock_data_provider_stub = SchwabQuoteUpdate2SecondsAfterPriceHistoryCandleStub()
         stock_subscriptions_source_stub = OneMinuteSubscriptionAlertsStub()
         stock_producer = StockProducer(stock_data_provider_stub, stock_subscriptions_source_stub)
 
         feed = stock_producer.subscriptions_data_feed(0.1)
         feed_item = next(feed) # price history for AAPL
-        # last_price_history_symbol_datetime = json.loads(feed_item[1])['candles'][-1]['datetime']
-        feed_item = next(feed) # last price quote
-
-        self.assertDictEqual(
-            json.loads(feed_item[1]),
-            {
-                "52WeekHigh": 531.49, "52WeekLow": 258.88, "askMICId": "ARCX", "askPrice": 492.9,
-                "askSize": 5, "askTime": 1717804788964, "bidMICId": "ARCX", "bidPrice": 492.25,
-                "bidSize": 4, "bidTime": 1717804788964, "closePrice": 907.76,
-                "highPrice": 912.9100000000001, "lastMICId": "XADF", "lastPrice": 906.575,
-                "lastSize": 1, "lowPrice": 904.1701, "mark": 492.96, "markChange": -0.8,
-                "markPercentChange": -0.16202203, "netChange": -1.185, "netPercentChange": -0.23999514,
-                "openPrice": 909.9100000000001, "postMarketChange": -0.385,
-                "postMarketPercentChange": -0.07809964, "quoteTime": 1709791260414,
-                "securityStatus": "Normal", "totalVolume": 9380745, "tradeTime": 1717804795651
-            }
+        feed_item = next(feed) # candle update
+
+        self.assertEqual(
+            feed_item[1],
+            Message('candle_update', 1709791220414, (
+                Candle(1709791200000, 583.15, 906.575, 582.49, 906.575, 71765475),
+            ), sequence=2)
         )
 
-    def test_subscriptions_data_feed_returns_last_price_with_timestamp_set_to_two_frequencies_ahead_if_quote_arrived_after_frequency_step(self):
+    def test_subscriptions_data_feed_closes_last_history_candle_and_opens_next_if_quote_arrived_after_its_period(self):
         stock_data_provider_stub = SchwabQuoteUpdate60SecondsAfterPriceHistoryCandleStub()
         stock_subscriptions_source_stub = OneMinuteSubscriptionAlertsStub()
         stock_producer = StockProducer(stock_data_provider_stub, stock_subscriptions_source_stub)
 
         feed = stock_producer.subscriptions_data_feed(0.1)
-        feed_item = next(feed) # price history for AAPL
-        feed_item = next(feed) # last price quote
-
-        self.assertDictEqual(
-            json.loads(feed_item[1]),
-            {
-                "52WeekHigh": 531.49, "52WeekLow": 258.88, "askMICId": "ARCX", "askPrice": 492.9,
-                "askSize": 5, "askTime": 1717804788964, "bidMICId": "ARCX", "bidPrice": 492.25,
-                "bidSize": 4, "bidTime": 1717804788964, "closePrice": 907.76,
-                "highPrice": 912.9100000000001, "lastMICId": "XADF", "lastPrice": 906.575,
-                "lastSize": 1, "lowPrice": 904.1701, "mark": 492.96, "markChange": -0.8,
-                "markPercentChange": -0.16202203, "netChange": -1.185, "netPercentChange": -0.23999514,
-                "openPrice": 909.9100000000001, "postMarketChange": -0.385,
-                "postMarketPercentChange": -0.07809964, "quoteTime": 1709791320414,
-                "securityStatus": "Normal", "totalVolume": 9380745, "tradeTime": 1717804795651
-            }
+        next(feed) # price history for AAPL
+
+        self.assertEqual(
+            next(feed)[1],
+            Message('candle_closed', 1709791260414, (
+                Candle(1709791200000, 583.15, 584.73, 582.49, 583.0, 71765475),
+            ), sequence=2)
+        )
+        self.assertEqual(
+            next(feed)[1],
+            Message('candle_update', 1709791260414, (
+                Candle(1709791260000, 906.575, 906.575, 906.575, 906.575, 0),
+            ), sequence=3)
         )
 
     def test_subscriptions_data_feed_skips_feed_iteration_if_unabletoretrievestockdataerror_raised(self):
@@ -172,4 +246,298 @@ class Test_StockProducer_StockProducer(unittest.TestCase):
         next(feed)
 
         # The first call ended in the exception handler, the second call returned expected data.
-        self.assertTrue(stock_data_provider_stub._price_history_success_call_count, 1)
\ No newline at end of file
+        self.assertTrue(stock_data_provider_stub._price_history_success_call_count, 1)
+
+    def test_subscriptions_data_feed_skips_subscriptions_without_quote(self):
+        stock_producer = StockProducer(SchwabPartialQuotesStub('aapl'), AlertsStub())
+        stock_producer.shutdown = True  # to exit the infinite while loop
+
+        feed_items = list(stock_producer.subscriptions_data_feed(0))
+
+        self.assertEqual(
+            [item[0] for item in feed_items],
+            [('aapl', '1minute', '1day'), ('msft', '5minute', '10day'), ('msft', '5minute', '10day'), ('msft', '5minute', '10day')]
+        )
+
+    def test_subscriptions_data_ticks_returns_price_histories_then_quotes_per_tick(self):
+        stock_producer = StockProducer(SchwabStub(), AlertsStub())
+        stock_producer.shutdown = True  # to exit the infinite while loop
+
+        ticks = list(stock_producer.subscriptions_data_ticks(0))
+
+        self.assertEqual(len(ticks), 2)
+        self.assertEqual([item[1].type for item in ticks[0]], ['history', 'history'])
+        # The quotes are past the last history candles, closing them
+        self.assertEqual([item[1].type for item in ticks[1]], ['candle_closed', 'candle_update'] * 2)
+        self.assertEqual([item[1].candles[-1].close for item in ticks[1]], [583.0, 906.575, 611.0, 934.575])
+
+    def test_subscriptions_data_ticks_fetches_each_unique_subscription_once_and_fans_out_quotes(self):
+        stock_data_provider_stub = SchwabStub()
+        stock_producer = StockProducer(stock_data_provider_stub, DuplicateSubscriptionsAlertsStub())
+        stock_producer.shutdown = True  # to exit the infinite while loop
+
+        ticks = list(stock_producer.subscriptions_data_ticks(0))
+
+        self.assertEqual(stock_data_provider_stub.price_history_calls, [('aapl', '1minute', '10day')])
+        self.assertEqual(stock_data_provider_stub.quotes_calls, [['aapl']])
+        self.assertEqual(
+            [item[0] for item in ticks[1] if item[1].type == 'candle_update'],
+            [('aapl', '1minute', '1day'), ('aapl', '5minute', '10day')]
+        )
+
+    def test_subscriptions_data_ticks_bootstraps_added_subscription_without_blocking_quotes(self):
+        aapl, msft = ('aapl', '1minute', '1day'), ('msft', '5minute', '10day')
+        stock_data_provider_stub = SchwabBlockingPriceHistoryStub(blocked_symbol='msft')
+        stock_subscriptions_source_stub = ScriptedSubscriptionChangesAlertsStub([
+            SubscriptionChanges([aapl], []),
+            SubscriptionChanges([msft], [])
+        ])
+        stock_producer = StockProducer(stock_data_provider_stub, stock_subscriptions_source_stub, bootstrap_concurrency=2)
+        ticks = stock_producer.subscriptions_data_ticks(0)
+
+        self.assertEqual([(i[0], i[1].type) for i in next(ticks)], [(aapl, 'history')])
+        self.assertEqual([(i[0], i[1].type) for i in next(ticks)], [(aapl, 'candle_closed'), (aapl, 'candle_update')])
+        # MSFT was added, its price history is still downloading
+        self.assertEqual([(i[0], i[1].type) for i in next(ticks)], [(aapl, 'candle_update')])
+
+        stock_data_provider_stub.release()
+        stock_producer._pending_price_histories[msft].result(timeout=5)
+
+        self.assertEqual([(i[0], i[1].type) for i in next(ticks)], [(msft, 'history')])
+        self.assertEqual([(i[0], i[1].type) for i in next(ticks)], [(aapl, 'candle_update'), (msft, 'candle_closed'), (msft, 'candle_update')])
+
+    def test_subscriptions_data_ticks_derives_coarser_timeframes_from_base_price_history(self):
+        stock_producer = StockProducer(SchwabStub(), DuplicateSubscriptionsAlertsStub())
+        stock_producer.shutdown = True  # to exit the infinite while loop
+
+        price_histories = list(stock_producer.subscriptions_data_ticks(0))[0]
+
+        self.assertEqual(price_histories, [
+            (('aapl', '1minute', '1day'), Message('history', 1709791200414, (
+                Candle(1709791200414, 583.15, 584.73, 582.49, 583.0, 71765475),
+            ), sequence=1)),
+            (('aapl', '5minute', '10day'), Message('history', 1709791200000, (
+                Candle(1709704800000, 585.06, 585.24, 582.6800000000001, 583.12, 68588121),
+                Candle(1709791200000, 583.15, 584.73, 582.49, 583.0, 71765475)
+            ), sequence=1))
+        ])
+
+    def test_subscriptions_data_ticks_derives_added_timeframe_from_loaded_base_without_download(self):
+        aapl_1minute, aapl_5minute = ('aapl', '1minute', '1day'), ('aapl', '5minute', '1day')
+        stock_data_provider_stub = SchwabStub()
+        stock_subscriptions_source_stub = ScriptedSubscriptionChangesAlertsStub([
+            SubscriptionChanges([aapl_1minute], []),
+            SubscriptionChanges([aapl_5minute], [])
+        ])
+        stock_producer = StockProducer(stock_data_provider_stub, stock_subscriptions_source_stub)
+        ticks = stock_producer.subscriptions_data_ticks(0)
+        next(ticks)  # price history
+        next(ticks)  # quotes
+
+        self.assertEqual([(i[0], i[1].type) for i in next(ticks)], [(aapl_5minute, 'history')])
+        self.assertEqual(stock_data_provider_stub.price_history_calls, [('aapl', '1minute', '1day')])
+
+    def test_subscriptions_data_ticks_stops_publishing_removed_subscription(self):
+        aapl, msft = ('aapl', '1minute', '1day'), ('msft', '5minute', '10day')
+        stock_subscriptions_source_stub = ScriptedSubscriptionChangesAlertsStub([
+            SubscriptionChanges([aapl, msft, aapl], []),
+            SubscriptionChanges([], [aapl, msft])
+        ])
+        stock_producer = StockProducer(SchwabStub(), stock_subscriptions_source_stub)
+        ticks = stock_producer.subscriptions_data_ticks(0)
+        next(ticks)  # price histories
+        next(ticks)  # quotes
+
+        # AAPL is still referenced by one alert
+        self.assertEqual([i[0] for i in next(ticks)], [aapl])
+        self.assertNotIn(msft, stock_producer._price_history)
+
+    def test_produce_ticks_publishes_one_batch_per_tick(self):
+        publisher_spy = PublisherSpy()
+        stock_producer = StockProducer(SchwabStub(), AlertsStub(), publisher_spy)
+        stock_producer.shutdown = True  # to exit the infinite while loop
+
+        stock_producer.produce_ticks(stock_producer.subscriptions_data_ticks(0))
+
+        self.assertEqual(len(publisher_spy.batches), 2)
+        self.assertEqual(
+            [channel_name for channel_name, _ in publisher_spy.batches[1]],
+            ['symbol-aapl-1minute-1day'] * 2 + ['symbol-msft-5minute-10day'] * 2
+        )
+
+    def test_produce_ticks_publishes_messages_encoded_once_with_codec(self):
+        publisher_spy = PublisherSpy()
+        stock_producer = StockProducer(SchwabStub(), OneMinuteSubscriptionAlertsStub(), publisher_spy, StructCodec())
+        stock_producer.shutdown = True  # to exit the infinite while loop
+
+        stock_producer.produce_ticks(stock_producer.subscriptions_data_ticks(0))
+
+        quote_message = StructCodec().decode(publisher_spy.published[-1][1])
+        self.assertEqual(quote_message.type, 'candle_update')
+        self.assertEqual(quote_message.candles[0].close, 906.575)
+
+    def test_subscriptions_data_ticks_numbers_messages_per_channel(self):
+        stock_producer = StockProducer(SchwabStub(), AlertsStub())
+        stock_producer.shutdown = True  # to exit the infinite while loop
+
+        ticks = list(stock_producer.subscriptions_data_ticks(0))
+
+        self.assertEqual([(i[0][0], i[1].sequence) for tick in ticks for i in tick],
+                         [('aapl', 1), ('msft', 1), ('aapl', 2), ('aapl', 3), ('msft', 2), ('msft', 3)])
+
+    def test_subscriptions_data_ticks_suppresses_unchanged_candle_updates(self):
+        stock_producer = StockProducer(
+            SchwabQuoteUpdate2SecondsAfterPriceHistoryCandleStub(), OneMinuteSubscriptionAlertsStub(),
+            conflator=Conflator(heartbeat_secs=60)
+        )
+        ticks = stock_producer.subscriptions_data_ticks(0)
+        next(ticks)  # price history
+
+        self.assertEqual([(i[1].type, i[1].sequence) for i in next(ticks)], [('candle_update', 2)])
+        # The same quote again
+        self.assertEqual(next(ticks), [])
+        self.assertEqual(stock_producer._conflator.stats()['suppressed'], 1)
+
+    def test_subscriptions_data_ticks_turns_streamed_quotes_into_candles(self):
+        os.environ['SCHWAB_ACCESS_TOKEN'] = 'secret'
+        server = SchwabStreamerStandInServer().start()
+        streamer = SchwabStreamer(lambda: STREAMER_INFO, server.url, coalesce_secs=0)
+        stock_producer = StockProducer(StreamingQuotes(SchwabStub(), streamer), OneMinuteSubscriptionAlertsStub())
+        ticks = stock_producer.subscriptions_data_ticks(0.2)
+
+        try:
+            next(ticks)  # price history
+            # Nothing pushed yet, the first tick only subscribes
+            self.assertEqual(next(ticks), [])
+            wait_until(lambda: server.subscribed == {'AAPL'})
+            server.push('AAPL', **{'3': 584.0, '8': 71765475, '35': 1709791220414})
+
+            self.assertEqual([(i[1].type, i[1].candles[0].close) for i in next(ticks)], [('candle_update', 584.0)])
+        finally:
+            streamer.close()
+            server.shutdown()
+            del os.environ['SCHWAB_ACCESS_TOKEN']
+
+    def test_subscriptions_data_ticks_requests_quotes_of_due_groups_only(self):
+        aapl, msft = ('aapl', '1minute', '1day'), ('msft', '1daily', '1month')
+        stock_data_provider_stub = SchwabStub()
+        stock_producer = StockProducer(
+            stock_data_provider_stub,
+            ScriptedSubscriptionChangesAlertsStub([SubscriptionChanges([aapl, msft], [])]),
+            tick_scheduler=ScriptedTickSchedulerStub([{'minute'}, {'minute', 'daily'}, set()])
+        )
+        ticks = stock_producer.subscriptions_data_ticks(0)
+        next(ticks)  # price histories
+
+        self.assertEqual({i[0] for i in next(ticks)}, {aapl})
+        self.assertEqual({i[0] for i in next(ticks)}, {aapl, msft})
+        self.assertEqual(next(ticks), [])
+        self.assertEqual(stock_data_provider_stub.quotes_calls, [['aapl'], ['aapl', 'msft']])
+
+    def test_subscriptions_data_ticks_backfills_histories_when_session_opens(self):
+        aapl = ('aapl', '1minute', '1day')
+        stock_data_provider_stub = SchwabStub()
+        stock_producer = StockProducer(
+            stock_data_provider_stub,
+            ScriptedSubscriptionChangesAlertsStub([SubscriptionChanges([aapl], [])]),
+            tick_scheduler=ScriptedSessionTickSchedulerStub([set(), {'minute'}], [False, True])
+        )
+        ticks = stock_producer.subscriptions_data_ticks(0)
+        next(ticks)  # price history
+        next(ticks)  # idling
+
+        next(ticks)  # session opened
+        wait(stock_producer._pending_price_histories.values())
+        backfilled = next(ticks)
+
+        self.assertEqual([(i[0], i[1].type) for i in backfilled][0], (aapl, 'history'))
+        self.assertEqual(len(stock_data_provider_stub.price_history_calls), 2)
+
+    def test_produce_ticks_keeps_snapshots_and_announces_histories_on_channels(self):
+        publisher_spy = PublisherSpy()
+        snapshots = RedisSnapshots(RedisSnapshotsStub())
+        stock_producer = StockProducer(SchwabStub(), OneMinuteSubscriptionAlertsStub(), publisher_spy, snapshots=snapshots)
+        stock_producer.shutdown = True  # to exit the infinite while loop
+
+        stock_producer.produce_ticks(stock_producer.subscriptions_data_ticks(0))
+
+        published = [JsonCodec().decode(message) for _, message in publisher_spy.published]
+        self.assertEqual([(m.type, m.sequence, len(m.candles)) for m in published],
+                         [('snapshot', 1, 0), ('candle_closed', 2, 1), ('candle_update', 3, 1)])
+        snapshot = snapshots.load('symbol-aapl-1minute-1day')
+        self.assertEqual(snapshot.sequence, 3)
+        self.assertEqual(snapshot.candles[-1], published[-1].candles[0])
+
+    def test_produce_ticks_continues_sequences_of_snapshots_after_restart(self):
+        publisher_spy = PublisherSpy()
+        snapshots = RedisSnapshots(RedisSnapshotsStub())
+        snapshots.update([('symbol-aapl-1minute-1day', Message('history', 0, (), sequence=41))])
+        stock_producer = StockProducer(SchwabStub(), OneMinuteSubscriptionAlertsStub(), publisher_spy, snapshots=snapshots)
+        stock_producer.shutdown = True  # to exit the infinite while loop
+
+        stock_producer.produce_ticks(stock_producer.subscriptions_data_ticks(0))
+
+        published = [JsonCodec().decode(message) for _, message in publisher_spy.published]
+        self.assertEqual([m.sequence for m in published], [42, 43, 44])
+
+    def test_produce_ticks_records_stage_latencies(self):
+        stages = ['list_subscriptions', 'fetch', 'transform', 'serialize', 'publish']
+        counts = {stage: STAGE_SECONDS.count(stage=stage) for stage in stages}
+        published_messages = PUBLISHED_MESSAGES.value()
+        publisher_spy = PublisherSpy()
+        stock_producer = StockProducer(SchwabStub(), OneMinuteSubscriptionAlertsStub(), publisher_spy)
+        stock_producer.shutdown = True  # to exit the infinite while loop
+
+        stock_producer.produce_ticks(stock_producer.subscriptions_data_ticks(0))
+
+        self.assertEqual({stage: STAGE_SECONDS.count(stage=stage) - counts[stage] for stage in stages},
+                         {'list_subscriptions': 1, 'fetch': 1, 'transform': 1, 'serialize': 2, 'publish': 2})
+        self.assertEqual(PUBLISHED_MESSAGES.value() - published_messages, 3)
+
+    def test_produce_publishes_each_feed_item(self):
+        publisher_spy = PublisherSpy()
+        stock_producer = StockProducer(SchwabStub(), AlertsStub(), publisher_spy)
+        stock_producer.shutdown = True  # to exit the infinite while loop
+
+        stock_producer.produce(stock_producer.subscriptions_data_feed(0))
+
+        self.assertEqual(len(publisher_spy.published), 6)
+        self.assertEqual(publisher_spy.batches, [])
+
+class Test_StockProducer_AsyncStockProducer(unittest.IsolatedAsyncioTestCase):
+
+    async def test_subscriptions_data_feed_returns_price_history_then_quotes(self):
+        stock_producer = AsyncStockProducer(AsyncSchwabStub(delay_secs=0), AlertsStub(), 4)
+        stock_producer.shutdown = True  # to exit the infinite while loop
+
+        feed_items = [item async for item in stock_producer.subscriptions_data_feed(0)]
+
+        self.assertCountEqual(
+            [item[0] for item in feed_items[:2]],
+            [('aapl', '1minute', '1day'), ('msft', '5minute', '10day')]
+        )
+        self.assertEqual(feed_items[0][1].type, 'history')
+        self.assertEqual(
+            [(item[0], item[1].type) for item in feed_items[2:]],
+            [
+                (('aapl', '1minute', '1day'), 'candle_closed'),
+                (('aapl', '1minute', '1day'), 'candle_update'),
+                (('msft', '5minute', '10day'), 'candle_closed'),
+                (('msft', '5minute', '10day'), 'candle_update')
+            ]
+        )
+
+    async def test_subscriptions_data_feed_loads_price_histories_concurrently_up_to_the_limit(self):
+        stock_data_provider_stub = AsyncSchwabStub(delay_secs=0.05)
+        stock_producer = AsyncStockProducer(stock_data_provider_stub, ManySubscriptionsAlertsStub(20), 5)
+        feed = stock_producer.subscriptions_data_feed(0)
+
+        start = time.monotonic()
+        price_histories = [await feed.__anext__() for _ in range(20)]
+        elapsed = time.monotonic() - start
+        await feed.aclose()
+
+        self.assertEqual(len(set(ph[0] for ph in price_histories)), 20)
+        self.assertEqual(stock_data_provider_stub.max_in_flight, 5)
+        # 4 rounds of 0.05s rather than 20 sequential downloads
+        self.assertLess(elapsed, 0.5)
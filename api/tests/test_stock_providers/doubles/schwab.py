@@ -1,3 +1,6 @@
+import asyncio
+import threading
+
 from unittest.mock import Mock, create_autospec
 from test_stock_providers.fixtures import api_fixtures
 from stock_providers.schwab import Schwab
@@ -10,15 +13,21 @@ class SchwabStub(Schwab):
 
     def __init__(self, price_history_length=2):
         self._price_history_length = price_history_length
+        self.price_history_calls = []
+        self.quotes_calls = []
 
     def price_history(self, symbol, frequency, period, start_date=None,
                       end_date=None, include_extended_data=False):
+        self.price_history_calls.append((symbol, frequency, period))
+
         return api_fixtures.schwab_price_history_api_response_success(
             symbol,
             self._price_history_length
         )
 
     def quotes(self, symbols):
+        self.quotes_calls.append(symbols)
+
         return api_fixtures.schwab_quotes_api_response_success(symbols)
 
 class SchwabQuoteUpdate2SecondsAfterPriceHistoryCandleStub(Schwab):
@@ -92,6 +101,37 @@ class SchwabQuoteUpdateWithin1MinuteAndAfter1DayStub(Schwab):
             quoteTime=1718160502000
         )
 
+class SchwabPartialQuotesStub(SchwabStub):
+    """Returns no quote for `missing_symbol`, as if its chunk failed."""
+
+    def __init__(self, missing_symbol, price_history_length=2):
+        super().__init__(price_history_length)
+        self._missing_symbol = missing_symbol
+
+    def quotes(self, symbols):
+        return api_fixtures.schwab_quotes_api_response_success(
+            [s for s in symbols if s != self._missing_symbol]
+        )
+
+class SchwabBlockingPriceHistoryStub(SchwabStub):
+    """Price history downloads of `blocked_symbol` hang until `release()`."""
+
+    def __init__(self, blocked_symbol, price_history_length=2):
+        super().__init__(price_history_length)
+        self._blocked_symbol = blocked_symbol
+        self._released = threading.Event()
+
+    def price_history(self, symbol, frequency, period, start_date=None,
+                      end_date=None, include_extended_data=False):
+        if symbol == self._blocked_symbol:
+            self._released.wait(timeout=5)
+
+        return super().price_history(symbol, frequency, period, start_date,
+                                     end_date, include_extended_data)
+
+    def release(self):
+        self._released.set()
+
 class SchwabUnauthorizedStub(Schwab):
 
     def __init__(self):
@@ -126,8 +166,10 @@ class SchwabJsonDecoderErrorStub(Schwab):
 
 class SchwabReauthorizedStub(Schwab):
 
-    def __init__(self):
+    def __init__(self, session=None):
         self._price_history_call_count = 0
+        self._session = session
+        self._base_url = 'https://api.schwabapi.com'
 
     @authorized
     def price_history(self, symbol, frequency, period, start_date=None,
@@ -135,4 +177,32 @@ class SchwabReauthorizedStub(Schwab):
         self._price_history_call_count += 1
 
         if self._price_history_call_count < 2:
-            raise UnauthorizedError()
\ No newline at end of file
+            raise UnauthorizedError()
+
+class AsyncSchwabStub:
+    """Async provider double whose price history downloads take `delay_secs`
+    and which records the peak number of downloads in flight."""
+
+    def __init__(self, delay_secs=0.05, price_history_length=2):
+        self._delay_secs = delay_secs
+        self._price_history_length = price_history_length
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def price_history(self, symbol, frequency, period, start_date=None,
+                            end_date=None, include_extended_data=False):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            await asyncio.sleep(self._delay_secs)
+        finally:
+            self.in_flight -= 1
+
+        return api_fixtures.schwab_price_history_api_response_success(
+            symbol,
+            self._price_history_length
+        )
+
+    async def quotes(self, symbols):
+        return api_fixtures.schwab_quotes_api_response_success(symbols)
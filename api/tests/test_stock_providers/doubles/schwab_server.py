@@ -0,0 +1,73 @@
+import json
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from test_stock_providers.fixtures import api_fixtures
+
+class SchwabStandInRequestHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections_count += 1
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests_count += 1
+            reset = self.server.reset_next_requests > 0
+            self.server.reset_next_requests -= int(reset)
+
+        if reset:
+            self.close_connection = True
+            return
+
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+
+        if url.path.endswith('/quotes'):
+            payload = api_fixtures.schwab_quotes_api_response_success(
+                params['symbols'][0].split(',')
+            )
+        else:
+            payload = api_fixtures.schwab_price_history_api_response_success(
+                params['symbol'][0]
+            )
+
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint:disable=redefined-builtin
+        pass
+
+class SchwabStandInServer(ThreadingHTTPServer):
+    """Local HTTP server answering the Schwab market data endpoints with
+    fixture data. Counts accepted connections and served requests."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SchwabStandInRequestHandler)
+        self.lock = threading.Lock()
+        self.connections_count = 0
+        self.requests_count = 0
+        self.reset_next_requests = 0
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,123 @@
+import json
+import threading
+import time
+
+from websockets.exceptions import ConnectionClosed
+from websockets.sync.server import serve
+
+STREAMER_INFO = {
+    'streamerSocketUrl': 'wss://streamer-api.schwab.com/ws',
+    'schwabClientCustomerId': 'customer',
+    'schwabClientCorrelId': 'correl',
+    'schwabClientChannel': 'N9',
+    'schwabClientFunctionId': 'APIAPP'
+}
+
+class SchwabStreamerStandInServer:
+    """Local WebSocket server speaking the Schwab streamer protocol.
+    Acknowledges logins and subscriptions, records the requests, and
+    pushes LEVELONE_EQUITIES updates of the subscribed symbols. Logins
+    are refused with `login_code`, or unless they carry `access_token`."""
+
+    def __init__(self, login_code=0, access_token=None):
+        self._login_code = login_code
+        self._access_token = access_token
+        self._lock = threading.Lock()
+        self._connections = []
+        self.requests = []
+        self.subscribed = set()
+        self._server = serve(self._handle, '127.0.0.1', 0)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.socket.getsockname()
+
+        return f'ws://{host}:{port}'
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def shutdown(self):
+        self._server.shutdown()
+        self._thread.join()
+
+    def commands(self):
+        with self._lock:
+            return [(r['service'], r['command'], r['parameters'].get('keys')) for r in self.requests]
+
+    def push(self, symbol, **fields):
+        """Sends an update of `symbol` with the given field numbers, e.g.
+        `push('AAPL', **{'3': 190.5})`, to every connection."""
+        self.send(json.dumps({'data': [{
+            'service': 'LEVELONE_EQUITIES',
+            'timestamp': 0,
+            'command': 'SUBS',
+            'content': [{'key': symbol, **fields}]
+        }]}))
+
+    def send(self, message):
+        """Sends a raw message to every connection."""
+        with self._lock:
+            connections = list(self._connections)
+
+        for connection in connections:
+            try:
+                connection.send(message)
+            except ConnectionClosed:
+                pass
+
+    def drop_connections(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+
+        for connection in connections:
+            connection.close()
+
+    def _handle(self, connection):
+        with self._lock:
+            self._connections.append(connection)
+
+        try:
+            for raw_message in connection:
+                for request in json.loads(raw_message)['requests']:
+                    connection.send(json.dumps({'response': [self._respond(request)]}))
+        except ConnectionClosed:
+            pass
+
+    def _respond(self, request):
+        keys = set(filter(None, request['parameters'].get('keys', '').split(',')))
+
+        with self._lock:
+            self.requests.append(request)
+
+            if request['command'] == 'SUBS':
+                self.subscribed = keys
+            elif request['command'] == 'ADD':
+                self.subscribed |= keys
+            elif request['command'] == 'UNSUBS':
+                self.subscribed -= keys
+
+        code = self._login_code if request['command'] == 'LOGIN' else 0
+
+        if request['command'] == 'LOGIN' and self._access_token is not None and \
+           request['parameters']['Authorization'] != self._access_token:
+            code = 3
+
+        return {
+            'service': request['service'],
+            'command': request['command'],
+            'requestid': request['requestid'],
+            'content': {'code': code, 'msg': 'stand-in'}
+        }
+
+def wait_until(condition, timeout=5):
+    """Polls `condition` until it holds, the server runs on another thread."""
+    deadline = time.monotonic() + timeout
+
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('Condition not met in time')
+
+        time.sleep(0.01)
@@ -3,16 +3,30 @@
 
 import os
 import unittest
+from urllib.parse import parse_qs, urlparse
+
+import requests
 
 from unittest.mock import Mock, patch
 
-from stock_providers.schwab import Schwab
+from core import config
+from core.metrics import metrics
+from core.rate_limiter import TokenBucketRateLimiter
+from stock_providers.http import RETRIES
+from stock_providers.schwab import AsyncSchwab, Schwab
+from stock_providers.schwab import REAUTHORIZATIONS, REQUEST_ERRORS
 from stock_providers.exceptions import UnauthorizedError
 from stock_providers.exceptions import UnableToRetrieveStockDataError
 from test_stock_providers.fixtures import api_fixtures
 from test_stock_providers.doubles.schwab import SchwabUnauthorizedStub
 from test_stock_providers.doubles.schwab import SchwabReauthorizedStub
 from test_stock_providers.doubles.schwab import SchwabJsonDecoderErrorStub
+from test_stock_providers.doubles.schwab import SchwabStub
+from test_stock_providers.doubles.schwab_server import SchwabStandInServer
+
+def quotes_response_for_url(url, **kwargs):
+    symbols = parse_qs(urlparse(url).query)['symbols'][0].split(',')
+    return Mock(**{'json.return_value': api_fixtures.schwab_quotes_api_response_success(symbols)})
 
 class Test_StockProviderSchwab_Schwab(unittest.TestCase):
 
@@ -28,21 +42,21 @@ class Test_StockProviderSchwab_Schwab(unittest.TestCase):
         del os.environ['SCHWAB_ACCESS_TOKEN']
         del os.environ['SCHWAB_REFRESH_TOKEN']
 
-    @patch('stock_providers.schwab.requests')
-    def test_price_history_returns_expected_values(self, mock_requests):
+    def test_price_history_returns_expected_values(self):
+        mock_session = Mock()
         expected_stock_quote = api_fixtures.schwab_price_history_api_response_success()
-        mock_requests.get.return_value.json.return_value = expected_stock_quote
-        schwab = Schwab()
+        mock_session.get.return_value.json.return_value = expected_stock_quote
+        schwab = Schwab(session=mock_session)
         actual_stock_quote = schwab.price_history('aapl', '10daily', '1year')
 
         self.assertDictEqual(actual_stock_quote, expected_stock_quote)
 
-    @patch('stock_providers.schwab.requests')
-    def test_price_history_calls_expected_endpoint(self, mock_requests):
-        schwab = Schwab()
+    def test_price_history_calls_expected_endpoint(self):
+        mock_session = Mock()
+        schwab = Schwab(session=mock_session)
         schwab.price_history('aapl', '10daily', '1year', '1717778681000', '1717778681000', False)
 
-        mock_requests.get.assert_called_with(
+        mock_session.get.assert_called_with(
             ''.join([
                 'https://api.schwabapi.com/marketdata/v1/pricehistory?symbol=AAPL&periodType=year&',
                 'period=1&frequencyType=daily&frequency=10&startDate=1717778681000&',
@@ -52,12 +66,12 @@ class Test_StockProviderSchwab_Schwab(unittest.TestCase):
             headers={'Authorization': 'Bearer secret'}
         )
 
-    @patch('stock_providers.schwab.requests')
-    def test_price_history_calls_expected_endpoint_with_only_relevant_params(self, mock_requests):
-        schwab = Schwab()
+    def test_price_history_calls_expected_endpoint_with_only_relevant_params(self):
+        mock_session = Mock()
+        schwab = Schwab(session=mock_session)
         schwab.price_history('aapl', '10daily', '1year')
 
-        mock_requests.get.assert_called_with(
+        mock_session.get.assert_called_with(
             ''.join([
                 'https://api.schwabapi.com/marketdata/v1/pricehistory?symbol=AAPL&periodType=year',
                 '&period=1&frequencyType=daily&frequency=10',
@@ -73,12 +87,12 @@ class Test_StockProviderSchwab_Schwab(unittest.TestCase):
         with self.assertRaises(UnauthorizedError):
             schwab.price_history('aapl', '10daily', '1year')
 
-    @patch('stock_providers.schwab.requests')
-    def test_quotes_calls_expected_endpoint(self, mock_requests):
-        schwab = Schwab()
+    def test_quotes_calls_expected_endpoint(self):
+        mock_session = Mock()
+        schwab = Schwab(session=mock_session)
         schwab.quotes(['aapl', 'msft'])
 
-        mock_requests.get.assert_called_with(
+        mock_session.get.assert_called_with(
             'https://api.schwabapi.com/marketdata/v1/quotes?symbols=AAPL,MSFT',
             timeout=5,
             headers={'Authorization': 'Bearer secret'}
@@ -108,9 +122,9 @@ class Test_StockProviderSchwab_Schwab(unittest.TestCase):
         with self.assertRaises(UnableToRetrieveStockDataError):
             schwab.quotes(['aapl', '10daily'])
 
-    @patch('stock_providers.schwab.requests')
-    def test_price_history_refreshes_access_token_and_reruns_if_401_raised(self, mock_requests):
-        mock_requests.configure_mock(**{
+    def test_price_history_refreshes_access_token_and_reruns_if_401_raised(self):
+        mock_session = Mock()
+        mock_session.configure_mock(**{
             'post.return_value.json.return_value': {
                 'access_token': 'access-token',
                 'refresh_token': 'refresh-token',
@@ -119,10 +133,11 @@ class Test_StockProviderSchwab_Schwab(unittest.TestCase):
             'post.return_value.status_code': 200
         })
 
-        schwab = SchwabReauthorizedStub()
+        reauthorizations = REAUTHORIZATIONS.value()
+        schwab = SchwabReauthorizedStub(session=mock_session)
         schwab.price_history('aapl', '10daily', '1year')
 
-        mock_requests.post.assert_called_with(
+        mock_session.post.assert_called_with(
             url='https://api.schwabapi.com/v1/oauth/token',
             headers={
                 'Authorization': 'Basic a2V5OnNlY3JldA==',
@@ -135,3 +150,159 @@ class Test_StockProviderSchwab_Schwab(unittest.TestCase):
         self.assertEqual(os.environ['SCHWAB_REFRESH_TOKEN'], 'refresh-token')
         self.assertEqual(os.environ['SCHWAB_TOKEN_EXPIRES_IN'], '180')
         self.assertEqual(schwab._price_history_call_count, 2)
+        self.assertEqual(REAUTHORIZATIONS.value(), reauthorizations + 1)
+
+    def test_exposes_rate_limiter_stats(self):
+        rate_limiter = TokenBucketRateLimiter(rate=10, capacity=2, clock=lambda: 0, sleep=lambda secs: None)
+        Schwab(session=Mock(), rate_limiter=rate_limiter)
+
+        rate_limiter.acquire(2)
+        rate_limiter.acquire()
+
+        exposed = metrics.expose()
+        self.assertIn('schwab_rate_limiter_tokens_left -1.0', exposed)
+        self.assertIn('schwab_rate_limiter_waits_count 1', exposed)
+        self.assertIn('schwab_rate_limiter_wait_secs_total 0.1', exposed)
+
+    def test_requests_wait_on_rate_limiter(self):
+        mock_rate_limiter = Mock(**{'acquire.return_value': 0.0})
+        schwab = Schwab(session=Mock(), rate_limiter=mock_rate_limiter)
+        schwab.price_history('aapl', '10daily', '1year')
+        schwab.quotes(['aapl', 'msft'])
+
+        self.assertEqual(mock_rate_limiter.acquire.call_count, 2)
+
+    def test_quotes_splits_symbols_into_chunks_and_merges_results(self):
+        symbols = [f'S{i}' for i in range(5)]
+        mock_session = Mock(**{'get.side_effect': quotes_response_for_url})
+
+        with patch.dict(config['Schwab']['Quotes'], {'MaxSymbolsPerRequest': 2}):
+            schwab = Schwab(session=mock_session)
+
+        actual_quotes = schwab.quotes(symbols)
+        schwab.close()
+
+        self.assertEqual(mock_session.get.call_count, 3)
+        self.assertDictEqual(actual_quotes, api_fixtures.schwab_quotes_api_response_success(symbols))
+
+    def test_quotes_leaves_out_symbols_of_failed_chunk(self):
+        def get(url, **kwargs):
+            if 'S0' in url:
+                raise requests.exceptions.ConnectionError()
+            return quotes_response_for_url(url)
+
+        mock_session = Mock(**{'get.side_effect': get})
+
+        with patch.dict(config['Schwab']['Quotes'], {'MaxSymbolsPerRequest': 2}):
+            schwab = Schwab(session=mock_session)
+
+        actual_quotes = schwab.quotes(['s0', 's1', 's2', 's3'])
+        schwab.close()
+
+        self.assertEqual(set(actual_quotes.keys()), {'S2', 'S3'})
+
+    def test_quotes_raises_unabletoretrievestockdataerror_if_all_chunks_fail(self):
+        mock_session = Mock(**{'get.side_effect': requests.exceptions.ConnectionError()})
+
+        with patch.dict(config['Schwab']['Quotes'], {'MaxSymbolsPerRequest': 2}):
+            schwab = Schwab(session=mock_session)
+
+        with self.assertRaises(UnableToRetrieveStockDataError):
+            schwab.quotes(['s0', 's1', 's2', 's3'])
+
+        schwab.close()
+
+    def test_price_history_raises_unabletoretrievestockdataerror_on_connection_error(self):
+        mock_session = Mock(**{'get.side_effect': requests.exceptions.ConnectionError()})
+        schwab = Schwab(session=mock_session)
+        request_errors = REQUEST_ERRORS.value(reason='request_failed')
+
+        with self.assertRaises(UnableToRetrieveStockDataError):
+            schwab.price_history('aapl', '10daily', '1year')
+
+        self.assertEqual(REQUEST_ERRORS.value(reason='request_failed'), request_errors + 1)
+
+class Test_StockProviderSchwab_Schwab_StandInServer(unittest.TestCase):
+
+    def setUp(self):
+        os.environ['SCHWAB_API_KEY'] = 'key'
+        os.environ['SCHWAB_API_SECRET'] = 'secret'
+        os.environ['SCHWAB_ACCESS_TOKEN'] = 'secret'
+        self.server = SchwabStandInServer()
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+        del os.environ['SCHWAB_API_KEY']
+        del os.environ['SCHWAB_API_SECRET']
+        del os.environ['SCHWAB_ACCESS_TOKEN']
+
+    def test_reuses_one_keep_alive_connection_across_ticks(self):
+        schwab = Schwab(base_url=self.server.url)
+        schwab.price_history('aapl', '1minute', '1day')
+
+        for _ in range(5):
+            actual_quotes = schwab.quotes(['aapl', 'msft'])
+
+        schwab.close()
+
+        self.assertEqual(set(actual_quotes.keys()), {'AAPL', 'MSFT'})
+        self.assertEqual(self.server.requests_count, 6)
+        self.assertEqual(self.server.connections_count, 1)
+
+    def test_retries_request_after_connection_reset(self):
+        self.server.reset_next_requests = 1
+        retries = RETRIES.value()
+        schwab = Schwab(base_url=self.server.url)
+        actual_quotes = schwab.quotes(['aapl'])
+        schwab.close()
+
+        self.assertEqual(set(actual_quotes.keys()), {'AAPL'})
+        self.assertEqual(self.server.requests_count, 2)
+        self.assertEqual(RETRIES.value(), retries + 1)
+
+class Test_StockProviderSchwab_AsyncSchwab(unittest.IsolatedAsyncioTestCase):
+
+    async def test_price_history_returns_wrapped_provider_price_history(self):
+        schwab = AsyncSchwab(SchwabStub())
+        actual_price_history = await schwab.price_history('aapl', '1minute', '1day')
+        schwab.close()
+
+        self.assertDictEqual(
+            actual_price_history,
+            api_fixtures.schwab_price_history_api_response_success('aapl')
+        )
+
+    async def test_quotes_returns_wrapped_provider_quotes(self):
+        schwab = AsyncSchwab(SchwabStub())
+        actual_quotes = await schwab.quotes(['aapl', 'msft'])
+        schwab.close()
+
+        self.assertDictEqual(
+            actual_quotes,
+            api_fixtures.schwab_quotes_api_response_success(['aapl', 'msft'])
+        )
+
+    async def test_quotes_propagates_provider_errors(self):
+        schwab = AsyncSchwab(SchwabJsonDecoderErrorStub())
+
+        with self.assertRaises(UnableToRetrieveStockDataError):
+            await schwab.quotes(['aapl'])
+
+        schwab.close()
+
+    @patch('stock_providers.schwab.asyncio.sleep')
+    async def test_wait_for_quotes_sleeps_for_polling_provider(self, sleep_mock):
+        schwab = AsyncSchwab(SchwabStub())
+
+        self.assertFalse(await schwab.wait_for_quotes(1))
+        sleep_mock.assert_awaited_once_with(1)
+        schwab.close()
+
+    async def test_wait_for_quotes_waits_on_streaming_provider(self):
+        streaming_provider = Mock(**{'wait_for_quotes.return_value': True})
+        schwab = AsyncSchwab(streaming_provider)
+
+        self.assertTrue(await schwab.wait_for_quotes(1))
+        streaming_provider.wait_for_quotes.assert_called_once_with(1)
+        schwab.close()
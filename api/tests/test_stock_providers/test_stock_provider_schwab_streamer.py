@@ -0,0 +1,133 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import os
+import unittest
+
+from stock_providers.exceptions import UnableToRetrieveStockDataError
+from stock_providers.schwab_streamer import SchwabStreamer, StreamingQuotes
+from test_stock_providers.doubles.schwab import SchwabStub
+from test_stock_providers.doubles.schwab_streamer_server import STREAMER_INFO, SchwabStreamerStandInServer, wait_until
+
+AAPL_QUOTE = {'3': 190.5, '8': 1000, '35': 1709791220414}
+
+class Test_StockProviderSchwabStreamer_SchwabStreamer(unittest.TestCase):
+
+    def setUp(self):
+        os.environ['SCHWAB_ACCESS_TOKEN'] = 'secret'
+        self.server = SchwabStreamerStandInServer().start()
+        self.streamer = self.streamer_for(self.server)
+
+    def tearDown(self):
+        self.streamer.close()
+        self.server.shutdown()
+        del os.environ['SCHWAB_ACCESS_TOKEN']
+
+    def streamer_for(self, server):
+        return SchwabStreamer(lambda: STREAMER_INFO, server.url, reconnect_delay_secs=0.05, coalesce_secs=0)
+
+    def test_quotes_logs_in_and_subscribes_to_symbols(self):
+        self.streamer.quotes(['aapl', 'msft'])
+
+        wait_until(lambda: self.server.subscribed == {'AAPL', 'MSFT'})
+        self.assertEqual(self.server.commands()[0], ('ADMIN', 'LOGIN', None))
+        self.assertEqual(self.server.requests[0]['parameters']['Authorization'], 'secret')
+
+    def test_quotes_returns_pushed_quotes_in_schwab_quotes_format(self):
+        self.streamer.quotes(['aapl'])
+        wait_until(lambda: self.server.subscribed == {'AAPL'})
+
+        self.server.push('AAPL', **AAPL_QUOTE)
+
+        self.assertTrue(self.streamer.wait_for_quotes(5))
+        self.assertEqual(
+            self.streamer.quotes(['aapl']),
+            {'AAPL': {'quote': {'lastPrice': 190.5, 'totalVolume': 1000, 'quoteTime': 1709791220414}}}
+        )
+
+    def test_quotes_merges_updates_carrying_only_changed_fields(self):
+        self.streamer.quotes(['aapl'])
+        wait_until(lambda: self.server.subscribed == {'AAPL'})
+        self.server.push('AAPL', **AAPL_QUOTE)
+        self.streamer.wait_for_quotes(5)
+        self.streamer.quotes(['aapl'])
+
+        self.server.push('AAPL', **{'3': 191.0})
+        self.streamer.wait_for_quotes(5)
+
+        self.assertEqual(self.streamer.quotes(['aapl'])['AAPL']['quote']['lastPrice'], 191.0)
+        self.assertEqual(self.streamer.quotes(['aapl'])['AAPL']['quote']['totalVolume'], 1000)
+
+    def test_quotes_leaves_out_symbols_without_complete_quote(self):
+        self.streamer.quotes(['aapl'])
+        wait_until(lambda: self.server.subscribed == {'AAPL'})
+        self.server.push('AAPL', **{'3': 190.5})
+        self.streamer.wait_for_quotes(5)
+
+        self.assertEqual(self.streamer.quotes(['aapl']), {})
+
+    def test_wait_for_quotes_times_out_without_updates(self):
+        self.streamer.quotes(['aapl'])
+
+        self.assertFalse(self.streamer.wait_for_quotes(0.05))
+
+    def test_quotes_adds_and_unsubscribes_changed_symbols(self):
+        self.streamer.quotes(['aapl', 'msft'])
+        wait_until(lambda: self.server.subscribed == {'AAPL', 'MSFT'})
+
+        self.streamer.quotes(['aapl', 'tsla'])
+
+        wait_until(lambda: self.server.subscribed == {'AAPL', 'TSLA'})
+        self.assertIn(('LEVELONE_EQUITIES', 'ADD', 'TSLA'), self.server.commands())
+        self.assertIn(('LEVELONE_EQUITIES', 'UNSUBS', 'MSFT'), self.server.commands())
+
+    def test_reconnects_and_resubscribes_after_connection_drop(self):
+        self.streamer.quotes(['aapl'])
+        wait_until(lambda: self.server.subscribed == {'AAPL'})
+
+        self.server.subscribed = set()
+        self.server.drop_connections()
+
+        wait_until(lambda: self.server.subscribed == {'AAPL'})
+        self.assertEqual([c[1] for c in self.server.commands()].count('LOGIN'), 2)
+
+    def test_reconnects_after_malformed_message(self):
+        self.streamer.quotes(['aapl'])
+        wait_until(lambda: self.server.subscribed == {'AAPL'})
+
+        with self.assertLogs('stock_providers.schwab_streamer', 'ERROR'):
+            self.server.send('not json')
+            wait_until(lambda: [c[1] for c in self.server.commands()].count('LOGIN') == 2)
+
+    def test_refreshes_access_token_when_login_is_refused(self):
+        server = SchwabStreamerStandInServer(access_token='fresh').start()
+        streamer = SchwabStreamer(lambda: STREAMER_INFO, server.url, reconnect_delay_secs=0.05,
+                                  authorize=lambda: os.environ.update(SCHWAB_ACCESS_TOKEN='fresh'))
+        os.environ['SCHWAB_ACCESS_TOKEN'] = 'expired'
+
+        try:
+            with self.assertLogs('stock_providers.schwab_streamer', 'ERROR'):
+                streamer.quotes(['aapl'])
+                wait_until(lambda: server.subscribed == {'AAPL'})
+        finally:
+            streamer.close()
+            server.shutdown()
+
+    def test_quotes_raises_while_not_connected(self):
+        server = SchwabStreamerStandInServer(login_code=3).start()
+        streamer = SchwabStreamer(lambda: STREAMER_INFO, server.url, connect_timeout_secs=0.2, reconnect_delay_secs=0.05)
+
+        try:
+            with self.assertLogs('stock_providers.schwab_streamer', 'ERROR'):
+                with self.assertRaises(UnableToRetrieveStockDataError):
+                    streamer.quotes(['aapl'])
+        finally:
+            streamer.close()
+            server.shutdown()
+
+class Test_StockProviderSchwabStreamer_StreamingQuotes(unittest.TestCase):
+
+    def test_price_history_is_requested_from_polling_provider(self):
+        streaming_quotes = StreamingQuotes(SchwabStub(), None)
+
+        self.assertEqual(streaming_quotes.price_history('aapl', '1minute', '1day')['symbol'], 'aapl')
@@ -0,0 +1,243 @@
+import redis
+
+class RedisPipelineStub:
+
+    def __init__(self, redis_stub):
+        self._redis_stub = redis_stub
+        self._commands = []
+
+    def publish(self, channel_name, message):
+        self._commands.append((channel_name, message))
+
+    def xadd(self, name, fields, maxlen=None, approximate=True):
+        self._redis_stub.maxlens.append((maxlen, approximate))
+        self._commands.append((name, fields[b'data']))
+
+    def execute(self):
+        self._redis_stub.raise_if_failing()
+        self._redis_stub.pipelines.append(self._commands)
+        self._redis_stub.published.extend(self._commands)
+
+        return [1] * len(self._commands)
+
+class RedisStub:
+    """Records published messages. The first `failures` calls raise
+    a connection error."""
+
+    def __init__(self, failures=0):
+        self._failures = failures
+        self.published = []
+        self.pipelines = []
+        self.maxlens = []
+
+    def publish(self, channel_name, message):
+        self.raise_if_failing()
+        self.published.append((channel_name, message))
+
+        return 1
+
+    def xadd(self, name, fields, maxlen=None, approximate=True):
+        self.raise_if_failing()
+        self.maxlens.append((maxlen, approximate))
+        self.published.append((name, fields[b'data']))
+
+        return b'1-0'
+
+    def pipeline(self, transaction=True):
+        return RedisPipelineStub(self)
+
+    def raise_if_failing(self):
+        if self._failures > 0:
+            self._failures -= 1
+            raise redis.exceptions.ConnectionError('connection refused')
+
+class AsyncRedisPipelineStub(RedisPipelineStub):
+
+    async def execute(self):
+        return super().execute()
+
+class AsyncRedisStub(RedisStub):
+
+    async def publish(self, channel_name, message):
+        return super().publish(channel_name, message)
+
+    async def xadd(self, name, fields, maxlen=None, approximate=True):
+        return super().xadd(name, fields, maxlen, approximate)
+
+    def pipeline(self, transaction=True):
+        return AsyncRedisPipelineStub(self)
+
+class RedisStreamsStub:
+    """In-memory streams and consumer groups. Entries delivered with '>'
+    stay pending until acknowledged."""
+
+    def __init__(self):
+        self.streams = {}
+        self.groups = {}
+        self.pending = {}
+        self.reads = []
+        self._next_id = 1
+
+    def add(self, stream, data):
+        entry_id = f'{self._next_id}-0'.encode('utf-8')
+        self._next_id += 1
+        self.streams.setdefault(stream, []).append((entry_id, {b'data': data}))
+
+        return entry_id
+
+    def trim(self, stream, entry_id):
+        self.streams[stream] = [e for e in self.streams[stream] if e[0] != entry_id]
+
+    def xgroup_create(self, name, groupname, id='$', mkstream=False):
+        if (name, groupname) in self.groups:
+            raise redis.exceptions.ResponseError('BUSYGROUP Consumer Group name already exists')
+
+        entries = self.streams.setdefault(name, [])
+        self.groups[(name, groupname)] = _id(entries[-1][0]) if id == '$' and entries else _id(id)
+        self.pending.setdefault((name, groupname), [])
+
+        return True
+
+    def xreadgroup(self, groupname, consumername, streams, count=None, block=None):
+        self.reads.append((dict(streams), block))
+        response = []
+
+        for name, read_id in streams.items():
+            entries = self.streams.get(name, [])
+
+            if read_id == '>':
+                delivered = [e for e in entries if _id(e[0]) > self.groups[(name, groupname)]][:count]
+
+                if delivered:
+                    self.groups[(name, groupname)] = _id(delivered[-1][0])
+                    self.pending[(name, groupname)].extend(e[0] for e in delivered)
+            else:
+                by_id = dict(entries)
+                delivered = [
+                    (entry_id, by_id.get(entry_id))
+                    for entry_id in self.pending[(name, groupname)]
+                    if _id(entry_id) > _id(read_id)
+                ][:count]
+
+            response.append([name.encode('utf-8'), delivered])
+
+        return response
+
+    def xack(self, name, groupname, *ids):
+        name = name.decode('utf-8') if isinstance(name, bytes) else name
+        pending = self.pending[(name, groupname)]
+        self.pending[(name, groupname)] = [i for i in pending if i not in ids]
+
+        return len(pending) - len(self.pending[(name, groupname)])
+
+    def xrange(self, name, min='-', max='+', count=None):
+        entries = [e for e in self.streams.get(name, []) if min == '-' or _id(e[0]) >= _id(min)]
+
+        return entries[:count]
+
+    def xpending(self, name, groupname):
+        return {'pending': len(self.pending[(name, groupname)])}
+
+def _id(entry_id):
+    entry_id = entry_id.decode('utf-8') if isinstance(entry_id, bytes) else entry_id
+    milliseconds, sequence = (entry_id.split('-') + ['0'])[:2]
+
+    return int(milliseconds), int(sequence)
+
+class RedisSnapshotsPipelineStub:
+
+    def __init__(self, redis_stub, transaction):
+        self._redis_stub = redis_stub
+        self._commands = []
+        self.transaction = transaction
+
+    def __getattr__(self, command):
+        def queue(*args, **kwargs):
+            self._commands.append((command, args, kwargs))
+            return self
+
+        return queue
+
+    def execute(self):
+        self._redis_stub.raise_if_failing()
+        self._redis_stub.transactions.append(self.transaction)
+
+        return [getattr(self._redis_stub, command)(*args, **kwargs) for command, args, kwargs in self._commands]
+
+class RedisSnapshotsStub:
+    """In-memory sorted sets and hashes behind pipelines. The first
+    `failures` pipelines raise a connection error."""
+
+    def __init__(self, failures=0):
+        self._failures = failures
+        self.sorted_sets = {}
+        self.hashes = {}
+        self.expires = {}
+        self.transactions = []
+
+    def pipeline(self, transaction=True):
+        return RedisSnapshotsPipelineStub(self, transaction)
+
+    def raise_if_failing(self):
+        if self._failures > 0:
+            self._failures -= 1
+            raise redis.exceptions.ConnectionError('connection refused')
+
+    def delete(self, name):
+        self.sorted_sets.pop(name, None)
+        self.hashes.pop(name, None)
+
+    def zadd(self, name, mapping):
+        self.sorted_sets.setdefault(name, {}).update(mapping)
+
+    def zremrangebyscore(self, name, min, max):
+        members = self.sorted_sets.get(name, {})
+        self.sorted_sets[name] = {m: score for m, score in members.items() if not min <= score <= max}
+
+    def zremrangebyrank(self, name, start, end):
+        ranked = self.zrange(name, 0, -1)
+        removed = ranked[start:len(ranked) + end + 1 if end < 0 else end + 1]
+        self.sorted_sets[name] = {m: s for m, s in self.sorted_sets.get(name, {}).items() if m not in removed}
+
+    def zrange(self, name, start, end):
+        ranked = sorted(self.sorted_sets.get(name, {}), key=lambda m: self.sorted_sets[name][m])
+
+        return ranked[start:len(ranked) + end + 1 if end < 0 else end + 1]
+
+    def hset(self, name, mapping):
+        self.hashes.setdefault(name, {}).update(
+            {k.encode('utf-8'): str(v).encode('utf-8') for k, v in mapping.items()}
+        )
+
+    def hget(self, name, key):
+        return self.hashes.get(name, {}).get(key.encode('utf-8'))
+
+    def hgetall(self, name):
+        return dict(self.hashes.get(name, {}))
+
+    def expire(self, name, secs):
+        self.expires[name] = secs
+
+class AsyncRedisSnapshotsPipelineStub(RedisSnapshotsPipelineStub):
+
+    async def execute(self):
+        return super().execute()
+
+class AsyncRedisSnapshotsStub(RedisSnapshotsStub):
+
+    def pipeline(self, transaction=True):
+        return AsyncRedisSnapshotsPipelineStub(self, transaction)
+
+class PublisherSpy:
+    """Records the calls of a stock publisher."""
+
+    def __init__(self):
+        self.published = []
+        self.batches = []
+
+    def publish(self, channel_name, message):
+        self.published.append((channel_name, message))
+
+    def publish_batch(self, channel_messages):
+        self.batches.append(channel_messages)
+        self.published.extend(channel_messages)
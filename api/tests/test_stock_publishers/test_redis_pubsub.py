@@ -0,0 +1,63 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import unittest
+from unittest.mock import patch
+
+import redis
+
+from stock_publishers.redis_pubsub import AsyncRedisPubSub, RedisPubSub
+from test_stock_publishers.doubles.redis import AsyncRedisStub, RedisStub
+
+class TestRedisPubSub_RedisPubSub(unittest.TestCase):
+
+    def test_publish_publishes_message_to_channel(self):
+        redis_stub = RedisStub()
+        RedisPubSub(redis_stub).publish('symbol-aapl-1minute-1day', 'message')
+
+        self.assertEqual(redis_stub.published, [('symbol-aapl-1minute-1day', 'message')])
+        self.assertEqual(redis_stub.pipelines, [])
+
+    @patch('stock_publishers.retries.time.sleep')
+    def test_publish_retries_on_connection_error(self, _):
+        redis_stub = RedisStub(failures=2)
+        RedisPubSub(redis_stub).publish('channel', 'message')
+
+        self.assertEqual(redis_stub.published, [('channel', 'message')])
+
+    @patch('stock_publishers.retries.time.sleep')
+    def test_publish_raises_when_retries_are_exhausted(self, _):
+        redis_stub = RedisStub(failures=3)
+
+        with self.assertRaises(redis.exceptions.ConnectionError):
+            RedisPubSub(redis_stub).publish('channel', 'message')
+
+    def test_publish_batch_sends_one_pipeline_per_flush_size_messages(self):
+        redis_stub = RedisStub()
+        channel_messages = [(f'channel-{i}', f'message-{i}') for i in range(5)]
+
+        stats = RedisPubSub(redis_stub, flush_size=2).publish_batch(channel_messages)
+
+        self.assertEqual([len(p) for p in redis_stub.pipelines], [2, 2, 1])
+        self.assertEqual(redis_stub.published, channel_messages)
+        self.assertEqual(stats['messages'], 5)
+        self.assertEqual(stats['pipelines'], 3)
+        self.assertGreaterEqual(stats['latency_secs'], 0)
+
+class TestRedisPubSub_AsyncRedisPubSub(unittest.IsolatedAsyncioTestCase):
+
+    async def test_publish_batch_sends_one_pipeline_per_flush_size_messages(self):
+        redis_stub = AsyncRedisStub()
+        channel_messages = [(f'channel-{i}', f'message-{i}') for i in range(3)]
+
+        stats = await AsyncRedisPubSub(redis_stub, flush_size=2).publish_batch(channel_messages)
+
+        self.assertEqual([len(p) for p in redis_stub.pipelines], [2, 1])
+        self.assertEqual(stats['messages'], 3)
+
+    @patch('stock_publishers.retries.asyncio.sleep')
+    async def test_publish_retries_on_connection_error(self, _):
+        redis_stub = AsyncRedisStub(failures=1)
+        await AsyncRedisPubSub(redis_stub).publish('channel', 'message')
+
+        self.assertEqual(redis_stub.published, [('channel', 'message')])
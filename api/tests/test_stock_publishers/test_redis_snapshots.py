@@ -0,0 +1,96 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import unittest
+from unittest.mock import patch
+
+import redis
+
+from messaging.messages import Candle, Message
+from stock_publishers.redis_snapshots import AsyncRedisSnapshots, RedisSnapshots, snapshot_keys
+from test_stock_publishers.doubles.redis import AsyncRedisSnapshotsStub, RedisSnapshotsStub
+
+CHANNEL = 'symbol-aapl-1minute-1day'
+
+def candle(i, close):
+    return Candle(i * 60000, close, close, close, close, 100)
+
+HISTORY = Message('history', 120000, (candle(0, 1.0), candle(1, 2.0), candle(2, 3.0)), sequence=1)
+
+class TestRedisSnapshots_RedisSnapshots(unittest.TestCase):
+
+    def setUp(self):
+        self.redis_stub = RedisSnapshotsStub()
+        self.snapshots = RedisSnapshots(self.redis_stub, capacity=3, expire_secs=60)
+
+    def test_load_returns_history_as_snapshot(self):
+        self.snapshots.update([(CHANNEL, HISTORY)])
+
+        self.assertEqual(self.snapshots.load(CHANNEL), HISTORY)
+
+    def test_load_returns_none_without_snapshot(self):
+        self.assertIsNone(self.snapshots.load(CHANNEL))
+
+    def test_update_upserts_candles_and_advances_sequence(self):
+        self.snapshots.update([
+            (CHANNEL, HISTORY),
+            (CHANNEL, Message('candle_update', 125000, (candle(2, 4.0),), sequence=2)),
+            (CHANNEL, Message('candle_closed', 180000, (candle(2, 5.0),), sequence=3))
+        ])
+
+        self.assertEqual(
+            self.snapshots.load(CHANNEL),
+            Message('history', 180000, (candle(0, 1.0), candle(1, 2.0), candle(2, 5.0)), sequence=3)
+        )
+
+    def test_update_keeps_at_most_capacity_candles(self):
+        self.snapshots.update([
+            (CHANNEL, HISTORY),
+            (CHANNEL, Message('candle_update', 180000, (candle(3, 4.0),), sequence=2))
+        ])
+
+        self.assertEqual(self.snapshots.load(CHANNEL).candles, (candle(1, 2.0), candle(2, 3.0), candle(3, 4.0)))
+
+    def test_update_replaces_snapshot_with_new_history(self):
+        self.snapshots.update([(CHANNEL, HISTORY)])
+        self.snapshots.update([(CHANNEL, Message('history', 60000, (candle(1, 9.0),), sequence=4))])
+
+        self.assertEqual(self.snapshots.load(CHANNEL), Message('history', 60000, (candle(1, 9.0),), sequence=4))
+
+    def test_update_applies_each_batch_in_one_transaction_and_refreshes_expiry(self):
+        snapshots = RedisSnapshots(self.redis_stub, expire_secs=60, flush_size=2)
+        snapshots.update([(f'channel-{i}', HISTORY) for i in range(3)])
+
+        self.assertEqual(self.redis_stub.transactions, [True, True])
+        self.assertEqual(self.redis_stub.expires[snapshot_keys('channel-2')[1]], 60)
+
+    @patch('stock_publishers.retries.time.sleep')
+    def test_update_retries_on_connection_error(self, _):
+        redis_stub = RedisSnapshotsStub(failures=2)
+        RedisSnapshots(redis_stub).update([(CHANNEL, HISTORY)])
+
+        self.assertEqual(RedisSnapshots(redis_stub).load(CHANNEL), HISTORY)
+
+    @patch('stock_publishers.retries.time.sleep')
+    def test_update_raises_when_retries_are_exhausted(self, _):
+        with self.assertRaises(redis.exceptions.ConnectionError):
+            RedisSnapshots(RedisSnapshotsStub(failures=3)).update([(CHANNEL, HISTORY)])
+
+    def test_sequences_returns_last_sequence_of_channels_with_snapshot(self):
+        self.snapshots.update([(CHANNEL, HISTORY._replace(sequence=41))])
+
+        self.assertEqual(self.snapshots.sequences([CHANNEL, 'symbol-msft-1minute-1day']), {CHANNEL: 41})
+
+class TestRedisSnapshots_AsyncRedisSnapshots(unittest.IsolatedAsyncioTestCase):
+
+    async def test_load_returns_updated_snapshot(self):
+        snapshots = AsyncRedisSnapshots(AsyncRedisSnapshotsStub())
+        await snapshots.update([(CHANNEL, HISTORY)])
+
+        self.assertEqual(await snapshots.load(CHANNEL), HISTORY)
+
+    async def test_sequences_returns_last_sequence_of_channels_with_snapshot(self):
+        snapshots = AsyncRedisSnapshots(AsyncRedisSnapshotsStub())
+        await snapshots.update([(CHANNEL, HISTORY)])
+
+        self.assertEqual(await snapshots.sequences([CHANNEL]), {CHANNEL: 1})
@@ -0,0 +1,181 @@
+# pylint:disable=missing-module-docstring, missing-class-docstring
+# pylint:disable=missing-function-docstring, invalid-name, line-too-long
+
+import unittest
+from unittest.mock import patch
+
+from stock_publishers.redis_streams import AsyncRedisStreams, RedisStreams, RedisStreamsSubscriber
+from stock_publishers.transports import UnsupportedSubscriptionError
+from test_stock_publishers.doubles.redis import AsyncRedisStub, RedisStreamsStub, RedisStub
+
+CHANNEL = 'symbol-aapl-1minute-1day'
+
+class TestRedisStreams_RedisStreams(unittest.TestCase):
+
+    def test_publish_appends_message_to_capped_stream(self):
+        redis_stub = RedisStub()
+        RedisStreams(redis_stub, max_len=100).publish(CHANNEL, b'message')
+
+        self.assertEqual(redis_stub.published, [(CHANNEL, b'message')])
+        self.assertEqual(redis_stub.maxlens, [(100, True)])
+
+    @patch('stock_publishers.retries.time.sleep')
+    def test_publish_retries_on_connection_error(self, _):
+        redis_stub = RedisStub(failures=2)
+        RedisStreams(redis_stub).publish(CHANNEL, b'message')
+
+        self.assertEqual(redis_stub.published, [(CHANNEL, b'message')])
+
+    def test_publish_batch_sends_one_pipeline_per_flush_size_messages(self):
+        redis_stub = RedisStub()
+        channel_messages = [(f'channel-{i}', f'message-{i}'.encode('utf-8')) for i in range(3)]
+
+        stats = RedisStreams(redis_stub, max_len=100, flush_size=2).publish_batch(channel_messages)
+
+        self.assertEqual([len(p) for p in redis_stub.pipelines], [2, 1])
+        self.assertEqual(redis_stub.published, channel_messages)
+        self.assertEqual(redis_stub.maxlens, [(100, True)] * 3)
+        self.assertEqual(stats['pipelines'], 2)
+
+class TestRedisStreams_AsyncRedisStreams(unittest.IsolatedAsyncioTestCase):
+
+    async def test_publish_batch_sends_one_pipeline_per_flush_size_messages(self):
+        redis_stub = AsyncRedisStub()
+        channel_messages = [(f'channel-{i}', f'message-{i}'.encode('utf-8')) for i in range(3)]
+
+        stats = await AsyncRedisStreams(redis_stub, flush_size=2).publish_batch(channel_messages)
+
+        self.assertEqual([len(p) for p in redis_stub.pipelines], [2, 1])
+        self.assertEqual(stats['messages'], 3)
+
+    async def test_publish_appends_message_to_stream(self):
+        redis_stub = AsyncRedisStub()
+        await AsyncRedisStreams(redis_stub, max_len=5).publish(CHANNEL, b'message')
+
+        self.assertEqual(redis_stub.published, [(CHANNEL, b'message')])
+        self.assertEqual(redis_stub.maxlens, [(5, True)])
+
+class TestRedisStreams_RedisStreamsSubscriber(unittest.TestCase):
+
+    def setUp(self):
+        self.redis_stub = RedisStreamsStub()
+
+    def subscriber(self, consumer='a', start_id='0'):
+        return RedisStreamsSubscriber(self.redis_stub, 'alert-evaluator', consumer, start_id)
+
+    def receive_all(self, subscriber, ack=True):
+        received = []
+
+        while (message := subscriber.get_message(timeout=1)) is not None:
+            received.append(message['data'])
+
+            if ack:
+                subscriber.ack(message)
+
+        return received
+
+    def test_get_message_returns_retained_entries_for_new_group(self):
+        self.redis_stub.add(CHANNEL, b'history')
+        subscriber = self.subscriber()
+        subscriber.subscribe(CHANNEL)
+        self.redis_stub.add(CHANNEL, b'update')
+
+        message = subscriber.get_message(timeout=1)
+
+        self.assertEqual(message['channel'], CHANNEL.encode('utf-8'))
+        self.assertEqual(message['data'], b'history')
+        self.assertEqual(self.receive_all(subscriber), [b'update'])
+
+    def test_get_message_skips_retained_entries_when_starting_at_the_end(self):
+        self.redis_stub.add(CHANNEL, b'old')
+        subscriber = self.subscriber(start_id='$')
+        subscriber.subscribe(CHANNEL)
+        self.redis_stub.add(CHANNEL, b'new')
+
+        self.assertEqual(self.receive_all(subscriber), [b'new'])
+
+    def test_get_message_returns_none_without_subscriptions(self):
+        self.assertIsNone(self.subscriber().get_message(timeout=1))
+        self.assertEqual(self.redis_stub.reads, [])
+
+    def test_unacknowledged_entries_are_redelivered_after_restart(self):
+        self.redis_stub.add(CHANNEL, b'1')
+        self.redis_stub.add(CHANNEL, b'2')
+        subscriber = self.subscriber()
+        subscriber.subscribe(CHANNEL)
+        subscriber.ack(subscriber.get_message(timeout=1))
+        subscriber.get_message(timeout=1)  # dies before acknowledging
+
+        restarted = self.subscriber()
+        restarted.subscribe(CHANNEL)
+        self.redis_stub.add(CHANNEL, b'3')
+
+        self.assertEqual(self.receive_all(restarted), [b'2', b'3'])
+        self.assertEqual(restarted.backlog(), {CHANNEL: 0})
+
+    def test_pending_read_does_not_block_and_new_entries_read_blocks(self):
+        subscriber = self.subscriber()
+        subscriber.subscribe(CHANNEL)
+
+        self.assertIsNone(subscriber.get_message(timeout=0.5))
+        self.assertEqual(self.redis_stub.reads, [({CHANNEL: '0'}, None), ({CHANNEL: '>'}, 500)])
+
+    def test_pending_entries_trimmed_from_the_stream_are_acknowledged_and_skipped(self):
+        entry_id = self.redis_stub.add(CHANNEL, b'trimmed')
+        subscriber = self.subscriber()
+        subscriber.subscribe(CHANNEL)
+        subscriber.get_message(timeout=1)
+        self.redis_stub.trim(CHANNEL, entry_id)
+
+        restarted = self.subscriber()
+        restarted.subscribe(CHANNEL)
+
+        self.assertEqual(self.receive_all(restarted), [])
+        self.assertEqual(restarted.backlog(), {CHANNEL: 0})
+
+    def test_backlog_counts_unacknowledged_entries(self):
+        self.redis_stub.add(CHANNEL, b'1')
+        self.redis_stub.add(CHANNEL, b'2')
+        subscriber = self.subscriber()
+        subscriber.subscribe(CHANNEL)
+
+        self.receive_all(subscriber, ack=False)
+
+        self.assertEqual(subscriber.backlog(), {CHANNEL: 2})
+
+    def test_subscribe_keeps_existing_group(self):
+        self.redis_stub.add(CHANNEL, b'1')
+        self.subscriber().subscribe(CHANNEL)
+        subscriber = self.subscriber('b')
+        subscriber.subscribe(CHANNEL)
+
+        self.assertEqual(self.receive_all(subscriber), [b'1'])
+
+    def test_unsubscribe_drops_buffered_messages(self):
+        self.redis_stub.add(CHANNEL, b'1')
+        self.redis_stub.add(CHANNEL, b'2')
+        subscriber = self.subscriber()
+        subscriber.subscribe(CHANNEL)
+        subscriber.get_message(timeout=1)
+
+        subscriber.unsubscribe(CHANNEL)
+
+        self.assertIsNone(subscriber.get_message(timeout=1))
+
+    def test_replay_returns_entries_from_id_without_moving_the_group(self):
+        self.redis_stub.add(CHANNEL, b'1')
+        second_id = self.redis_stub.add(CHANNEL, b'2')
+        subscriber = self.subscriber()
+        subscriber.subscribe(CHANNEL)
+
+        self.assertEqual(subscriber.replay(CHANNEL, second_id), [(second_id, b'2')])
+        self.assertEqual(self.receive_all(subscriber), [b'1', b'2'])
+
+    @patch('stock_publishers.redis_streams.time.sleep')
+    def test_get_message_without_subscriptions_waits_out_timeout(self, mock_sleep):
+        self.assertIsNone(self.subscriber().get_message(timeout=1))
+        mock_sleep.assert_called_once_with(1)
+
+    def test_psubscribe_raises_unsupportedsubscriptionerror(self):
+        with self.assertRaises(UnsupportedSubscriptionError):
+            self.subscriber().psubscribe('symbol-*')
@@ -1,3 +1,5 @@
+from stock_subscriptions_sources.subscription_index import SubscriptionChanges
+
 class AlertsStub:
 
     def __init__(self, subscriptions_count=2):
@@ -17,4 +19,36 @@ class AlertsStub:
 class OneMinuteSubscriptionAlertsStub:
 
     def list_subscriptions(self):
-        return [('aapl', '1minute', '1day')]
\ No newline at end of file
+        return [('aapl', '1minute', '1day')]
+
+class ManySubscriptionsAlertsStub:
+
+    def __init__(self, subscriptions_count=20):
+        self._subscriptions_count = subscriptions_count
+
+    def list_subscriptions(self):
+        return [(f'sym{i}', '1minute', '1day')
+                for i in range(self._subscriptions_count)]
+
+class DuplicateSubscriptionsAlertsStub:
+    """Three alerts on one AAPL stream, one on another AAPL timeframe."""
+
+    def list_subscriptions(self):
+        return [
+            ('aapl', '1minute', '1day'),
+            ('aapl', '5minute', '10day'),
+            ('aapl', '1minute', '1day'),
+            ('aapl', '1minute', '1day')
+        ]
+
+class ScriptedSubscriptionChangesAlertsStub:
+    """Returns the given `SubscriptionChanges` one per call, then no changes."""
+
+    def __init__(self, changes):
+        self._changes = list(changes)
+
+    def subscription_changes(self):
+        if self._changes:
+            return self._changes.pop(0)
+
+        return SubscriptionChanges([], [])
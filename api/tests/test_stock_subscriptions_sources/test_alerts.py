@@ -1,12 +1,23 @@
 # pylint:disable=missing-module-docstring, invalid-name, line-too-long
 # pylint:disable=missing-function-docstring
 
+import datetime
+import time
 import unittest
 
 from unittest.mock import Mock, patch
 
+from bson import ObjectId
+from pymongo.errors import OperationFailure, PyMongoError
+
+from core.utils import DotDict
 from factories import AlertFactory
 from stock_subscriptions_sources.alerts import Alerts
+from test_core.doubles.clock import FakeClock
+
+def alert(symbol, updated_at=datetime.datetime(2024, 6, 1), alert_id=None):
+    return AlertFactory(id=alert_id or ObjectId(), symbol=symbol, frequency='1minute',
+                        period='1day', updated_at=updated_at)
 
 class Test_Alerts_Alerts(unittest.TestCase):
 
@@ -20,3 +31,201 @@ class Test_Alerts_Alerts(unittest.TestCase):
         expected_subscriptions = list((a.symbol, a.frequency, a.period) for a in stub_alert_models)
 
         self.assertEqual(actual_subscriptions, expected_subscriptions)
+
+class Test_Alerts_Alerts_Polling(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.alerts = Alerts(change_tracking='polling', poll_interval_secs=5, clock=self.clock,
+                             poll_overlap_secs=60)
+
+    @patch('stock_subscriptions_sources.alerts.Alert')
+    def test_first_subscription_changes_returns_all_alerts_as_added(self, mock_alert):
+        mock_alert.objects.only.return_value = [alert('aapl'), alert('aapl')]
+
+        changes = self.alerts.subscription_changes()
+
+        self.assertEqual(changes.added, [('aapl', '1minute', '1day')] * 2)
+        self.assertEqual(changes.removed, [])
+
+    @patch('stock_subscriptions_sources.alerts.Alert')
+    def test_subscription_changes_does_not_query_before_poll_interval(self, mock_alert):
+        mock_alert.objects.only.return_value = [alert('aapl')]
+        self.alerts.subscription_changes()
+        self.clock.now += 1
+
+        changes = self.alerts.subscription_changes()
+
+        self.assertEqual(changes, ([], []))
+        mock_alert.objects.assert_not_called()
+
+    @patch('stock_subscriptions_sources.alerts.Alert')
+    def test_subscription_changes_returns_only_alerts_updated_since_last_poll(self, mock_alert):
+        aapl = alert('aapl', datetime.datetime(2024, 6, 1))
+        updated_aapl = alert('nvda', datetime.datetime(2024, 6, 2), alert_id=aapl.id)
+        msft = alert('msft', datetime.datetime(2024, 6, 2))
+        mock_alert.objects.only.return_value = [aapl]
+        self.alerts.subscription_changes()
+        mock_alert.objects.return_value.only.return_value = [aapl, updated_aapl, msft]
+        mock_alert.objects.count.return_value = 2
+        self.clock.now += 5
+
+        changes = self.alerts.subscription_changes()
+
+        mock_alert.objects.assert_called_with(updated_at__gte=datetime.datetime(2024, 5, 31, 23, 59))
+        self.assertEqual(changes.added, [('nvda', '1minute', '1day'), ('msft', '1minute', '1day')])
+        self.assertEqual(changes.removed, [('aapl', '1minute', '1day')])
+        mock_alert.objects.scalar.assert_not_called()
+
+    @patch('stock_subscriptions_sources.alerts.Alert')
+    def test_subscription_changes_returns_deleted_alerts_as_removed(self, mock_alert):
+        aapl, msft = alert('aapl'), alert('msft')
+        mock_alert.objects.only.return_value = [aapl, msft]
+        self.alerts.subscription_changes()
+        mock_alert.objects.return_value.only.return_value = []
+        mock_alert.objects.count.return_value = 1
+        mock_alert.objects.scalar.return_value = [msft.id]
+        self.clock.now += 5
+
+        changes = self.alerts.subscription_changes()
+
+        self.assertEqual(changes, ([], [('aapl', '1minute', '1day')]))
+
+    @patch('stock_subscriptions_sources.alerts.config', DotDict({'Stocks': {'Alerts': {'PollOverlapSecs': 0}}}))
+    @patch('stock_subscriptions_sources.alerts.Alert')
+    def test_subscription_changes_uses_configured_overlap_of_zero(self, mock_alert):
+        mock_alert.objects.only.return_value = [alert('aapl', datetime.datetime(2024, 6, 1))]
+        alerts = Alerts(change_tracking='polling', poll_interval_secs=0)
+        alerts.subscription_changes()
+        mock_alert.objects.return_value.only.return_value = []
+        mock_alert.objects.count.return_value = 1
+
+        alerts.subscription_changes()
+
+        mock_alert.objects.assert_called_with(updated_at__gte=datetime.datetime(2024, 6, 1))
+
+    @patch('stock_subscriptions_sources.alerts.Alert')
+    def test_subscription_changes_ignores_unchanged_alerts_within_the_overlap(self, mock_alert):
+        aapl = alert('aapl', datetime.datetime(2024, 6, 1))
+        mock_alert.objects.only.return_value = [aapl]
+        self.alerts.subscription_changes()
+        mock_alert.objects.return_value.only.return_value = [aapl]
+        mock_alert.objects.count.return_value = 1
+        self.clock.now += 5
+
+        changes = self.alerts.subscription_changes()
+
+        self.assertEqual(changes, ([], []))
+
+    @patch('stock_subscriptions_sources.alerts.Alert')
+    def test_subscription_changes_returns_alerts_missed_by_the_cursor_as_added(self, mock_alert):
+        # Saved by a lagging clock, older than the cursor and its overlap
+        aapl, msft = alert('aapl'), alert('msft', datetime.datetime(2024, 5, 1))
+        mock_alert.objects.only.return_value = [aapl]
+        self.alerts.subscription_changes()
+        mock_alert.objects.return_value.only.side_effect = [[], [msft]]
+        mock_alert.objects.count.return_value = 2
+        mock_alert.objects.scalar.return_value = [aapl.id, msft.id]
+        self.clock.now += 5
+
+        changes = self.alerts.subscription_changes()
+
+        mock_alert.objects.assert_called_with(id__in=[msft.id])
+        self.assertEqual(changes, ([('msft', '1minute', '1day')], []))
+
+class ChangeStreamWithoutEventsStub:
+    """Holds each read for `max_await_time_ms`, MongoDB's about 1s by
+    default, as a server without changes does."""
+
+    def __init__(self, max_await_time_ms=1000):
+        self._max_await_secs = max_await_time_ms / 1000
+
+    def try_next(self):
+        time.sleep(self._max_await_secs)
+
+    def close(self):
+        pass
+
+class Test_Alerts_Alerts_ChangeStream(unittest.TestCase):
+
+    @patch('stock_subscriptions_sources.alerts.Alert')
+    def test_subscription_changes_returns_change_stream_events(self, mock_alert):
+        aapl = alert('aapl')
+        mock_alert.objects.only.return_value = [aapl]
+        mock_change_stream = mock_alert._get_collection.return_value.watch.return_value
+        mock_change_stream.try_next.side_effect = [
+            {'operationType': 'insert', 'documentKey': {'_id': 'id-1'},
+             'fullDocument': {'symbol': 'msft', 'frequency': '5minute', 'period': '10day'}},
+            {'operationType': 'delete', 'documentKey': {'_id': aapl.id}},
+            None
+        ]
+        alerts = Alerts(change_tracking='change_stream')
+        alerts.subscription_changes()
+
+        changes = alerts.subscription_changes()
+
+        self.assertEqual(changes.added, [('msft', '5minute', '10day')])
+        self.assertEqual(changes.removed, [('aapl', '1minute', '1day')])
+        mock_alert.objects.count.assert_not_called()
+
+    @patch('stock_subscriptions_sources.alerts.Alert')
+    def test_subscription_changes_polls_if_change_streams_are_unsupported(self, mock_alert):
+        mock_alert.objects.only.return_value = [alert('aapl')]
+        mock_alert._get_collection.return_value.watch.side_effect = OperationFailure('standalone')
+        mock_alert.objects.return_value.only.return_value = [alert('msft')]
+        mock_alert.objects.count.return_value = 2
+        alerts = Alerts(change_tracking='change_stream', poll_interval_secs=0)
+        alerts.subscription_changes()
+
+        changes = alerts.subscription_changes()
+
+        self.assertEqual(changes.added, [('msft', '1minute', '1day')])
+
+    @patch('stock_subscriptions_sources.alerts.Alert')
+    def test_subscription_changes_returns_promptly_without_events(self, mock_alert):
+        mock_alert.objects.only.return_value = [alert('aapl')]
+        mock_alert._get_collection.return_value.watch.side_effect = \
+            lambda full_document, **kwargs: ChangeStreamWithoutEventsStub(**kwargs)
+        alerts = Alerts(change_tracking='change_stream')
+        alerts.subscription_changes()
+        start = time.monotonic()
+
+        changes = alerts.subscription_changes()
+
+        self.assertEqual(changes, ([], []))
+        self.assertLess(time.monotonic() - start, 0.1)
+
+    @patch('stock_subscriptions_sources.alerts.Alert')
+    def test_subscription_changes_keeps_events_read_before_change_stream_failed(self, mock_alert):
+        aapl = alert('aapl')
+        mock_alert.objects.only.return_value = [aapl]
+        mock_change_stream = mock_alert._get_collection.return_value.watch.return_value
+        mock_change_stream.try_next.side_effect = [
+            {'operationType': 'delete', 'documentKey': {'_id': aapl.id}},
+            PyMongoError('connection reset')
+        ]
+        mock_alert.objects.return_value.only.return_value = []
+        mock_alert.objects.count.return_value = 0
+        alerts = Alerts(change_tracking='change_stream', poll_interval_secs=5)
+        alerts.subscription_changes()
+
+        with self.assertLogs('stock_subscriptions_sources.alerts', 'ERROR'):
+            changes = alerts.subscription_changes()
+
+        self.assertEqual(changes, ([], [('aapl', '1minute', '1day')]))
+        mock_change_stream.close.assert_called_once()
+
+    @patch('stock_subscriptions_sources.alerts.Alert')
+    def test_subscription_changes_rescans_after_collection_is_dropped(self, mock_alert):
+        aapl = alert('aapl')
+        mock_alert.objects.only.side_effect = [[aapl], []]
+        mock_change_stream = mock_alert._get_collection.return_value.watch.return_value
+        mock_change_stream.try_next.side_effect = [{'operationType': 'drop'}]
+        alerts = Alerts(change_tracking='change_stream')
+        alerts.subscription_changes()
+
+        with self.assertLogs('stock_subscriptions_sources.alerts', 'WARNING'):
+            changes = alerts.subscription_changes()
+
+        self.assertEqual(changes, ([], [('aapl', '1minute', '1day')]))
+        mock_change_stream.close.assert_called_once()
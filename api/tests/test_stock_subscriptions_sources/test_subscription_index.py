@@ -0,0 +1,74 @@
+# pylint:disable=missing-module-docstring, invalid-name, line-too-long
+# pylint:disable=missing-function-docstring
+
+import unittest
+
+from stock_subscriptions_sources.subscription_index import SubscriptionChanges, SubscriptionIndex
+
+AAPL_1M = ('aapl', '1minute', '1day')
+AAPL_5M = ('aapl', '5minute', '10day')
+MSFT_1M = ('msft', '1minute', '1day')
+
+class Test_SubscriptionIndex_SubscriptionIndex(unittest.TestCase):
+
+    def test_add_dedupes_subscriptions_and_counts_references(self):
+        index = SubscriptionIndex()
+
+        self.assertTrue(index.add(AAPL_1M))
+        self.assertFalse(index.add(AAPL_1M))
+        self.assertEqual(index.subscriptions(), [AAPL_1M])
+        self.assertEqual(index.ref_count(AAPL_1M), 2)
+
+    def test_remove_keeps_subscription_until_last_reference_is_removed(self):
+        index = SubscriptionIndex()
+        index.add(AAPL_1M)
+        index.add(AAPL_1M)
+
+        self.assertFalse(index.remove(AAPL_1M))
+        self.assertIn(AAPL_1M, index)
+        self.assertTrue(index.remove(AAPL_1M))
+        self.assertNotIn(AAPL_1M, index)
+        self.assertEqual(index.symbols(), [])
+
+    def test_remove_ignores_unknown_subscription(self):
+        self.assertFalse(SubscriptionIndex().remove(AAPL_1M))
+
+    def test_subscriptions_for_returns_all_timeframes_of_symbol(self):
+        index = SubscriptionIndex()
+
+        for subscription in [AAPL_1M, MSFT_1M, AAPL_5M]:
+            index.add(subscription)
+
+        self.assertEqual(index.symbols(), ['aapl', 'msft'])
+        self.assertEqual(index.subscriptions_for('AAPL'), [AAPL_1M, AAPL_5M])
+        self.assertEqual(index.subscriptions_for('nvda'), [])
+
+    def test_replace_returns_added_and_removed_unique_subscriptions(self):
+        index = SubscriptionIndex()
+        index.replace([AAPL_1M, MSFT_1M])
+
+        added, removed = index.replace([AAPL_1M, AAPL_1M, AAPL_5M])
+
+        self.assertEqual(added, [AAPL_5M])
+        self.assertEqual(removed, [MSFT_1M])
+        self.assertEqual(index.ref_count(AAPL_1M), 2)
+        self.assertEqual(index.symbols(), ['aapl'])
+        self.assertEqual(len(index), 2)
+
+    def test_apply_returns_subscriptions_entering_and_leaving_the_index(self):
+        index = SubscriptionIndex()
+        index.apply(SubscriptionChanges([AAPL_1M, MSFT_1M], []))
+
+        added, removed = index.apply(SubscriptionChanges([AAPL_1M, AAPL_5M], [MSFT_1M, AAPL_1M]))
+
+        self.assertEqual(added, [AAPL_5M])
+        self.assertEqual(removed, [MSFT_1M])
+        self.assertEqual(index.ref_count(AAPL_1M), 1)
+
+    def test_apply_nets_out_subscription_added_and_removed_in_one_batch(self):
+        index = SubscriptionIndex()
+
+        added, removed = index.apply(SubscriptionChanges([AAPL_1M], [AAPL_1M]))
+
+        self.assertEqual((added, removed), ([], []))
+        self.assertNotIn(AAPL_1M, index)